@@ -0,0 +1,113 @@
+﻿#!/usr/bin/env python3
+"""
+Пропускная способность загрузки JiraClient на локальном тестовом сервере
+Для каждого режима клиента (последовательно, пул потоков, потоковый разбор JSON,
+компактные записи) измеряется число задач в секунду, количество запросов,
+повторов и ответов 429. Задержка, сбои и скорость сервера задаются аргументами.
+Запуск:
+    python benchmarks/fetch_throughput.py --issues 5000 --latency 0.05 --throttle-rate 0.05
+"""
+import argparse
+import json
+import os
+import sys
+import time
+from datetime import datetime
+current_dir = os.path.dirname(os.path.abspath(__file__))
+parent_dir = os.path.dirname(current_dir)
+if parent_dir not in sys.path:
+    sys.path.insert(0, parent_dir)
+from benchmarks.mock_jira_server import MockJiraServer
+from src.jira_client import JiraClient
+from src.metric_fields import jira_request_for
+from src.synthetic_data import SyntheticIssues
+# Режимы клиента: параметры JiraClient и способ потребления задач
+MODES = {
+    'sequential': {'max_workers': 1},
+    'parallel-4': {'max_workers': 4},
+    'parallel-8': {'max_workers': 8},
+    'streaming-4': {'max_workers': 4, 'streaming_json': True},
+    'records-4': {'max_workers': 4, 'records': True},
+}
+def measure_mode(server, mode, page_size=100, changelog=True, max_retries=5, backoff_factor=0.1, rate_limit=None):
+    """
+    Загрузить все задачи сервера в заданном режиме
+    Returns:
+        Строка результата: mode, issues, seconds, issues_per_second, requests, retries, throttled, bytes
+    """
+    options = dict(MODES[mode])
+    records = options.pop('records', False)
+    fields, expand = jira_request_for(status_from_changelog=changelog)
+    client = JiraClient(server.url, 'SYN', max_results=0, page_size=page_size, fields=fields,
+                        max_retries=max_retries, backoff_factor=backoff_factor, rate_limit=rate_limit, **options)
+    bytes_before = server.stats['bytes_sent']
+    start = time.perf_counter()
+    stream = client.iter_records('project = SYN', expand=expand) if records else client.iter_issues('project = SYN', expand=expand)
+    count = sum(1 for _ in stream)
+    seconds = time.perf_counter() - start
+    stats = client.transport.stats
+    return {
+        'mode': mode,
+        'issues': count,
+        'seconds': round(seconds, 4),
+        'issues_per_second': round(count / seconds, 1) if seconds else None,
+        'requests': stats['requests'],
+        'retries': stats['retries'],
+        'throttled': stats['throttled'],
+        'bytes': server.stats['bytes_sent'] - bytes_before,
+    }
+def run(issues=5000, modes=tuple(MODES), page_size=100, latency=0.0, max_page_size=1000, throttle_rate=0.0,
+        error_rate=0.0, retry_after=0, bandwidth=None, changelog=True, rate_limit=None, seed=0, log=print):
+    """
+    Запустить тестовый сервер и измерить все режимы
+    Returns:
+        Отчет: {'meta': параметры сервера, 'results': [строки measure_mode]}
+    """
+    meta = {'created': datetime.now().isoformat(timespec='seconds'), 'issues': issues, 'page_size': page_size,
+            'latency': latency, 'max_page_size': max_page_size, 'throttle_rate': throttle_rate,
+            'error_rate': error_rate, 'retry_after': retry_after, 'bandwidth': bandwidth,
+            'changelog': changelog, 'rate_limit': rate_limit, 'seed': seed}
+    report = {'meta': meta, 'results': []}
+    server = MockJiraServer(SyntheticIssues(issues, seed=seed), latency=latency, max_page_size=max_page_size,
+                            throttle_rate=throttle_rate, error_rate=error_rate, retry_after=retry_after,
+                            bandwidth=bandwidth, seed=seed)
+    with server:
+        for mode in modes:
+            row = measure_mode(server, mode, page_size=page_size, changelog=changelog, rate_limit=rate_limit)
+            report['results'].append(row)
+            log(f"  {mode:<12} {row['issues']:>8} задач  {row['seconds']:8.2f} с  {row['issues_per_second']:>10} задач/с  "
+                f"запросов {row['requests']}, повторов {row['retries']}, 429: {row['throttled']}")
+    report['server'] = dict(server.stats)
+    return report
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Пропускная способность загрузки JiraClient на тестовом сервере")
+    parser.add_argument('--issues', type=int, default=5000, help="Количество задач на сервере")
+    parser.add_argument('--modes', default=','.join(MODES), help="Режимы через запятую: " + ", ".join(MODES))
+    parser.add_argument('--page-size', type=int, default=100, help="Размер страницы клиента")
+    parser.add_argument('--latency', type=float, default=0.0, help="Задержка ответа сервера в секундах")
+    parser.add_argument('--max-page-size', type=int, default=1000, help="Ограничение maxResults на сервере")
+    parser.add_argument('--throttle-rate', type=float, default=0.0, help="Доля ответов 429")
+    parser.add_argument('--error-rate', type=float, default=0.0, help="Доля ответов 503")
+    parser.add_argument('--retry-after', type=float, default=0, help="Retry-After для 429 в секундах")
+    parser.add_argument('--bandwidth', type=int, help="Скорость отдачи сервера, байт/с")
+    parser.add_argument('--rate-limit', type=float, help="Ограничение частоты запросов клиента, запр/с")
+    parser.add_argument('--no-changelog', action='store_true', help="Не запрашивать changelog")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', help="Файл JSON (по умолчанию benchmarks/results/fetch-<время>.json)")
+    args = parser.parse_args(argv)
+    modes = [mode.strip() for mode in args.modes.split(',') if mode.strip()]
+    unknown = [mode for mode in modes if mode not in MODES]
+    if unknown:
+        parser.error(f"Неизвестные режимы: {unknown}")
+    report = run(args.issues, modes, page_size=args.page_size, latency=args.latency,
+                 max_page_size=args.max_page_size, throttle_rate=args.throttle_rate, error_rate=args.error_rate,
+                 retry_after=args.retry_after, bandwidth=args.bandwidth, changelog=not args.no_changelog,
+                 rate_limit=args.rate_limit, seed=args.seed)
+    output = args.output or os.path.join(current_dir, 'results', f"fetch-{datetime.now().strftime('%Y%m%d-%H%M%S')}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    print(f"\nOK: Результаты сохранены: {output}")
+    return 0
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,219 @@
+﻿#!/usr/bin/env python3
+"""
+Локальный тестовый сервер JIRA на синтетических задачах
+Отдает /rest/api/2/serverInfo, /rest/api/2/search, /rest/api/2/issue/{key}
+(с expand=changelog), /rest/api/2/issue/{key}/changelog и /rest/api/2/issue/{key}/worklog.
+Поддерживает задержку ответа, ограничение размера страницы, долю ответов 429
+(с Retry-After) и 5xx, ограничение пропускной способности.
+JQL не разбирается: поиск всегда возвращает все задачи генератора.
+Запуск:
+    python benchmarks/mock_jira_server.py --issues 10000 --port 8080 --latency 0.05 --throttle-rate 0.05
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Optional
+from urllib.parse import parse_qs, urlparse
+current_dir = os.path.dirname(os.path.abspath(__file__))
+parent_dir = os.path.dirname(current_dir)
+if parent_dir not in sys.path:
+    sys.path.insert(0, parent_dir)
+from src.synthetic_data import SyntheticIssues
+class _QuietHTTPServer(ThreadingHTTPServer):
+    """HTTP-сервер без трассировки при разрыве соединения клиентом (клиент закрывает ответ перед повтором)"""
+    daemon_threads = True
+    def handle_error(self, request, client_address):
+        if isinstance(sys.exc_info()[1], ConnectionError):
+            return
+        super().handle_error(request, client_address)
+class MockJiraServer:
+    """Тестовый сервер JIRA в фоновом потоке"""
+    def __init__(self, issues: SyntheticIssues, host: str = '127.0.0.1', port: int = 0,
+                 latency: float = 0.0, max_page_size: int = 1000, throttle_rate: float = 0.0,
+                 error_rate: float = 0.0, retry_after: Optional[float] = 1, bandwidth: Optional[int] = None,
+                 seed: int = 0):
+        """
+        Инициализация сервера
+        Args:
+            issues: Генератор синтетических задач (SyntheticIssues)
+            host: Адрес
+            port: Порт (0 - любой свободный)
+            latency: Задержка перед каждым ответом в секундах
+            max_page_size: Ограничение maxResults поиска (как у настоящей JIRA)
+            throttle_rate: Доля запросов, получающих 429 Too Many Requests
+            error_rate: Доля запросов, получающих 503 Service Unavailable
+            retry_after: Значение заголовка Retry-After для 429 (None - без заголовка)
+            bandwidth: Ограничение скорости отдачи тела ответа в байтах в секунду (None - без ограничения)
+            seed: Зерно генератора сбоев
+        """
+        self.issues = issues
+        self.latency = latency
+        self.max_page_size = max_page_size
+        self.throttle_rate = throttle_rate
+        self.error_rate = error_rate
+        self.retry_after = retry_after
+        self.bandwidth = bandwidth
+        self.stats = {'requests': 0, 'throttled': 0, 'errors': 0, 'bytes_sent': 0}
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self._httpd = _QuietHTTPServer((host, port), self._handler_class())
+        self._thread = None
+    @property
+    def url(self) -> str:
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}"
+    def start(self) -> 'MockJiraServer':
+        self._thread = threading.Thread(target=self._httpd.serve_forever, name='mock-jira', daemon=True)
+        self._thread.start()
+        return self
+    def stop(self):
+        self._httpd.shutdown()
+        self._httpd.server_close()
+        if self._thread is not None:
+            self._thread.join()
+    def __enter__(self):
+        return self.start()
+    def __exit__(self, *exc_info):
+        self.stop()
+    def _count(self, name: str, value: int = 1):
+        with self._lock:
+            self.stats[name] += value
+    def _fault(self) -> Optional[int]:
+        """Код сбоя для очередного запроса (429, 503) или None"""
+        with self._lock:
+            roll = self._rng.random()
+        if roll < self.throttle_rate:
+            return 429
+        if roll < self.throttle_rate + self.error_rate:
+            return 503
+        return None
+    # ===== Ответы API =====
+    def search(self, query: Dict) -> Dict:
+        start_at = max(0, int(query.get('startAt', 0)))
+        page_size = min(max(0, int(query.get('maxResults', 50))), self.max_page_size)
+        fields = [field for field in query.get('fields', '').split(',') if field]
+        expand = query.get('expand', '').split(',')
+        issues = [self._shape(issue, fields, 'changelog' in expand) for issue in self.issues.page(start_at, page_size)]
+        return {'startAt': start_at, 'maxResults': page_size, 'total': len(self.issues), 'issues': issues}
+    def _shape(self, issue: Dict, fields, with_changelog: bool) -> Dict:
+        """Оставить запрошенные поля (fields) и changelog (expand=changelog)"""
+        if fields and '*all' not in fields:
+            issue['fields'] = {name: value for name, value in issue['fields'].items() if name in fields}
+        if not with_changelog:
+            issue.pop('changelog', None)
+        return issue
+    def issue(self, key: str, query: Dict) -> Dict:
+        issue = self.issues.issue(self.issues.index_of(key))
+        fields = [field for field in query.get('fields', '').split(',') if field]
+        return self._shape(issue, fields, 'changelog' in query.get('expand', '').split(','))
+    def changelog(self, key: str, query: Dict) -> Dict:
+        histories = self.issues.issue(self.issues.index_of(key)).get('changelog', {}).get('histories', [])
+        start_at = int(query.get('startAt', 0))
+        page_size = min(int(query.get('maxResults', 100)), self.max_page_size)
+        page = histories[start_at:start_at + page_size]
+        return {'startAt': start_at, 'maxResults': page_size, 'total': len(histories),
+                'isLast': start_at + len(page) >= len(histories), 'values': page}
+    def worklog(self, key: str, query: Dict) -> Dict:
+        worklogs = self.issues.worklogs(self.issues.index_of(key))
+        start_at = int(query.get('startAt', 0))
+        page_size = min(int(query.get('maxResults', 1000)), self.max_page_size)
+        return {'startAt': start_at, 'maxResults': page_size, 'total': len(worklogs),
+                'worklogs': worklogs[start_at:start_at + page_size]}
+    def route(self, path: str, query: Dict) -> Dict:
+        """Ответ по пути запроса; KeyError - неизвестный путь, ValueError - нет задачи"""
+        parts = path.rstrip('/').split('/')
+        if path == '/rest/api/2/serverInfo':
+            return {'baseUrl': self.url, 'version': 'mock', 'serverTitle': 'Mock JIRA'}
+        if path == '/rest/api/2/search':
+            return self.search(query)
+        if parts[:4] == ['', 'rest', 'api', '2'] and len(parts) >= 6 and parts[4] == 'issue':
+            if len(parts) == 6:
+                return self.issue(parts[5], query)
+            if len(parts) == 7 and parts[6] == 'changelog':
+                return self.changelog(parts[5], query)
+            if len(parts) == 7 and parts[6] == 'worklog':
+                return self.worklog(parts[5], query)
+        raise KeyError(path)
+    def _handler_class(self):
+        server = self
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+            def log_message(self, format, *args):
+                pass
+            def _send(self, status: int, payload: Dict, headers: Optional[Dict] = None):
+                body = json.dumps(payload).encode('utf-8')
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(body)))
+                for name, value in (headers or {}).items():
+                    self.send_header(name, value)
+                self.end_headers()
+                if server.bandwidth:
+                    # Отдаем тело порциями, выдерживая заданную скорость
+                    chunk = max(1024, server.bandwidth // 20)
+                    for offset in range(0, len(body), chunk):
+                        self.wfile.write(body[offset:offset + chunk])
+                        time.sleep(len(body[offset:offset + chunk]) / server.bandwidth)
+                else:
+                    self.wfile.write(body)
+                server._count('bytes_sent', len(body))
+            def do_GET(self):
+                server._count('requests')
+                if server.latency:
+                    time.sleep(server.latency)
+                fault = server._fault()
+                if fault == 429:
+                    server._count('throttled')
+                    headers = {'Retry-After': str(int(server.retry_after))} if server.retry_after is not None else {}
+                    self._send(429, {'errorMessages': ['Rate limit exceeded']}, headers)
+                    return
+                if fault:
+                    server._count('errors')
+                    self._send(fault, {'errorMessages': ['Service unavailable']})
+                    return
+                url = urlparse(self.path)
+                query = {name: values[-1] for name, values in parse_qs(url.query).items()}
+                try:
+                    self._send(200, server.route(url.path, query))
+                except KeyError:
+                    self._send(404, {'errorMessages': [f'Unknown path {url.path}']})
+                except ValueError as e:
+                    self._send(404, {'errorMessages': [str(e)]})
+        return Handler
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Тестовый сервер JIRA на синтетических задачах")
+    parser.add_argument('--issues', type=int, default=10000, help="Количество задач")
+    parser.add_argument('--seed', type=int, default=0, help="Зерно генератора задач и сбоев")
+    parser.add_argument('--project', default='SYN', help="Ключ проекта")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8080)
+    parser.add_argument('--latency', type=float, default=0.0, help="Задержка ответа в секундах")
+    parser.add_argument('--max-page-size', type=int, default=1000, help="Ограничение maxResults")
+    parser.add_argument('--throttle-rate', type=float, default=0.0, help="Доля ответов 429")
+    parser.add_argument('--error-rate', type=float, default=0.0, help="Доля ответов 503")
+    parser.add_argument('--retry-after', type=float, default=1, help="Retry-After для 429 в секундах")
+    parser.add_argument('--bandwidth', type=int, help="Ограничение скорости отдачи, байт/с")
+    args = parser.parse_args(argv)
+    server = MockJiraServer(
+        SyntheticIssues(args.issues, seed=args.seed, project=args.project),
+        host=args.host, port=args.port, latency=args.latency, max_page_size=args.max_page_size,
+        throttle_rate=args.throttle_rate, error_rate=args.error_rate, retry_after=args.retry_after,
+        bandwidth=args.bandwidth, seed=args.seed
+    )
+    print(f"Тестовый сервер JIRA: {server.url} (задач: {args.issues}, проект: {args.project})")
+    print("Остановка: Ctrl+C")
+    try:
+        server._httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server._httpd.server_close()
+        print(f"\nСтатистика: {server.stats}")
+    return 0
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,170 @@
+﻿#!/usr/bin/env python3
+"""
+Бенчмарк обработчиков и графиков на синтетических задачах
+Для каждого размера (по умолчанию 1k/10k/100k/1M задач) измеряются время и пиковая
+память (tracemalloc) загрузки-разбора, normalize_issues, каждой функции calculate_*
+и каждой функции plot_*. Результаты сохраняются в JSON.
+Запуск:
+    python benchmarks/run_benchmarks.py --sizes 1000,10000 --output benchmarks/results/run.json
+    python benchmarks/run_benchmarks.py --sizes 10000 --compare benchmarks/results/baseline.json
+"""
+import argparse
+import contextlib
+import gc
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+current_dir = os.path.dirname(os.path.abspath(__file__))
+parent_dir = os.path.dirname(current_dir)
+if parent_dir not in sys.path:
+    sys.path.insert(0, parent_dir)
+from src.synthetic_data import SyntheticIssues
+DEFAULT_SIZES = (1_000, 10_000, 100_000, 1_000_000)
+def measure(func, *args, memory=True, **kwargs):
+    """
+    Выполнить функцию и измерить время; при memory=True - повторить под tracemalloc
+    (отдельный прогон, чтобы трассировка памяти не искажала время).
+    Вывод функций (print) на время измерения подавляется.
+    Returns:
+        (результат, секунды, пиковая память в МБ или None)
+    """
+    with open(os.devnull, 'w', encoding='utf-8') as devnull, contextlib.redirect_stdout(devnull):
+        gc.collect()
+        start = time.perf_counter()
+        result = func(*args, **kwargs)
+        seconds = time.perf_counter() - start
+        peak_mb = None
+        if memory:
+            del result
+            gc.collect()
+            tracemalloc.start()
+            try:
+                result = func(*args, **kwargs)
+                peak_mb = tracemalloc.get_traced_memory()[1] / 1024 / 1024
+            finally:
+                tracemalloc.stop()
+    return result, seconds, peak_mb
+def _rows(value):
+    return len(value) if hasattr(value, '__len__') else None
+def load_synthetic(size, seed):
+    """Потоковый разбор синтетических задач: changelog и журналы - в сборщики, задачи - в IssueRecord"""
+    from src.changelog import StatusIntervalCollector
+    from src.worklog import WorklogCollector
+    from src.records import to_records
+    intervals = StatusIntervalCollector()
+    worklogs = WorklogCollector()
+    records = list(to_records(worklogs.consume(intervals.consume(iter(SyntheticIssues(size, seed=seed))))))
+    return records, intervals.to_frame(as_of=datetime(2025, 1, 1)), worklogs.to_frame()
+def run(sizes=DEFAULT_SIZES, seed=0, plots=True, memory=True, log=print):
+    """
+    Прогнать бенчмарк
+    Returns:
+        Отчет: {'meta': {...}, 'results': [{size, stage, function, seconds, peak_mb, rows}, ...]}
+    """
+    import matplotlib
+    import numpy
+    import pandas
+    from src import data_processor as dp
+    from src import plot_builder as pb
+    report = {
+        'meta': {
+            'created': datetime.now().isoformat(timespec='seconds'),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'cpu_count': os.cpu_count(),
+            'pandas': pandas.__version__,
+            'numpy': numpy.__version__,
+            'matplotlib': matplotlib.__version__,
+            'seed': seed,
+            'sizes': list(sizes),
+            'memory': memory,
+        },
+        'results': []
+    }
+    def record(size, stage, name, seconds, peak_mb, rows):
+        report['results'].append({'size': size, 'stage': stage, 'function': name, 'seconds': round(seconds, 6),
+                                  'peak_mb': None if peak_mb is None else round(peak_mb, 3), 'rows': rows})
+        memory_text = f", пик {peak_mb:.1f} МБ" if peak_mb is not None else ""
+        log(f"  {stage:<9} {name:<36} {seconds:9.3f} с{memory_text}")
+    # Построенные графики нужны только для замера и удаляются вместе с папкой
+    with tempfile.TemporaryDirectory(prefix='jira_bench_') as output_dir:
+        for size in sizes:
+            log(f"\nРазмер: {size} задач")
+            (records, intervals, worklogs), seconds, peak = measure(load_synthetic, size, seed, memory=memory)
+            record(size, 'load', 'synthetic+collect', seconds, peak, len(records))
+            issues, seconds, peak = measure(dp.normalize_issues, records, memory=memory)
+            record(size, 'process', 'normalize_issues', seconds, peak, len(issues))
+            calculations = [
+                ('calculate_open_time', dp.calculate_open_time, {}),
+                ('calculate_priority_distribution', dp.calculate_priority_distribution, {}),
+                ('calculate_top_users', dp.calculate_top_users, {'top_n': 30}),
+                ('calculate_daily_issues_stats', dp.calculate_daily_issues_stats, {}),
+                ('calculate_time_spent_distribution', dp.calculate_time_spent_distribution, {}),
+                ('calculate_status_time_distribution', dp.calculate_status_time_distribution, {'intervals': intervals}),
+            ]
+            frames = {}
+            for name, func, kwargs in calculations:
+                frames[name], seconds, peak = measure(func, issues, memory=memory, **kwargs)
+                record(size, 'process', name, seconds, peak, _rows(frames[name]))
+            for by in ('author', 'day'):
+                effort, seconds, peak = measure(dp.calculate_worklog_effort, worklogs, by=by, memory=memory)
+                record(size, 'process', f'calculate_worklog_effort[{by}]', seconds, peak, _rows(effort))
+            if plots:
+                renders = [
+                    ('plot_open_time_histogram', pb.plot_open_time_histogram, 'calculate_open_time'),
+                    ('plot_priority_distribution_chart', pb.plot_priority_distribution_chart, 'calculate_priority_distribution'),
+                    ('plot_top_users_chart', pb.plot_top_users_chart, 'calculate_top_users'),
+                    ('plot_daily_issues_chart', pb.plot_daily_issues_chart, 'calculate_daily_issues_stats'),
+                    ('plot_time_spent_histogram', pb.plot_time_spent_histogram, 'calculate_time_spent_distribution'),
+                    ('plot_status_time_distributions', pb.plot_status_time_distributions, 'calculate_status_time_distribution'),
+                ]
+                for name, func, source in renders:
+                    output_path = os.path.join(output_dir, f"{size}_{name}.png")
+                    _, seconds, peak = measure(func, frames[source], output_path, memory=memory)
+                    record(size, 'plot', name, seconds, peak, _rows(frames[source]))
+            del records, intervals, worklogs, issues, frames
+    return report
+def compare(report, baseline):
+    """Сравнение с базовым отчетом: отношение времени (текущее / базовое) по совпадающим измерениям"""
+    base = {(row['size'], row['function']): row for row in baseline['results']}
+    rows = []
+    for row in report['results']:
+        old = base.get((row['size'], row['function']))
+        if old and old['seconds']:
+            rows.append({'size': row['size'], 'function': row['function'], 'baseline_seconds': old['seconds'],
+                         'seconds': row['seconds'], 'ratio': round(row['seconds'] / old['seconds'], 3)})
+    return rows
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Бенчмарк обработчиков и графиков JIRA Analytics Tool")
+    parser.add_argument('--sizes', default=','.join(str(size) for size in DEFAULT_SIZES),
+                        help="Размеры (количество задач) через запятую")
+    parser.add_argument('--seed', type=int, default=0, help="Зерно генератора синтетических задач")
+    parser.add_argument('--no-plots', action='store_true', help="Не измерять построение графиков")
+    parser.add_argument('--no-memory', action='store_true', help="Не измерять память (в 2 раза быстрее)")
+    parser.add_argument('--output', help="Файл JSON с результатами (по умолчанию benchmarks/results/benchmark-<время>.json)")
+    parser.add_argument('--compare', help="Базовый JSON для сравнения времени")
+    return parser.parse_args(argv)
+def main(argv=None):
+    args = parse_args(argv)
+    sizes = [int(size) for size in args.sizes.split(',') if size.strip()]
+    report = run(sizes, seed=args.seed, plots=not args.no_plots, memory=not args.no_memory)
+    if args.compare:
+        with open(args.compare, 'r', encoding='utf-8') as f:
+            report['comparison'] = compare(report, json.load(f))
+        print("\nСравнение с базовым отчетом (время: текущее / базовое):")
+        for row in report['comparison']:
+            print(f"  {row['size']:>8} {row['function']:<36} x{row['ratio']:.2f}")
+    output = args.output or os.path.join(current_dir, 'results',
+                                         f"benchmark-{datetime.now().strftime('%Y%m%d-%H%M%S')}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    print(f"\nOK: Результаты сохранены: {output}")
+    return 0
+if __name__ == "__main__":
+    sys.exit(main())
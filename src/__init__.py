@@ -5,28 +5,38 @@
 __version__ = "1.0.0"
 __author__ = "Ваше Имя"
 
-# Экспортируем основные классы и функции для удобного импорта
-from .jira_client import JiraClient
-from .data_processor import (
-    calculate_open_time,
-    calculate_status_time_distribution,
-    calculate_daily_issues_stats,
-    calculate_top_users,
-    calculate_time_spent_distribution,
-    calculate_priority_distribution
-)
-from .plot_builder import (
-    plot_open_time_histogram,
-    plot_status_time_distributions,
-    plot_daily_issues_chart,
-    plot_top_users_chart,
-    plot_time_spent_histogram,
-    plot_priority_distribution_chart
-)
+# Основные классы и функции импортируются при первом обращении (from src import JiraClient),
+# чтобы импорт пакета не загружал pandas, matplotlib и seaborn
+_EXPORTS = {
+    'JiraClient': 'jira_client',
+    'normalize_issues': 'data_processor',
+    'calculate_open_time': 'data_processor',
+    'calculate_status_time_distribution': 'data_processor',
+    'calculate_daily_issues_stats': 'data_processor',
+    'calculate_top_users': 'data_processor',
+    'calculate_time_spent_distribution': 'data_processor',
+    'calculate_priority_distribution': 'data_processor',
+    'plot_open_time_histogram': 'plot_builder',
+    'plot_status_time_distributions': 'plot_builder',
+    'plot_daily_issues_chart': 'plot_builder',
+    'plot_top_users_chart': 'plot_builder',
+    'plot_time_spent_histogram': 'plot_builder',
+    'plot_priority_distribution_chart': 'plot_builder'
+}
+def __getattr__(name):
+    if name in _EXPORTS:
+        from importlib import import_module
+        value = getattr(import_module(f".{_EXPORTS[name]}", __name__), name)
+        globals()[name] = value
+        return value
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+def __dir__():
+    return sorted(list(globals()) + list(_EXPORTS))
 
 # Можно определить __all__ для контроля импорта через from src import *
 __all__ = [
     'JiraClient',
+    'normalize_issues',
     'calculate_open_time',
     'calculate_status_time_distribution',
     'calculate_daily_issues_stats',
@@ -40,5 +50,3 @@ __all__ = [
     'plot_time_spent_histogram',
     'plot_priority_distribution_chart'
 ]
-
-print(f"Инициализация пакета jira_analytics версии {__version__}")
\ No newline at end of file
@@ -0,0 +1,108 @@
+﻿import gzip
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from typing import Any, Dict, Optional
+logger = logging.getLogger(__name__)
+class ResponseCache:
+    """Дисковый кэш ответов JIRA с временем жизни и ограничением размера"""
+    def __init__(self, cache_dir: str = '.cache/jira', ttl: int = 3600, max_size_mb: float = 512):
+        """
+        Инициализация кэша
+        Args:
+            cache_dir: Папка для файлов кэша
+            ttl: Время жизни записи в секундах
+            max_size_mb: Максимальный суммарный размер кэша (старые записи вытесняются)
+        """
+        self.cache_dir = cache_dir
+        self.ttl = ttl
+        self.max_size_bytes = int(max_size_mb * 1024 * 1024)
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        os.makedirs(cache_dir, exist_ok=True)
+        self._size_bytes = sum(os.path.getsize(path) for path in self._entries())
+    @staticmethod
+    def make_key(*parts: Any) -> str:
+        """Построить ключ кэша из частей запроса (сервер, JQL, поля, смещение...)"""
+        raw = json.dumps(parts, sort_keys=True, ensure_ascii=False, default=str)
+        return hashlib.sha256(raw.encode('utf-8')).hexdigest()
+    def _path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, f"{key}.json.gz")
+    def _entries(self):
+        for name in os.listdir(self.cache_dir):
+            if name.endswith('.json.gz'):
+                yield os.path.join(self.cache_dir, name)
+    def _count(self, hit: bool):
+        # Кэш общий для потоков загрузки страниц: счетчики меняются под блокировкой
+        with self._lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+    def get(self, key: str) -> Optional[Dict]:
+        """Получить запись кэша или None, если ее нет или она устарела"""
+        path = self._path(key)
+        try:
+            age = time.time() - os.path.getmtime(path)
+            if age > self.ttl:
+                self._remove(path)
+                self._count(False)
+                return None
+            with gzip.open(path, 'rt', encoding='utf-8') as f:
+                data = json.load(f)
+            self._count(True)
+            return data
+        except FileNotFoundError:
+            self._count(False)
+            return None
+        except (OSError, ValueError) as e:
+            logger.warning(f"Поврежденная запись кэша {path}: {e}")
+            self._remove(path)
+            self._count(False)
+            return None
+    def set(self, key: str, data: Dict):
+        """Сохранить запись в кэш (атомарно, через временный файл)"""
+        path = self._path(key)
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"
+        try:
+            with gzip.open(tmp_path, 'wt', encoding='utf-8') as f:
+                json.dump(data, f, ensure_ascii=False)
+            size = os.path.getsize(tmp_path)
+            with self._lock:
+                if os.path.exists(path):
+                    self._size_bytes -= os.path.getsize(path)
+                os.replace(tmp_path, path)
+                self._size_bytes += size
+                if self._size_bytes > self.max_size_bytes:
+                    self._evict()
+        except OSError as e:
+            logger.warning(f"Не удалось записать кэш {path}: {e}")
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+    def _evict(self):
+        """Удалить самые старые записи, пока размер не станет меньше 90% лимита"""
+        entries = sorted(self._entries(), key=os.path.getmtime)
+        target = self.max_size_bytes * 0.9
+        for path in entries:
+            if self._size_bytes <= target:
+                break
+            self._size_bytes -= os.path.getsize(path)
+            os.remove(path)
+    def _remove(self, path: str):
+        with self._lock:
+            try:
+                size = os.path.getsize(path)
+                os.remove(path)
+                self._size_bytes -= size
+            except OSError:
+                pass
+    def clear(self):
+        """Очистить кэш"""
+        with self._lock:
+            for path in list(self._entries()):
+                os.remove(path)
+            self._size_bytes = 0
@@ -0,0 +1,101 @@
+﻿import logging
+import sys
+from datetime import datetime, timezone
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+logger = logging.getLogger(__name__)
+# Интервал пребывания задачи в статусе: (статус, вход, выход); выход None - до закрытия задачи или до текущего момента
+StatusInterval = Tuple[str, str, Optional[str]]
+def extract_status_intervals(issue: Dict) -> List[StatusInterval]:
+    """
+    Восстановить интервалы статусов задачи по changelog (expand=changelog)
+    Первый интервал начинается в момент создания задачи со статуса "fromString"
+    первого перехода; последний интервал заканчивается датой закрытия задачи
+    (или не заканчивается, если задача не закрыта).
+    Args:
+        issue: Задача JIRA с полем changelog
+    Returns:
+        Список интервалов (статус, вход, выход) в виде строк дат JIRA
+    """
+    fields = issue.get('fields') or {}
+    created = fields.get('created')
+    if not created:
+        return []
+    current = (fields.get('status') or {}).get('name', 'Unknown')
+    transitions = []
+    for history in (issue.get('changelog') or {}).get('histories', []):
+        for item in history.get('items', []):
+            if item.get('field') == 'status':
+                transitions.append((history.get('created'), item.get('fromString'), item.get('toString')))
+    # JIRA отдает историю по возрастанию времени, поэтому переходы уже упорядочены
+    intervals = []
+    status = transitions[0][1] if transitions else current
+    entered = created
+    for changed_at, _, to_status in transitions:
+        intervals.append((sys.intern(status or 'Unknown'), entered, changed_at))
+        status = to_status
+        entered = changed_at
+    intervals.append((sys.intern(status or 'Unknown'), entered, fields.get('resolutiondate')))
+    return intervals
+class StatusIntervalCollector:
+    """
+    Потоковый сбор интервалов статусов из changelog
+    Задачи обрабатываются по одной: интервалы сохраняются в компактных списках,
+    а сам changelog удаляется из задачи, поэтому в памяти не остается JSON истории.
+    """
+    def __init__(self):
+        self.keys: List[str] = []
+        self.statuses: List[str] = []
+        self.entered: List[str] = []
+        self.left: List[Optional[str]] = []
+        self.issues_with_changelog = 0
+    def add(self, key: str, intervals: Iterable[StatusInterval]):
+        """Добавить интервалы задачи"""
+        key = sys.intern(key)
+        for status, entered, left in intervals:
+            self.keys.append(key)
+            self.statuses.append(status)
+            self.entered.append(entered)
+            self.left.append(left)
+    def consume(self, issues: Iterable[Dict]) -> Iterator[Dict]:
+        """
+        Пропустить поток задач через сборщик
+        Args:
+            issues: Задачи JIRA (например, JiraClient.iter_issues(..., expand='changelog'))
+        Yields:
+            Те же задачи без поля changelog
+        """
+        for issue in issues:
+            if 'changelog' in issue:
+                self.issues_with_changelog += 1
+                self.add(issue.get('key', 'UNKNOWN'), extract_status_intervals(issue))
+                del issue['changelog']
+            yield issue
+    def to_frame(self, as_of: Optional[datetime] = None):
+        """
+        Интервалы в виде DataFrame: key, status, entered, left, hours_in_status
+        Args:
+            as_of: Момент, которым заканчиваются интервалы незакрытых задач (по умолчанию - сейчас)
+        """
+        return status_intervals_frame(self.keys, self.statuses, self.entered, self.left, as_of)
+def status_intervals_frame(keys: List[str], statuses: List[str], entered: List[str],
+                           left: List[Optional[str]], as_of: Optional[datetime] = None):
+    """
+    Построить DataFrame интервалов статусов (даты разбираются векторизованно)
+    Интервалы с отрицательной длительностью (например, статус Closed, в который
+    задача перешла уже после даты решения) отбрасываются.
+    """
+    import pandas as pd
+    from .data_processor import parse_jira_timestamps
+    as_of = pd.Timestamp(as_of or datetime.now(timezone.utc))
+    as_of = as_of.tz_localize('UTC') if as_of.tzinfo is None else as_of.tz_convert('UTC')
+    entered_ts, _ = parse_jira_timestamps(pd.Series(entered, dtype=object))
+    left_ts, _ = parse_jira_timestamps(pd.Series(left, dtype=object))
+    left_ts = left_ts.fillna(as_of)
+    df = pd.DataFrame({
+        'key': pd.Series(keys, dtype=object),
+        'status': pd.Series(statuses, dtype=object).astype('category'),
+        'entered': entered_ts,
+        'left': left_ts
+    })
+    df['hours_in_status'] = (df['left'] - df['entered']).dt.total_seconds() / 3600
+    return df[df['hours_in_status'] >= 0].reset_index(drop=True)
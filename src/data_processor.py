@@ -1,201 +1,571 @@
 ﻿import pandas as pd
 import numpy as np
 from datetime import datetime, timedelta
-from typing import List, Dict, Any, Tuple
+from typing import Dict, Any, Tuple, Iterable, Union
 import logging
 from dateutil import parser
 from collections import defaultdict, Counter
+from .issue_store import ISSUE_COLUMNS, JIRA_DATETIME_FORMAT, flatten_issue
+from .records import IssueRecord
 logger = logging.getLogger(__name__)
+# Типы колонок нормализованного DataFrame
+DATETIME_COLUMNS = ['created', 'resolved', 'updated']
+CATEGORY_COLUMNS = ['status', 'priority', 'assignee', 'reporter', 'issuetype']
+# Задачи JIRA (JSON), компактные записи IssueRecord или DataFrame плоских колонок
+IssueSource = Union[Iterable[Dict], Iterable[IssueRecord], pd.DataFrame]
+# ===== РАЗБОР ДАТ: векторизованный быстрый путь =====
+def parse_jira_timestamps(values: Iterable) -> Tuple[pd.Series, int]:
+    """
+    Разобрать колонку дат JIRA в datetime64 (UTC) одним векторизованным вызовом
+    Значения в формате JIRA (2023-01-01T00:00:00.000+0000) разбираются по фиксированному
+    формату; только не подошедшие к нему значения разбираются построчно через dateutil.
+    Args:
+        values: Колонка строк дат (пустые значения допускаются)
+    Returns:
+        (Series datetime64[ns, UTC], количество отброшенных некорректных значений)
+    """
+    series = values if isinstance(values, pd.Series) else pd.Series(list(values), dtype=object)
+    if pd.api.types.is_datetime64_any_dtype(series):
+        parsed = series.dt.tz_localize('UTC') if series.dt.tz is None else series.dt.tz_convert('UTC')
+        return parsed, 0
+    parsed = pd.to_datetime(series, format=JIRA_DATETIME_FORMAT, utc=True, errors='coerce')
+    # Построчный разбор только для значений, не подошедших к формату JIRA
+    failed = parsed.isna() & series.notna()
+    rejects = 0
+    if failed.any():
+        fallback = []
+        for value in series[failed]:
+            try:
+                timestamp = pd.Timestamp(parser.isoparse(str(value)))
+                # Даты без часового пояса считаем UTC
+                timestamp = timestamp.tz_localize('UTC') if timestamp.tzinfo is None else timestamp.tz_convert('UTC')
+                fallback.append(timestamp)
+            except (ValueError, TypeError, OverflowError):
+                fallback.append(pd.NaT)
+                rejects += 1
+        parsed.loc[failed] = pd.to_datetime(pd.Series(fallback, index=series.index[failed], dtype=object), utc=True)
+    if rejects:
+        logger.warning(f"Некорректных дат отброшено: {rejects}")
+    return parsed, rejects
+# ===== НОРМАЛИЗАЦИЯ: единый типизированный DataFrame для всех метрик =====
+def _flat_row(issue) -> Tuple:
+    """Плоская строка ISSUE_COLUMNS из задачи JIRA или записи IssueRecord"""
+    if isinstance(issue, IssueRecord):
+        return issue.as_tuple()
+    flat = flatten_issue(issue)
+    return tuple(flat[column] for column in ISSUE_COLUMNS)
+def normalize_issues(issues: IssueSource) -> pd.DataFrame:
+    """
+    Привести задачи к единому типизированному DataFrame (один проход по данным)
+    Даты разбираются один раз в datetime64 (UTC), статус, приоритет, пользователи
+    и тип задачи становятся категориальными колонками.
+    Args:
+        issues: Задачи JIRA (список или генератор JSON), записи IssueRecord,
+                DataFrame плоских колонок из локального хранилища или уже нормализованный DataFrame
+    Returns:
+        DataFrame с колонками из ISSUE_COLUMNS, присутствующими во входных данных
+    """
+    if isinstance(issues, pd.DataFrame):
+        if issues.attrs.get('normalized'):
+            return issues
+        df = issues.copy()
+    else:
+        df = pd.DataFrame.from_records((_flat_row(issue) for issue in issues), columns=list(ISSUE_COLUMNS))
+    rejects = 0
+    for column in DATETIME_COLUMNS:
+        if column in df.columns:
+            df[column], column_rejects = parse_jira_timestamps(df[column])
+            rejects += column_rejects
+    for column in CATEGORY_COLUMNS:
+        if column in df.columns:
+            df[column] = df[column].astype('category')
+    if 'timespent' in df.columns:
+        df['timespent'] = pd.to_numeric(df['timespent'], errors='coerce')
+    df.attrs['normalized'] = True
+    df.attrs['timestamp_rejects'] = rejects
+    return df
 # ===== ФУНКЦИЯ 1: Время в открытом состоянии (ГОТОВО) =====
-def calculate_open_time(issues: List[Dict]) -> pd.DataFrame:
+def calculate_open_time(issues: IssueSource) -> pd.DataFrame:
     """Рассчитать время в открытом состоянии (от создания до закрытия)"""
-    data = []
-    if not issues:
+    df = normalize_issues(issues)
+    if df.empty:
         print("Внимание: Нет задач для обработки")
         return pd.DataFrame()
-    print(f"Начало обработки {len(issues)} задач...")
-    processed_count = 0
-    error_count = 0
-    for issue in issues:
-        try:
-            fields = issue.get('fields', {})
-            key = issue.get('key', 'UNKNOWN')
-            created = fields.get('created')
-            resolved = fields.get('resolutiondate')
-            if not created or not resolved:
-                continue
-            created_dt = parser.isoparse(created) if hasattr(parser, 'isoparse') else parser.parse(created)
-            resolved_dt = parser.isoparse(resolved) if hasattr(parser, 'isoparse') else parser.parse(resolved)
-            open_hours = (resolved_dt - created_dt).total_seconds() / 3600
-            data.append({
-                'key': key,
-                'created': created_dt,
-                'resolved': resolved_dt,
-                'open_hours': open_hours,
-                'days': open_hours / 24
-            })
-            processed_count += 1
-        except Exception as e:
-            error_count += 1
-            continue
-    if data:
-        df = pd.DataFrame(data)
-        print(f"Успешно обработано: {processed_count} из {len(issues)} задач")
-        return df
-    else:
+    print(f"Начало обработки {len(df)} задач...")
+    closed = df[df['created'].notna() & df['resolved'].notna()]
+    if closed.empty:
         print("Не удалось обработать ни одной задачи")
         return pd.DataFrame()
+    open_hours = (closed['resolved'] - closed['created']).dt.total_seconds() / 3600
+    result = pd.DataFrame({
+        'key': closed['key'].fillna('UNKNOWN').to_numpy(),
+        'created': closed['created'].to_numpy(),
+        'resolved': closed['resolved'].to_numpy(),
+        'open_hours': open_hours.to_numpy(),
+        'days': (open_hours / 24).to_numpy()
+    })
+    print(f"Успешно обработано: {len(result)} из {len(df)} задач")
+    return result
 # ===== ФУНКЦИЯ 2: Распределение по приоритетам =====
-def calculate_priority_distribution(issues: List[Dict]) -> pd.DataFrame:
+def calculate_priority_distribution(issues: IssueSource) -> pd.DataFrame:
     """Рассчитать распределение задач по приоритетам"""
-    priority_count = {}
-    for issue in issues:
-        try:
-            priority = issue['fields'].get('priority', {})
-            if priority:
-                priority_name = priority.get('name', 'Unknown')
-                priority_count[priority_name] = priority_count.get(priority_name, 0) + 1
-        except:
-            continue
-    if priority_count:
-        df = pd.DataFrame({
-            'priority': list(priority_count.keys()),
-            'count': list(priority_count.values())
-        }).sort_values('count', ascending=False)
-        print(f"Найдено приоритетов: {len(df)}")
-        return df
-    return pd.DataFrame()
+    df = normalize_issues(issues)
+    if df.empty:
+        return pd.DataFrame()
+    counts = df['priority'].value_counts(sort=False)
+    counts = counts[counts > 0]
+    if counts.empty:
+        return pd.DataFrame()
+    result = pd.DataFrame({
+        'priority': counts.index.astype(object),
+        'count': counts.to_numpy()
+    }).sort_values('count', ascending=False, kind='stable')
+    print(f"Найдено приоритетов: {len(result)}")
+    return result
 # ===== ФУНКЦИЯ 3: Топ пользователей =====
-def calculate_top_users(issues: List[Dict], top_n: int = 30) -> pd.DataFrame:
-    """Топ пользователей (исполнитель и репортер)"""
-    user_stats = defaultdict(lambda: {'reporter': 0, 'assignee': 0, 'total': 0})
-    for issue in issues:
-        try:
-            fields = issue['fields']
-            # Репортер
-            reporter = fields.get('reporter')
-            if reporter:
-                reporter_name = reporter.get('displayName', reporter.get('name', 'Unknown'))
-                user_stats[reporter_name]['reporter'] += 1
-                user_stats[reporter_name]['total'] += 1
-            # Исполнитель
-            assignee = fields.get('assignee')
-            if assignee:
-                assignee_name = assignee.get('displayName', assignee.get('name', 'Unknown'))
-                user_stats[assignee_name]['assignee'] += 1
-                user_stats[assignee_name]['total'] += 1
-        except Exception as e:
-            continue
-    if user_stats:
-        data = []
-        for user, stats in user_stats.items():
-            data.append({
-                'user': user,
-                'as_reporter': stats['reporter'],
-                'as_assignee': stats['assignee'],
-                'total_tasks': stats['total']
-            })
-        df = pd.DataFrame(data)
-        df = df.sort_values('total_tasks', ascending=False).head(top_n)
-        print(f"Найдено пользователей: {len(user_stats)}, топ {top_n}")
-        return df
-    return pd.DataFrame()
+# Веса задач для рейтинга пользователей: None - все задачи, 'resolved' - только закрытые,
+# 'timespent' - затраченное время (в часах)
+TOP_USER_WEIGHTS = (None, 'resolved', 'timespent')
+def _issue_weights(df: pd.DataFrame, weight: str = None) -> np.ndarray:
+    if weight is None:
+        return np.ones(len(df))
+    if weight == 'resolved':
+        return df['resolved'].notna().to_numpy(dtype=float)
+    if weight == 'timespent':
+        return df['timespent'].fillna(0).to_numpy(dtype=float) / 3600
+    raise ValueError(f"Неподдерживаемый вес: {weight} (допустимо: {TOP_USER_WEIGHTS})")
+def calculate_top_users(issues: IssueSource, top_n: int = 30, weight: str = None) -> pd.DataFrame:
+    """
+    Топ пользователей (исполнитель и репортер)
+    Подсчет идет по кодам категорий (np.bincount), а топ выбирается частичной
+    сортировкой (np.argpartition) без сортировки всех пользователей.
+    Args:
+        issues: Задачи JIRA или нормализованный DataFrame
+        top_n: Количество пользователей в топе
+        weight: Вес задачи: None, 'resolved' или 'timespent' (см. TOP_USER_WEIGHTS)
+    Returns:
+        DataFrame: user, as_reporter, as_assignee, total_tasks (с учетом веса)
+    """
+    df = normalize_issues(issues)
+    if df.empty:
+        return pd.DataFrame()
+    weights = _issue_weights(df, weight)
+    # Общий словарь пользователей для репортеров и исполнителей
+    users = df['reporter'].cat.categories.union(df['assignee'].cat.categories)
+    if users.empty:
+        return pd.DataFrame()
+    reporter_codes = pd.Categorical(df['reporter'], categories=users).codes
+    assignee_codes = pd.Categorical(df['assignee'], categories=users).codes
+    def count(codes: np.ndarray) -> np.ndarray:
+        mask = codes >= 0
+        return np.bincount(codes[mask], weights=weights[mask], minlength=len(users))
+    as_reporter = count(reporter_codes)
+    as_assignee = count(assignee_codes)
+    total = as_reporter + as_assignee
+    candidates = np.flatnonzero(total > 0)
+    if candidates.size == 0:
+        return pd.DataFrame()
+    n = min(top_n, candidates.size)
+    top = candidates[np.argpartition(-total[candidates], n - 1)[:n]]
+    # Внутри топа: по убыванию итога, при равенстве - по имени
+    names = users.to_numpy(dtype=object)
+    top = top[np.lexsort((names[top].astype(str), -total[top]))]
+    dtype = float if weight == 'timespent' else int
+    result = pd.DataFrame({
+        'user': names[top],
+        'as_reporter': as_reporter[top].astype(dtype),
+        'as_assignee': as_assignee[top].astype(dtype),
+        'total_tasks': total[top].astype(dtype)
+    })
+    result.attrs['weight'] = weight
+    print(f"Найдено пользователей: {candidates.size}, топ {top_n}")
+    return result
 # ===== ФУНКЦИЯ 4: Статистика по дням =====
-def calculate_daily_issues_stats(issues: List[Dict]) -> pd.DataFrame:
-    """Рассчитать статистику по дням (с накопительным итогом)"""
-    daily_created = defaultdict(int)
-    daily_resolved = defaultdict(int)
-    for issue in issues:
-        try:
-            fields = issue['fields']
-            # Созданные задачи
-            created = fields.get('created')
-            if created:
-                created_dt = parser.isoparse(created) if hasattr(parser, 'isoparse') else parser.parse(created)
-                created_date = created_dt.date()
-                daily_created[created_date] += 1
-            # Закрытые задачи
-            resolved = fields.get('resolutiondate')
-            if resolved:
-                resolved_dt = parser.isoparse(resolved) if hasattr(parser, 'isoparse') else parser.parse(resolved)
-                resolved_date = resolved_dt.date()
-                daily_resolved[resolved_date] += 1
-        except Exception:
-            continue
-    if not daily_created and not daily_resolved:
-        return pd.DataFrame()
-    # Объединяем все даты
-    all_dates = set(list(daily_created.keys()) + list(daily_resolved.keys()))
-    all_dates = sorted(list(all_dates))
-    data = []
-    created_cumulative = 0
-    resolved_cumulative = 0
-    for date in all_dates:
-        created_today = daily_created.get(date, 0)
-        resolved_today = daily_resolved.get(date, 0)
-        created_cumulative += created_today
-        resolved_cumulative += resolved_today
-        data.append({
-            'date': date,
-            'created_today': created_today,
-            'resolved_today': resolved_today,
-            'created_cumulative': created_cumulative,
-            'resolved_cumulative': resolved_cumulative,
-            'open_cumulative': created_cumulative - resolved_cumulative
-        })
-    df = pd.DataFrame(data)
-    print(f"Статистика по {len(df)} дням")
-    return df
+# Поддерживаемая детализация статистики: код периода pandas -> подпись
+DAILY_FREQUENCIES = {'D': 'дням', 'W': 'неделям', 'M': 'месяцам', 'Q': 'кварталам', 'Y': 'годам'}
+def _count_by_period(values: pd.Series, freq: str) -> pd.Series:
+    """Количество дат в каждом периоде (индекс - pandas.Period)"""
+    values = values.dropna()
+    if values.dt.tz is not None:
+        values = values.dt.tz_convert(None)
+    return values.dt.to_period(freq).value_counts(sort=False)
+def calculate_daily_issues_stats(issues: IssueSource, fill_gaps: bool = False, freq: str = 'D') -> pd.DataFrame:
+    """
+    Рассчитать статистику по дням (с накопительным итогом)
+    Args:
+        issues: Задачи JIRA или нормализованный DataFrame
+        fill_gaps: Включить периоды без созданных и закрытых задач (непрерывный календарь)
+        freq: Детализация: 'D' - дни, 'W' - недели, 'M' - месяцы, 'Q' - кварталы, 'Y' - годы
+    Returns:
+        DataFrame: date (начало периода), created_today, resolved_today и накопительные итоги
+    """
+    if freq not in DAILY_FREQUENCIES:
+        raise ValueError(f"Неподдерживаемая детализация: {freq} (допустимо: {', '.join(DAILY_FREQUENCIES)})")
+    df = normalize_issues(issues)
+    if df.empty:
+        return pd.DataFrame()
+    created_counts = _count_by_period(df['created'], freq)
+    resolved_counts = _count_by_period(df['resolved'], freq)
+    if created_counts.empty and resolved_counts.empty:
+        return pd.DataFrame()
+    # Объединяем все периоды
+    daily = pd.concat([created_counts.rename('created_today'), resolved_counts.rename('resolved_today')], axis=1)
+    daily = daily.sort_index()
+    if fill_gaps:
+        daily = daily.reindex(pd.period_range(daily.index.min(), daily.index.max(), freq=freq))
+    daily = daily.fillna(0).astype(int)
+    result = pd.DataFrame({
+        'date': daily.index.start_time.date,
+        'created_today': daily['created_today'].to_numpy(),
+        'resolved_today': daily['resolved_today'].to_numpy(),
+        'created_cumulative': daily['created_today'].cumsum().to_numpy(),
+        'resolved_cumulative': daily['resolved_today'].cumsum().to_numpy()
+    })
+    result['open_cumulative'] = result['created_cumulative'] - result['resolved_cumulative']
+    result.attrs['freq'] = freq
+    print(f"Статистика по {len(result)} {DAILY_FREQUENCIES[freq]}")
+    return result
+# Прореживание статистики по дням для графика: укрупнение периодов или LTTB
+DOWNSAMPLE_METHODS = ('aggregate', 'lttb')
+DAILY_COUNT_COLUMNS = ['created_today', 'resolved_today']
+DAILY_CUMULATIVE_COLUMNS = ['created_cumulative', 'resolved_cumulative', 'open_cumulative']
+def lttb_indices(x: np.ndarray, y: np.ndarray, threshold: int) -> np.ndarray:
+    """
+    Отбор точек ряда методом Largest-Triangle-Three-Buckets
+    Ряд делится на threshold - 2 корзины; из каждой берется точка, образующая
+    наибольший треугольник с предыдущей выбранной точкой и средним следующей
+    корзины - пики и перегибы сохраняются. Первая и последняя точки входят всегда.
+    Returns:
+        Возрастающие индексы выбранных точек
+    """
+    n = len(y)
+    if threshold >= n or n < 3:
+        return np.arange(n)
+    threshold = max(3, threshold)
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    bounds = np.floor(np.linspace(1, n - 1, threshold - 1)).astype(np.int64)
+    selected = np.empty(threshold, dtype=np.int64)
+    selected[0], selected[-1] = 0, n - 1
+    a = 0
+    for i in range(threshold - 2):
+        start, end = bounds[i], bounds[i + 1]
+        next_end = bounds[i + 2] if i + 2 < len(bounds) else n
+        avg_x, avg_y = x[end:next_end].mean(), y[end:next_end].mean()
+        area = np.abs((x[a] - avg_x) * (y[start:end] - y[a]) - (x[a] - x[start:end]) * (avg_y - y[a]))
+        a = start + int(np.argmax(area))
+        selected[i + 1] = a
+    return selected
+def downsample_daily_stats(daily: pd.DataFrame, max_points: int = 500, method: str = 'aggregate') -> pd.DataFrame:
+    """
+    Сократить статистику по дням до max_points точек для графика
+    aggregate - укрупнить периоды (неделя, месяц, квартал, год) до первого, при котором
+    точек не больше max_points (не крупнее года): количества суммируются, накопительные итоги берутся
+    на конец периода. lttb - оставить точки, выбранные LTTB по созданным и закрытым
+    задачам. В обоих случаях накопительные итоги в оставшихся точках и последний итог точные.
+    Args:
+        daily: Результат calculate_daily_issues_stats
+        max_points: Бюджет точек (None или 0 - без прореживания)
+        method: 'aggregate' или 'lttb'
+    Returns:
+        DataFrame тех же колонок; attrs['downsampled'] - метод и исходное число точек
+    """
+    if method not in DOWNSAMPLE_METHODS:
+        raise ValueError(f"Неизвестный метод прореживания: {method} (допустимо: {', '.join(DOWNSAMPLE_METHODS)})")
+    if daily.empty or not max_points or len(daily) <= max_points:
+        return daily
+    dates = pd.to_datetime(daily['date'])
+    freq = daily.attrs.get('freq', 'D')
+    coarser = list(DAILY_FREQUENCIES)[list(DAILY_FREQUENCIES).index(freq) + 1:] if freq in DAILY_FREQUENCIES else []
+    if method == 'aggregate' and coarser:
+        for freq in coarser:
+            periods = dates.dt.to_period(freq)
+            if periods.nunique() <= max_points:
+                break
+        grouped = daily.groupby(periods.to_numpy(), sort=True)
+        counts = grouped[DAILY_COUNT_COLUMNS].sum()
+        # Строки отсортированы по дате: последняя строка периода - итог на его конец
+        cumulative = grouped[DAILY_CUMULATIVE_COLUMNS].last()
+        result = pd.concat([counts, cumulative], axis=1)
+        result.insert(0, 'date', pd.PeriodIndex(result.index).start_time.date)
+        result = result.reset_index(drop=True)
+    else:
+        # Самый крупный период уже достигнут - прореживаем по форме ряда
+        x = dates.to_numpy(dtype='datetime64[s]').astype(np.int64)
+        budget = max(3, max_points // len(DAILY_COUNT_COLUMNS))
+        indices = np.unique(np.concatenate([lttb_indices(x, daily[column].to_numpy(), budget)
+                                            for column in DAILY_COUNT_COLUMNS]))
+        result = daily.iloc[indices].reset_index(drop=True)
+        method = 'lttb'
+    result.attrs = {**daily.attrs, 'freq': freq, 'downsampled': {'method': method, 'points': len(daily)}}
+    return result
 # ===== ФУНКЦИЯ 5: Затраченное время =====
-def calculate_time_spent_distribution(issues: List[Dict]) -> pd.DataFrame:
+def calculate_time_spent_distribution(issues: IssueSource) -> pd.DataFrame:
     """Распределение затраченного времени (на основе logged time)"""
-    time_spent_data = []
-    for issue in issues:
-        try:
-            fields = issue['fields']
-            key = issue['key']
-            # Время из поля timespent (в секундах)
-            timespent = fields.get('timespent')
-            if timespent:
-                hours = timespent / 3600  # Конвертируем в часы
-                time_spent_data.append({
-                    'key': key,
-                    'hours_spent': hours,
-                    'days_spent': hours / 24
-                })
-        except Exception:
-            continue
-    if time_spent_data:
-        df = pd.DataFrame(time_spent_data)
-        print(f"Найдено задач с logged time: {len(df)}")
-        return df
-    return pd.DataFrame()
+    df = normalize_issues(issues)
+    if df.empty:
+        return pd.DataFrame()
+    # Время из поля timespent (в секундах)
+    logged = df[df['timespent'].fillna(0) != 0]
+    if logged.empty:
+        return pd.DataFrame()
+    hours = logged['timespent'].to_numpy(dtype=float) / 3600  # Конвертируем в часы
+    result = pd.DataFrame({
+        'key': logged['key'].to_numpy(),
+        'hours_spent': hours,
+        'days_spent': hours / 24
+    })
+    print(f"Найдено задач с logged time: {len(result)}")
+    return result
+# ===== Сводки распределений: гистограмма, KDE и box plot для графиков 1 и 5 =====
+# Сколько выбросов box plot хранится в сводке (крайние значения и равномерная выборка между ними)
+MAX_FLIERS = 200
+def _spread_sample(sorted_values: np.ndarray, limit: int) -> np.ndarray:
+    """Не больше limit значений отсортированного массива, равномерно, с первым и последним"""
+    if len(sorted_values) <= limit:
+        return sorted_values
+    return sorted_values[np.unique(np.linspace(0, len(sorted_values) - 1, limit).round().astype(np.int64))]
+def box_summary(values, whis: float = 1.5, max_fliers: int = MAX_FLIERS, label: str = '') -> Dict[str, Any]:
+    """
+    Пятичисловая сводка для matplotlib Axes.bxp (те же правила, что у boxplot)
+    Args:
+        values: Значения (NaN пропускаются)
+        whis: Длина усов в межквартильных размахах
+        max_fliers: Сколько выбросов сохранить (крайние - всегда)
+        label: Подпись ящика
+    Returns:
+        Словарь med, q1, q3, whislo, whishi, mean, fliers, label, count, outliers (пустой, если значений нет)
+    """
+    values = np.asarray(values, dtype=float)
+    values = values[~np.isnan(values)]
+    if not len(values):
+        return {}
+    q1, med, q3 = np.percentile(values, [25, 50, 75])
+    low, high = q1 - whis * (q3 - q1), q3 + whis * (q3 - q1)
+    inside = values[(values >= low) & (values <= high)]
+    fliers = values[(values < low) | (values > high)]
+    return {
+        'label': label,
+        'med': float(med),
+        'q1': float(q1),
+        'q3': float(q3),
+        'whislo': float(inside.min()) if len(inside) else float(q1),
+        'whishi': float(inside.max()) if len(inside) else float(q3),
+        'mean': float(values.mean()),
+        'fliers': _spread_sample(np.sort(fliers), max_fliers).tolist(),
+        'count': int(len(values)),
+        'outliers': int(len(fliers)),
+    }
+def kde_curve(values, grid_size: int = 256) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Оценка плотности (гауссово ядро, ширина по правилу Скотта) на равномерной сетке в диапазоне данных
+    Значения раскладываются по сетке линейным биннингом, свертка с ядром выполняется через FFT:
+    стоимость зависит от размера сетки, а не от количества значений.
+    Returns:
+        (x, плотность); пустые массивы, если значений меньше двух или все они равны
+    """
+    values = np.asarray(values, dtype=float)
+    values = values[~np.isnan(values)]
+    n = len(values)
+    if n < 2 or values.min() == values.max():
+        return np.array([]), np.array([])
+    bandwidth = values.std(ddof=1) * n ** (-1 / 5)
+    grid = np.linspace(values.min(), values.max(), grid_size)
+    delta = grid[1] - grid[0]
+    position = (values - grid[0]) / delta
+    index = np.minimum(position.astype(np.int64), grid_size - 2)
+    fraction = position - index
+    counts = (np.bincount(index, weights=1 - fraction, minlength=grid_size)
+              + np.bincount(index + 1, weights=fraction, minlength=grid_size))
+    # Ядро не уже шага сетки; нули по краям исключают циклический перенос при свертке
+    sigma = max(bandwidth / delta, 0.5)
+    half = min(int(np.ceil(4 * sigma)), grid_size)
+    offsets = np.arange(-half, half + 1)
+    kernel = np.exp(-0.5 * (offsets / sigma) ** 2)
+    kernel /= kernel.sum()
+    size = grid_size + 2 * half
+    smoothed = np.fft.irfft(np.fft.rfft(counts, size) * np.fft.rfft(kernel, size), size)[half:half + grid_size]
+    return grid, np.maximum(smoothed, 0) / (n * delta)
+def summarize_distribution(data: pd.DataFrame, column: str, bins: int = 30, log_bins: bool = False,
+                           kde: bool = False) -> pd.DataFrame:
+    """
+    Сводка распределения колонки для графика: гистограмма, KDE и box plot
+    Args:
+        data: DataFrame со значениями (например, calculate_open_time)
+        column: Колонка значений
+        bins: Количество интервалов гистограммы
+        log_bins: Логарифмические интервалы (от min + 0.1 до max + 1, для логарифмической оси)
+        kde: Рассчитать оценку плотности (kde_curve)
+    Returns:
+        DataFrame интервалов: left, right, count; attrs: distribution (колонка), total,
+        mean, median, log_bins, box (box_summary), kde ({'x', 'y'} - плотность или None)
+    """
+    if data.empty or column not in data.columns:
+        return pd.DataFrame()
+    values = data[column].to_numpy(dtype=float)
+    values = values[~np.isnan(values)]
+    if not len(values):
+        return pd.DataFrame()
+    if log_bins:
+        edges = np.logspace(np.log10(values.min() + 0.1), np.log10(values.max() + 1), bins + 1)
+    else:
+        edges = np.histogram_bin_edges(values, bins=bins)
+    counts, edges = np.histogram(values, bins=edges)
+    result = pd.DataFrame({'left': edges[:-1], 'right': edges[1:], 'count': counts})
+    density = None
+    if kde:
+        x, y = kde_curve(values)
+        density = {'x': x.tolist(), 'y': y.tolist()} if len(x) else None
+    result.attrs = {
+        'distribution': column,
+        'total': int(len(values)),
+        'mean': float(values.mean()),
+        'median': float(np.median(values)),
+        'log_bins': log_bins,
+        'box': box_summary(values),
+        'kde': density,
+    }
+    return result
 # ===== ФУНКЦИЯ 6: Распределение по состояниям =====
-def calculate_status_time_distribution(issues: List[Dict]) -> pd.DataFrame:
-    """Распределение времени по состояниям задачи (упрощенная версия)"""
-    status_data = []
-    for issue in issues:
-        try:
-            fields = issue['fields']
-            key = issue['key']
-            # Текущий статус
-            status = fields.get('status', {}).get('name', 'Unknown')
-            # Время в открытом состоянии (из уже рассчитанного)
-            created = fields.get('created')
-            resolved = fields.get('resolutiondate')
-            if created and resolved:
-                created_dt = parser.isoparse(created) if hasattr(parser, 'isoparse') else parser.parse(created)
-                resolved_dt = parser.isoparse(resolved) if hasattr(parser, 'isoparse') else parser.parse(resolved)
-                open_hours = (resolved_dt - created_dt).total_seconds() / 3600
-                status_data.append({
-                    'key': key,
-                    'status': status,
-                    'hours_in_status': open_hours
-                })
-        except Exception:
-            continue
-    if status_data:
-        df = pd.DataFrame(status_data)
-        print(f"Статусы обработаны для {len(df)} задач")
-        return df
-    return pd.DataFrame()
+def calculate_status_time_distribution(issues: IssueSource, intervals: pd.DataFrame = None) -> pd.DataFrame:
+    """
+    Распределение времени по состояниям задачи
+    Если доступны интервалы статусов из changelog (StatusIntervalCollector), время
+    суммируется по каждой паре (задача, статус). Иначе используется упрощенная
+    оценка: весь период от создания до закрытия относится к текущему статусу.
+    Args:
+        issues: Задачи JIRA или нормализованный DataFrame
+        intervals: Интервалы статусов (key, status, hours_in_status) или None
+    Returns:
+        DataFrame: key, status, hours_in_status
+    """
+    if (intervals is None and isinstance(issues, list) and issues and isinstance(issues[0], dict)
+            and 'changelog' in issues[0]):
+        # Сырые задачи с changelog: интервалы собираются потоково, без копирования истории
+        from .changelog import StatusIntervalCollector
+        collector = StatusIntervalCollector()
+        for _ in collector.consume(dict(issue) for issue in issues):
+            pass
+        intervals = collector.to_frame()
+    if intervals is not None and not intervals.empty:
+        result = (intervals.groupby(['key', 'status'], observed=True, sort=False)['hours_in_status']
+                  .sum().reset_index())
+        result['status'] = result['status'].astype(object)
+        print(f"Статусы по changelog: {len(intervals)} интервалов, {result['key'].nunique()} задач")
+        return result
+    df = normalize_issues(issues)
+    if df.empty:
+        return pd.DataFrame()
+    # Время в открытом состоянии относится к текущему статусу
+    closed = df[df['created'].notna() & df['resolved'].notna()]
+    if closed.empty:
+        return pd.DataFrame()
+    status = closed['status'].astype(object).fillna('Unknown')
+    result = pd.DataFrame({
+        'key': closed['key'].to_numpy(),
+        'status': status.to_numpy(),
+        'hours_in_status': ((closed['resolved'] - closed['created']).dt.total_seconds() / 3600).to_numpy()
+    })
+    print(f"Статусы обработаны для {len(result)} задач (без changelog - по текущему статусу)")
+    return result
+def summarize_status_times(status_data: pd.DataFrame, whis: float = 1.5,
+                           max_fliers: int = MAX_FLIERS) -> pd.DataFrame:
+    """
+    Сводка box plot времени в статусах для графика 6 (одна строка на статус)
+    Квартили, усы и количества считаются одним групповым проходом по всем строкам;
+    выбросов на статус сохраняется не больше max_fliers (крайние - всегда).
+    Args:
+        status_data: Результат calculate_status_time_distribution (status, hours_in_status)
+        whis: Длина усов в межквартильных размахах
+        max_fliers: Сколько выбросов сохранить на статус
+    Returns:
+        DataFrame: status, count, mean, q1, med, q3, whislo, whishi, outliers - по убыванию медианы;
+        attrs: box_stats (колонка значений), fliers ({статус: [значения]})
+    """
+    if status_data.empty:
+        return pd.DataFrame()
+    data = status_data[['status', 'hours_in_status']].dropna()
+    if data.empty:
+        return pd.DataFrame()
+    status = data['status'].astype(object).to_numpy()
+    hours = data['hours_in_status'].to_numpy(dtype=float)
+    grouped = pd.Series(hours).groupby(status, sort=False)
+    quantiles = grouped.quantile([0.25, 0.5, 0.75]).unstack()
+    quantiles.columns = ['q1', 'med', 'q3']
+    result = pd.concat([grouped.size().rename('count'), grouped.mean().rename('mean'), quantiles], axis=1)
+    # Границы усов каждой строки по квартилям ее статуса
+    q1 = result['q1'].reindex(status).to_numpy()
+    q3 = result['q3'].reindex(status).to_numpy()
+    inside = (hours >= q1 - whis * (q3 - q1)) & (hours <= q3 + whis * (q3 - q1))
+    whiskers = pd.Series(hours[inside]).groupby(status[inside], sort=False).agg(['min', 'max'])
+    result['whislo'] = whiskers['min'].reindex(result.index).fillna(result['q1'])
+    result['whishi'] = whiskers['max'].reindex(result.index).fillna(result['q3'])
+    result['outliers'] = pd.Series(~inside).groupby(status, sort=False).sum().reindex(result.index)
+    result = result.sort_values('med', ascending=False)
+    fliers = {}
+    outlier_hours = pd.Series(hours[~inside]).groupby(status[~inside], sort=False)
+    for name, values in outlier_hours:
+        fliers[name] = _spread_sample(np.sort(values.to_numpy()), max_fliers).tolist()
+    result.index.name = 'status'
+    result = result.reset_index()
+    result['count'] = result['count'].astype(int)
+    result['outliers'] = result['outliers'].astype(int)
+    result.attrs = {'box_stats': 'hours_in_status', 'fliers': fliers}
+    return result
+# ===== ЖУРНАЛ РАБОТ: трудозатраты по пользователям и дням =====
+def calculate_worklog_effort(worklogs: pd.DataFrame, by: str = 'author') -> pd.DataFrame:
+    """
+    Трудозатраты по таблице записей журнала работ (WorklogCollector.to_frame)
+    Args:
+        worklogs: DataFrame с колонками key, author, started, seconds, hours
+        by: 'author' - по пользователям, 'day' - по дням (UTC)
+    Returns:
+        DataFrame: author|date, hours, entries, issues (по убыванию часов для author, по датам для day)
+    """
+    if worklogs is None or worklogs.empty:
+        return pd.DataFrame()
+    if by == 'author':
+        group = worklogs['author'].astype(object).rename('author')
+    elif by == 'day':
+        group = worklogs['started'].dt.floor('D').dt.date.rename('date')
+    else:
+        raise ValueError(f"Неподдерживаемая группировка: {by} (допустимо: author, day)")
+    grouped = worklogs.groupby(group, sort=(by == 'day'))
+    result = pd.DataFrame({
+        'hours': grouped['hours'].sum(),
+        'entries': grouped.size(),
+        'issues': grouped['key'].nunique()
+    }).reset_index()
+    if by == 'author':
+        result = result.sort_values('hours', ascending=False, kind='stable').reset_index(drop=True)
+    print(f"Журнал работ: {len(worklogs)} записей, групп ({by}): {len(result)}")
+    return result
+# ===== Сводка по проекту (для сравнения нескольких проектов) =====
+def calculate_project_summary(issues: IssueSource) -> Dict[str, Any]:
+    """
+    Основные показатели проекта одной строкой
+    Args:
+        issues: Задачи проекта (в любом виде, принимаемом normalize_issues)
+    Returns:
+        Словарь: issues, resolved, open_hours_mean, open_hours_median,
+        open_hours_p90, first_created, last_created (None, если данных нет)
+    """
+    df = normalize_issues(issues)
+    summary = {'issues': len(df), 'resolved': 0, 'open_hours_mean': None, 'open_hours_median': None,
+               'open_hours_p90': None, 'first_created': None, 'last_created': None}
+    if df.empty:
+        return summary
+    if 'created' in df.columns:
+        created = df['created'].dropna()
+        if not created.empty:
+            summary['first_created'] = created.min().date().isoformat()
+            summary['last_created'] = created.max().date().isoformat()
+        if 'resolved' in df.columns:
+            closed = df['created'].notna() & df['resolved'].notna()
+            open_hours = (df.loc[closed, 'resolved'] - df.loc[closed, 'created']).dt.total_seconds() / 3600
+            summary['resolved'] = int(closed.sum())
+            if not open_hours.empty:
+                summary['open_hours_mean'] = round(float(open_hours.mean()), 1)
+                summary['open_hours_median'] = round(float(open_hours.median()), 1)
+                summary['open_hours_p90'] = round(float(open_hours.quantile(0.9)), 1)
+    return summary
@@ -0,0 +1,143 @@
+﻿import logging
+import random
+import threading
+import time
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from typing import Dict, Optional
+import requests
+logger = logging.getLogger(__name__)
+# Ответы, после которых запрос имеет смысл повторить
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+def parse_retry_after(value: Optional[str], now: Optional[datetime] = None) -> Optional[float]:
+    """
+    Разобрать заголовок Retry-After: число секунд или HTTP-дата
+    Returns:
+        Задержка в секундах или None, если заголовка нет или он некорректен
+    """
+    if not value:
+        return None
+    value = value.strip()
+    if value.isdigit():
+        return float(value)
+    try:
+        retry_at = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if retry_at.tzinfo is None:
+        retry_at = retry_at.replace(tzinfo=timezone.utc)
+    now = now or datetime.now(timezone.utc)
+    return max(0.0, (retry_at - now).total_seconds())
+class TokenBucket:
+    """Ограничитель частоты запросов (token bucket), общий для всех потоков клиента"""
+    def __init__(self, rate: Optional[float] = None, burst: Optional[int] = None):
+        """
+        Инициализация ограничителя
+        Args:
+            rate: Запросов в секунду (None или 0 - без ограничения)
+            burst: Размер корзины - сколько запросов можно отправить подряд (по умолчанию max(1, rate))
+        """
+        self.rate = rate or 0
+        self.capacity = float(burst or max(1, int(self.rate)))
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._paused_until = 0.0
+        self._lock = threading.Lock()
+    def pause(self, seconds: float):
+        """Приостановить выдачу токенов всем потокам (например, по Retry-After ответа 429)"""
+        with self._lock:
+            self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+    def acquire(self):
+        """Дождаться разрешения на очередной запрос"""
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                if now < self._paused_until:
+                    wait = self._paused_until - now
+                elif not self.rate:
+                    return
+                else:
+                    self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                    self._updated = now
+                    if self._tokens >= 1:
+                        self._tokens -= 1
+                        return
+                    wait = (1 - self._tokens) / self.rate
+            time.sleep(wait)
+class HttpTransport:
+    """HTTP-транспорт клиента JIRA: пул соединений, ограничение частоты и повторы с отсрочкой"""
+    def __init__(self, pool_size: int = 10, max_retries: int = 3, backoff_factor: float = 0.5,
+                 backoff_max: float = 60.0, rate_limit: Optional[float] = None,
+                 rate_burst: Optional[int] = None):
+        """
+        Инициализация транспорта
+        Args:
+            pool_size: Размер пула keep-alive соединений (не меньше числа потоков загрузки)
+            max_retries: Количество повторов после 429/5xx и сетевых ошибок (0 - без повторов)
+            backoff_factor: Базовая задержка повтора: backoff_factor * 2 ** номер попытки
+            backoff_max: Максимальная задержка между попытками (и для Retry-After) в секундах
+            rate_limit: Ограничение запросов в секунду (None - без ограничения)
+            rate_burst: Сколько запросов можно отправить подряд без ожидания
+        """
+        self.max_retries = max(0, max_retries)
+        self.backoff_factor = backoff_factor
+        self.backoff_max = backoff_max
+        self.limiter = TokenBucket(rate_limit, rate_burst)
+        self.stats = {'requests': 0, 'retries': 0, 'throttled': 0}
+        # Получено байт тела ответов (считает клиент после чтения ответа)
+        self.bytes_received = 0
+        self._stats_lock = threading.Lock()
+        self.session = requests.Session()
+        # Пул должен вмещать все потоки, иначе соединения будут закрываться и открываться заново;
+        # pool_block не дает лишним потокам открывать соединения сверх пула
+        adapter = requests.adapters.HTTPAdapter(pool_connections=1, pool_maxsize=max(1, pool_size),
+                                                pool_block=True, max_retries=0)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+    def _count(self, name: str):
+        with self._stats_lock:
+            self.stats[name] += 1
+    def count_bytes(self, size: int):
+        with self._stats_lock:
+            self.bytes_received += size
+    def _backoff(self, attempt: int) -> float:
+        """Экспоненциальная задержка со случайным разбросом (чтобы потоки не повторяли синхронно)"""
+        delay = min(self.backoff_max, self.backoff_factor * (2 ** attempt))
+        return delay * random.uniform(0.5, 1.0)
+    def get(self, url: str, params: Optional[Dict] = None, timeout: float = 30,
+            stream: bool = False) -> requests.Response:
+        """
+        GET-запрос с ограничением частоты и повторами
+        Повторяются сетевые ошибки, таймауты и ответы 429/5xx; задержка берется из
+        Retry-After, а при его отсутствии - экспоненциальная. Ответ 429 приостанавливает
+        все потоки клиента. После исчерпания попыток возвращается последний ответ
+        (или поднимается последнее сетевое исключение). stream=True - тело ответа
+        читается потоком (response.raw).
+        """
+        attempt = 0
+        while True:
+            self.limiter.acquire()
+            self._count('requests')
+            try:
+                response = self.session.get(url, params=params, timeout=timeout, stream=stream)
+            except (requests.exceptions.ConnectionError, requests.exceptions.Timeout) as e:
+                if attempt >= self.max_retries:
+                    raise
+                delay = self._backoff(attempt)
+                logger.warning(f"{type(e).__name__} для {url}, повтор через {delay:.1f} с")
+            else:
+                status = getattr(response, 'status_code', 200)
+                if status not in RETRY_STATUSES or attempt >= self.max_retries:
+                    return response
+                retry_after = parse_retry_after(getattr(response, 'headers', {}).get('Retry-After'))
+                # Освобождаем соединение (при stream=True тело еще не прочитано)
+                if hasattr(response, 'close'):
+                    response.close()
+                delay = min(self.backoff_max, retry_after) if retry_after is not None else self._backoff(attempt)
+                if status == 429:
+                    self._count('throttled')
+                    self.limiter.pause(delay)
+                logger.warning(f"HTTP {status} для {url}, повтор через {delay:.1f} с")
+            self._count('retries')
+            attempt += 1
+            time.sleep(delay)
@@ -0,0 +1,273 @@
+﻿"""
+Инструментирование стадий запуска: время, CPU, количество элементов, байты и память
+Каждая стадия (загрузка, нормализация, расчет метрики, построение графика)
+оборачивается в span - контекстный менеджер или декоратор. Итог сохраняется
+в JSON-отчет о запуске. Для одной выбранной стадии можно снять профиль
+cProfile (файл .prof и самые затратные функции) или tracemalloc (крупнейшие
+места выделения памяти).
+"""
+import cProfile
+import fnmatch
+import json
+import os
+import platform
+import pstats
+import re
+import sys
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
+from datetime import datetime
+from functools import wraps
+from typing import Any, Dict, Iterator, List, Optional
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+PROFILE_MODES = ('cprofile', 'tracemalloc')
+def peak_rss_mb() -> Optional[float]:
+    """Пиковый объем резидентной памяти процесса в МБ (None, если недоступен)"""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux отдает килобайты, macOS - байты
+    return round(peak / (1024 * 1024 if sys.platform == 'darwin' else 1024), 1)
+def timed_call(func, *args, **kwargs):
+    """
+    Выполнить функцию и измерить ее (для пула процессов: замер делается в дочернем процессе)
+    Returns:
+        (результат, секунды, секунды CPU, пиковая память процесса в МБ)
+    """
+    wall, cpu = time.perf_counter(), time.process_time()
+    result = func(*args, **kwargs)
+    return result, time.perf_counter() - wall, time.process_time() - cpu, peak_rss_mb()
+class Span:
+    """Замер одной стадии; items, bytes и meta можно заполнить внутри блока with"""
+    __slots__ = ('name', 'start', 'wall', 'cpu', 'items', 'bytes', 'peak_rss_mb', 'rss_growth_mb', 'meta')
+    def __init__(self, name: str, items: Optional[int] = None, **meta):
+        self.name = name
+        self.start = None
+        self.wall = None
+        self.cpu = None
+        self.items = items
+        self.bytes = None
+        self.peak_rss_mb = None
+        self.rss_growth_mb = None
+        self.meta = meta
+    def as_dict(self) -> Dict:
+        row = {
+            'name': self.name,
+            'start': None if self.start is None else round(self.start, 4),
+            'wall': None if self.wall is None else round(self.wall, 4),
+            'cpu': None if self.cpu is None else round(self.cpu, 4),
+            'items': self.items,
+            'bytes': self.bytes,
+            'peak_rss_mb': self.peak_rss_mb,
+            'rss_growth_mb': self.rss_growth_mb,
+        }
+        row.update(self.meta)
+        return row
+class Instrumentation:
+    """Сборщик замеров стадий одного запуска (потокобезопасный)"""
+    def __init__(self, enabled: bool = True, profile_stage: Optional[str] = None,
+                 profile_mode: str = 'cprofile', profile_dir: Optional[str] = None, profile_top: int = 20):
+        """
+        Инициализация
+        Args:
+            enabled: Собирать замеры (False - span ничего не измеряет)
+            profile_stage: Имя или шаблон стадии для профилирования (например, 'fetch' или 'plot:*')
+            profile_mode: 'cprofile' - профиль функций, 'tracemalloc' - выделения памяти
+            profile_dir: Папка для файлов профиля (по умолчанию - папка отчета)
+            profile_top: Сколько функций или мест выделения памяти сохранить в отчете
+        """
+        if profile_mode not in PROFILE_MODES:
+            raise ValueError(f"Неизвестный режим профилирования: {profile_mode} (допустимо: {', '.join(PROFILE_MODES)})")
+        self.enabled = enabled
+        self.profile_stage = profile_stage
+        self.profile_mode = profile_mode
+        self.profile_dir = profile_dir
+        self.profile_top = profile_top
+        self.spans: List[Span] = []
+        self.started = datetime.now()
+        self._origin = time.perf_counter()
+        self._lock = threading.Lock()
+        self._labels = threading.local()
+        self._profiling = False
+    # ===== Замеры =====
+    @contextmanager
+    def span(self, name: str, items: Optional[int] = None, **meta) -> Iterator[Span]:
+        """
+        Замерить блок кода как стадию name
+        Пример:
+            with instrumentation.span('normalize') as span:
+                df = normalize_issues(issues)
+                span.items = len(df)
+        Время CPU - процессное (time.process_time): в него входит работа всех потоков процесса.
+        """
+        span = Span(name, items, **self._current_labels(), **meta)
+        if not self.enabled:
+            yield span
+            return
+        profiler = self._start_profile(name)
+        rss_before = peak_rss_mb()
+        span.start = time.perf_counter() - self._origin
+        wall, cpu = time.perf_counter(), time.process_time()
+        try:
+            yield span
+        except BaseException as e:
+            span.meta['error'] = f"{type(e).__name__}: {e}"
+            raise
+        finally:
+            span.wall = time.perf_counter() - wall
+            span.cpu = time.process_time() - cpu
+            span.peak_rss_mb = peak_rss_mb()
+            if rss_before is not None:
+                span.rss_growth_mb = round(span.peak_rss_mb - rss_before, 1)
+            if profiler is not None:
+                self._stop_profile(name, profiler, span)
+            self._add(span)
+    def traced(self, name: Optional[str] = None):
+        """Декоратор: замерить каждый вызов функции (items - длина результата, если она есть)"""
+        def decorator(func):
+            stage = name or func.__name__
+            @wraps(func)
+            def wrapper(*args, **kwargs):
+                with self.span(stage) as span:
+                    result = func(*args, **kwargs)
+                    if hasattr(result, '__len__'):
+                        span.items = len(result)
+                    return result
+            return wrapper
+        return decorator
+    def record(self, name: str, wall: float, cpu: Optional[float] = None, items: Optional[int] = None,
+               peak_rss: Optional[float] = None, **meta) -> Optional[Span]:
+        """Добавить замер, снятый в другом месте (например, в процессе пула через timed_call)"""
+        if not self.enabled:
+            return None
+        span = Span(name, items, **self._current_labels(), **meta)
+        span.start = time.perf_counter() - self._origin - wall
+        span.wall = wall
+        span.cpu = cpu
+        span.peak_rss_mb = peak_rss
+        self._add(span)
+        return span
+    @contextmanager
+    def labels(self, **labels):
+        """Добавлять метки (например, project='KAFKA') ко всем замерам текущего потока"""
+        previous = self._current_labels()
+        self._labels.values = {**previous, **labels}
+        try:
+            yield
+        finally:
+            self._labels.values = previous
+    def _current_labels(self) -> Dict:
+        return getattr(self._labels, 'values', {})
+    def _add(self, span: Span):
+        with self._lock:
+            self.spans.append(span)
+    # ===== Профилирование =====
+    def profiles(self, name: str) -> bool:
+        """Стадия name выбрана для профилирования"""
+        return bool(self.enabled and self.profile_stage and fnmatch.fnmatchcase(name, self.profile_stage))
+    def _start_profile(self, name: str):
+        if not self.profiles(name):
+            return None
+        with self._lock:
+            # Профилируется одна стадия за раз (cProfile и tracemalloc - общие на процесс)
+            if self._profiling:
+                return None
+            self._profiling = True
+        if self.profile_mode == 'cprofile':
+            profiler = cProfile.Profile()
+            profiler.enable()
+            return profiler
+        started = not tracemalloc.is_tracing()
+        if started:
+            tracemalloc.start()
+        # reset_peak появился в Python 3.9; без него пик считается от пика на начало стадии
+        if hasattr(tracemalloc, 'reset_peak'):
+            tracemalloc.reset_peak()
+        return started, tracemalloc.get_traced_memory()
+    def _stop_profile(self, name: str, profiler, span: Span):
+        try:
+            if self.profile_mode == 'cprofile':
+                profiler.disable()
+                span.meta['profile'] = self._cprofile_summary(name, profiler)
+            else:
+                started, (current_before, peak_before) = profiler
+                snapshot = tracemalloc.take_snapshot()
+                current, peak = tracemalloc.get_traced_memory()
+                if peak <= peak_before:
+                    # Пик не сброшен и стадия его не превысила: оценка снизу по текущему объему
+                    peak = max(current_before, current)
+                if started:
+                    tracemalloc.stop()
+                top = snapshot.statistics('lineno')[:self.profile_top]
+                span.meta['profile'] = {
+                    'mode': 'tracemalloc',
+                    'peak_mb': round(peak / 1024 / 1024, 3),
+                    'top': [{'location': str(stat.traceback), 'size_kb': round(stat.size / 1024, 1),
+                             'count': stat.count} for stat in top],
+                }
+        finally:
+            with self._lock:
+                self._profiling = False
+    def _cprofile_summary(self, name: str, profiler: cProfile.Profile) -> Dict:
+        stats = pstats.Stats(profiler)
+        stats.sort_stats('cumulative')
+        summary = {'mode': 'cprofile', 'top': []}
+        for func in stats.fcn_list[:self.profile_top]:
+            calls, _, own, cumulative, _ = stats.stats[func]
+            summary['top'].append({'function': pstats.func_std_string(func), 'calls': calls,
+                                   'own': round(own, 4), 'cumulative': round(cumulative, 4)})
+        if self.profile_dir:
+            os.makedirs(self.profile_dir, exist_ok=True)
+            path = os.path.join(self.profile_dir, f"profile-{re.sub(r'[^A-Za-z0-9_.-]+', '_', name)}.prof")
+            stats.dump_stats(path)
+            summary['file'] = path
+        return summary
+    # ===== Отчет =====
+    def stages(self) -> Dict[str, Dict]:
+        """Сводка по именам стадий: количество замеров, сумма времени, CPU, элементов и байт"""
+        summary = {}
+        with self._lock:
+            spans = list(self.spans)
+        for span in spans:
+            row = summary.setdefault(span.name, {'count': 0, 'wall': 0.0, 'cpu': 0.0, 'items': 0, 'bytes': 0})
+            row['count'] += 1
+            row['wall'] += span.wall or 0.0
+            row['cpu'] += span.cpu or 0.0
+            row['items'] += span.items or 0
+            row['bytes'] += span.bytes or 0
+        for row in summary.values():
+            row['wall'] = round(row['wall'], 4)
+            row['cpu'] = round(row['cpu'], 4)
+        return summary
+    def report(self, **meta: Any) -> Dict:
+        """Отчет о запуске: общие сведения, сводка по стадиям и все замеры по времени начала"""
+        with self._lock:
+            spans = sorted(self.spans, key=lambda span: span.start or 0.0)
+        return {
+            'meta': {
+                'started': self.started.isoformat(timespec='seconds'),
+                'finished': datetime.now().isoformat(timespec='seconds'),
+                'duration': round(time.perf_counter() - self._origin, 4),
+                'cpu': round(time.process_time(), 4),
+                'peak_rss_mb': peak_rss_mb(),
+                'python': platform.python_version(),
+                'platform': platform.platform(),
+                'pid': os.getpid(),
+                'profile_stage': self.profile_stage,
+                'profile_mode': self.profile_mode if self.profile_stage else None,
+                **meta,
+            },
+            'stages': self.stages(),
+            'spans': [span.as_dict() for span in spans],
+        }
+    def write(self, path: str, **meta: Any) -> str:
+        """Сохранить отчет в JSON; возвращает путь"""
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(self.report(**meta), f, ensure_ascii=False, indent=2, default=str)
+        return path
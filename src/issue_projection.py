@@ -0,0 +1,120 @@
+﻿"""
+Компактная проекция задач JIRA и потоковый разбор страниц поиска
+В задаче остаются только подполя, которые читают обработчики (flatten_issue,
+extract_status_intervals, extract_worklogs); формат JSON JIRA сохраняется.
+"""
+import logging
+import sys
+from typing import Callable, Dict, Optional
+try:
+    import ijson
+except ImportError:
+    ijson = None
+logger = logging.getLogger(__name__)
+# Версия проекции: входит в ключ кэша, чтобы кэш не смешивал полные и компактные ответы
+PROJECTION_VERSION = 1
+USER_FIELDS = ('assignee', 'reporter', 'creator')
+def _intern(value):
+    return sys.intern(value) if isinstance(value, str) else value
+def _compact_user(user: Optional[Dict]) -> Optional[Dict]:
+    if not isinstance(user, dict):
+        return user
+    compact = {}
+    for name in ('displayName', 'name'):
+        if name in user:
+            compact[name] = _intern(user[name])
+    return compact
+def _compact_worklog(worklog: Dict) -> Dict:
+    entries = worklog.get('worklogs', [])
+    return {
+        'total': worklog.get('total', len(entries)),
+        'maxResults': worklog.get('maxResults', len(entries)),
+        'worklogs': [
+            {'author': _compact_user(entry.get('author')), 'started': entry.get('started'),
+             'timeSpentSeconds': entry.get('timeSpentSeconds')}
+            for entry in entries
+        ]
+    }
+def _compact_changelog(changelog: Dict) -> Dict:
+    histories = []
+    for history in changelog.get('histories', []):
+        items = [
+            {'field': 'status', 'fromString': _intern(item.get('fromString')), 'toString': _intern(item.get('toString'))}
+            for item in history.get('items', []) if item.get('field') == 'status'
+        ]
+        if items:
+            histories.append({'created': history.get('created'), 'items': items})
+    return {'histories': histories}
+def project_issue(issue: Dict) -> Dict:
+    """
+    Компактная копия задачи JIRA
+    Пользователи сокращаются до displayName/name, объекты (статус, приоритет, тип) -
+    до name, журнал работ - до автора, начала и затраченного времени, changelog -
+    до переходов статуса. Прочие значения полей остаются как есть.
+    Args:
+        issue: Задача из ответа /rest/api/2/search
+    Returns:
+        Задача в том же формате JSON JIRA, но только с нужными подполями
+    """
+    compact_fields = {}
+    for name, value in (issue.get('fields') or {}).items():
+        if name in USER_FIELDS:
+            compact_fields[name] = _compact_user(value)
+        elif name == 'worklog' and isinstance(value, dict):
+            compact_fields[name] = _compact_worklog(value)
+        elif isinstance(value, dict) and 'name' in value:
+            compact_fields[name] = {'name': _intern(value['name'])}
+        else:
+            compact_fields[name] = value
+    compact = {'key': issue.get('key'), 'fields': compact_fields}
+    if 'changelog' in issue:
+        compact['changelog'] = _compact_changelog(issue.get('changelog') or {})
+    return compact
+def _decode_stream(fp, project: Callable[[Dict], Dict]) -> Dict:
+    """Разобрать страницу поиска по событиям ijson: задачи проецируются по одной"""
+    data = {}
+    issues = []
+    events = ijson.parse(fp, use_float=True)
+    for prefix, event, value in events:
+        if prefix == 'issues.item' and event == 'start_map':
+            # Собираем одну задачу и сразу заменяем ее компактной копией
+            builder = ijson.ObjectBuilder()
+            builder.event(event, value)
+            depth = 1
+            for _, event, value in events:
+                builder.event(event, value)
+                if event in ('start_map', 'start_array'):
+                    depth += 1
+                elif event in ('end_map', 'end_array'):
+                    depth -= 1
+                    if depth == 0:
+                        break
+            issues.append(project(builder.value))
+        elif prefix and '.' not in prefix and event in ('number', 'string', 'boolean', 'null'):
+            data[prefix] = value
+    data['issues'] = issues
+    return data
+def decode_search_page(response, project: Callable[[Dict], Dict] = project_issue) -> Dict:
+    """
+    Разобрать ответ /rest/api/2/search с проекцией задач
+    Если установлен ijson и ответ получен с stream=True, тело разбирается потоково:
+    полная страница (с changelog и журналами работ) целиком в памяти не собирается.
+    Иначе ответ разбирается response.json() и проецируется после разбора.
+    Args:
+        response: Ответ requests
+        project: Проекция задачи (по умолчанию project_issue)
+    Returns:
+        Страница поиска (startAt, maxResults, total, issues) с компактными задачами
+    """
+    raw = getattr(response, 'raw', None)
+    if ijson is None or raw is None or not hasattr(raw, 'read'):
+        data = response.json()
+        data['issues'] = [project(issue) for issue in data.get('issues', [])]
+        return data
+    # Тело может быть сжато (gzip) - urllib3 распакует его при чтении
+    if hasattr(raw, 'decode_content'):
+        raw.decode_content = True
+    try:
+        return _decode_stream(raw, project)
+    finally:
+        response.close()
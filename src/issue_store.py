@@ -0,0 +1,406 @@
+﻿import json
+import logging
+import os
+import re
+import sqlite3
+from datetime import datetime, timezone
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence
+from .changelog import extract_status_intervals
+from .worklog import WorklogEntry, extract_worklogs
+logger = logging.getLogger(__name__)
+# Формат дат JIRA: 2023-01-01T10:00:00.000+0000
+JIRA_DATETIME_FORMAT = '%Y-%m-%dT%H:%M:%S.%f%z'
+# Плоские колонки задачи: имя колонки -> тип SQLite
+ISSUE_COLUMNS = {
+    'key': 'TEXT',
+    'created': 'TEXT',
+    'resolved': 'TEXT',
+    'updated': 'TEXT',
+    'status': 'TEXT',
+    'priority': 'TEXT',
+    'assignee': 'TEXT',
+    'reporter': 'TEXT',
+    'timespent': 'INTEGER',
+    'issuetype': 'TEXT'
+}
+# Поле JIRA (параметр fields поиска), из которого заполняется каждая колонка
+COLUMN_FIELDS = {
+    'key': 'key',
+    'created': 'created',
+    'resolved': 'resolutiondate',
+    'updated': 'updated',
+    'status': 'status',
+    'priority': 'priority',
+    'assignee': 'assignee',
+    'reporter': 'reporter',
+    'timespent': 'timespent',
+    'issuetype': 'issuetype'
+}
+_ORDER_BY_RE = re.compile(r'\s+ORDER\s+BY\s+', re.IGNORECASE)
+def parse_jira_datetime(value: str) -> datetime:
+    """Разобрать дату JIRA в datetime с часовым поясом"""
+    try:
+        return datetime.strptime(value, JIRA_DATETIME_FORMAT)
+    except ValueError:
+        from dateutil import parser
+        return parser.isoparse(value)
+def _user_name(user: Optional[Dict]) -> Optional[str]:
+    if not user:
+        return None
+    return user.get('displayName', user.get('name', 'Unknown'))
+def _object_name(value: Optional[Dict]) -> Optional[str]:
+    if not value:
+        return None
+    return value.get('name', 'Unknown')
+def flatten_issue(issue: Dict) -> Dict:
+    """
+    Преобразовать задачу JIRA в плоскую запись с колонками ISSUE_COLUMNS
+    Args:
+        issue: Задача в формате /rest/api/2/search
+    Returns:
+        Словарь колонка -> значение (None для отсутствующих полей)
+    """
+    fields = issue.get('fields') or {}
+    return {
+        'key': issue.get('key', 'UNKNOWN'),
+        'created': fields.get('created'),
+        'resolved': fields.get('resolutiondate'),
+        'updated': fields.get('updated'),
+        'status': _object_name(fields.get('status')),
+        'priority': _object_name(fields.get('priority')),
+        'assignee': _user_name(fields.get('assignee')),
+        'reporter': _user_name(fields.get('reporter')),
+        'timespent': fields.get('timespent'),
+        'issuetype': _object_name(fields.get('issuetype'))
+    }
+class IssueStore:
+    """
+    Локальное хранилище задач JIRA (SQLite)
+    Помимо исходного JSON каждая задача хранится в плоских колонках ISSUE_COLUMNS,
+    из которых обработчики читают только нужные им колонки.
+    """
+    def __init__(self, path: str = 'data/issues.db'):
+        """
+        Инициализация хранилища
+        Args:
+            path: Путь к файлу базы SQLite
+        """
+        self.path = path
+        folder = os.path.dirname(path)
+        if folder:
+            os.makedirs(folder, exist_ok=True)
+        self.conn = sqlite3.connect(path)
+        has_worklogs = self.conn.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'worklogs'").fetchone() is not None
+        columns = ',\n'.join(f"{name} {sql_type}" for name, sql_type in ISSUE_COLUMNS.items())
+        self.conn.executescript(f"""
+            CREATE TABLE IF NOT EXISTS issues (
+                scope TEXT NOT NULL,
+                {columns},
+                payload TEXT NOT NULL,
+                PRIMARY KEY (scope, key)
+            );
+            CREATE TABLE IF NOT EXISTS sync_state (
+                scope TEXT PRIMARY KEY,
+                high_water TEXT,
+                synced_at TEXT,
+                request TEXT
+            );
+            CREATE TABLE IF NOT EXISTS status_intervals (
+                scope TEXT NOT NULL,
+                key TEXT NOT NULL,
+                status TEXT NOT NULL,
+                entered TEXT,
+                left_at TEXT
+            );
+            CREATE INDEX IF NOT EXISTS status_intervals_key ON status_intervals (scope, key);
+            CREATE TABLE IF NOT EXISTS worklogs (
+                scope TEXT NOT NULL,
+                key TEXT NOT NULL,
+                author TEXT,
+                started TEXT,
+                seconds INTEGER NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS worklogs_key ON worklogs (scope, key);
+            CREATE TABLE IF NOT EXISTS truncated_worklogs (
+                scope TEXT NOT NULL,
+                key TEXT NOT NULL,
+                PRIMARY KEY (scope, key)
+            );
+        """)
+        self._migrate()
+        if not has_worklogs:
+            self._migrate_worklogs()
+    def _migrate(self):
+        """Добавить плоские колонки в базу, созданную до их появления, и заполнить их из JSON"""
+        if 'request' not in {row[1] for row in self.conn.execute("PRAGMA table_info(sync_state)")}:
+            with self.conn:
+                self.conn.execute("ALTER TABLE sync_state ADD COLUMN request TEXT")
+        existing = {row[1] for row in self.conn.execute("PRAGMA table_info(issues)")}
+        missing = [name for name in ISSUE_COLUMNS if name not in existing]
+        if not missing:
+            return
+        logger.info(f"Миграция хранилища {self.path}: добавление колонок {missing}")
+        with self.conn:
+            for name in missing:
+                self.conn.execute(f"ALTER TABLE issues ADD COLUMN {name} {ISSUE_COLUMNS[name]}")
+            rows = self.conn.execute("SELECT scope, key, payload FROM issues").fetchall()
+            for scope, key, payload in rows:
+                flat = flatten_issue(json.loads(payload))
+                assignments = ', '.join(f"{name} = ?" for name in missing)
+                self.conn.execute(
+                    f"UPDATE issues SET {assignments} WHERE scope = ? AND key = ?",
+                    [flat[name] for name in missing] + [scope, key]
+                )
+    def _migrate_worklogs(self):
+        """Перенести журналы работ из JSON задач, сохраненных до появления таблицы worklogs"""
+        rows = self.conn.execute("SELECT scope, key, payload FROM issues WHERE payload LIKE '%\"worklog\"%'").fetchall()
+        if not rows:
+            return
+        logger.info(f"Миграция хранилища {self.path}: журналы работ {len(rows)} задач")
+        by_scope: Dict[str, Dict] = {}
+        for scope, key, payload in rows:
+            issue = json.loads(payload)
+            if 'worklog' not in (issue.get('fields') or {}):
+                continue
+            entries, truncated = extract_worklogs(issue)
+            worklogs, truncated_keys = by_scope.setdefault(scope, ({}, []))
+            worklogs[key] = entries
+            if truncated:
+                truncated_keys.append(key)
+        for scope, (worklogs, truncated_keys) in by_scope.items():
+            self.replace_worklogs(scope, worklogs, truncated_keys)
+    @staticmethod
+    def scope_for(server_url: str, jql: str) -> str:
+        """
+        Идентификатор набора данных: сервер + JQL
+        Набор полей в идентификатор не входит: в хранилище загружаются все колонки
+        ISSUE_COLUMNS, а при изменении запроса (журналы работ, changelog) тот же набор
+        синхронизируется заново полностью (см. sync_issues).
+        """
+        return f"{server_url.rstrip('/')}|{jql.strip()}"
+    def upsert_issues(self, scope: str, issues: Iterable[Dict]) -> int:
+        """
+        Вставить или обновить задачи набора
+        Args:
+            scope: Идентификатор набора данных
+            issues: Задачи в формате /rest/api/2/search
+        Returns:
+            Количество записанных задач
+        """
+        rows = []
+        for issue in issues:
+            flat = flatten_issue(issue)
+            rows.append([scope] + [flat[name] for name in ISSUE_COLUMNS] + [json.dumps(issue, ensure_ascii=False)])
+        names = ', '.join(['scope'] + list(ISSUE_COLUMNS) + ['payload'])
+        placeholders = ', '.join('?' * (len(ISSUE_COLUMNS) + 2))
+        with self.conn:
+            self.conn.executemany(f"INSERT OR REPLACE INTO issues ({names}) VALUES ({placeholders})", rows)
+        return len(rows)
+    def iter_issues(self, scope: str) -> Iterator[Dict]:
+        """Выдать сохраненные задачи набора в порядке ключей"""
+        cursor = self.conn.execute("SELECT payload FROM issues WHERE scope = ? ORDER BY key", (scope,))
+        for (payload,) in cursor:
+            yield json.loads(payload)
+    def _select_columns(self, columns: Optional[Sequence[str]]) -> List[str]:
+        if columns is None:
+            return list(ISSUE_COLUMNS)
+        unknown = [name for name in columns if name not in ISSUE_COLUMNS]
+        if unknown:
+            raise ValueError(f"Неизвестные колонки хранилища: {unknown}")
+        return list(columns)
+    def iter_rows(self, scope: str, columns: Optional[Sequence[str]] = None) -> Iterator[Dict]:
+        """
+        Выдать плоские записи задач набора, прочитав только указанные колонки
+        Args:
+            scope: Идентификатор набора данных
+            columns: Колонки из ISSUE_COLUMNS (None - все)
+        Yields:
+            Словари колонка -> значение
+        """
+        names = self._select_columns(columns)
+        cursor = self.conn.execute(f"SELECT {', '.join(names)} FROM issues WHERE scope = ? ORDER BY key", (scope,))
+        for row in cursor:
+            yield dict(zip(names, row))
+    def read_frame(self, scope: str, columns: Optional[Sequence[str]] = None):
+        """
+        Прочитать плоские колонки набора в DataFrame (проекция колонок выполняется в SQLite)
+        Args:
+            scope: Идентификатор набора данных
+            columns: Колонки из ISSUE_COLUMNS (None - все)
+        Returns:
+            pandas.DataFrame с запрошенными колонками
+        """
+        import pandas as pd
+        names = self._select_columns(columns)
+        return pd.read_sql_query(
+            f"SELECT {', '.join(names)} FROM issues WHERE scope = ? ORDER BY key",
+            self.conn,
+            params=(scope,)
+        )
+    def replace_status_intervals(self, scope: str, intervals: Dict[str, List]):
+        """
+        Заменить интервалы статусов для указанных задач
+        Args:
+            scope: Идентификатор набора данных
+            intervals: Ключ задачи -> список (статус, вход, выход) из changelog.extract_status_intervals
+        """
+        with self.conn:
+            self.conn.executemany("DELETE FROM status_intervals WHERE scope = ? AND key = ?",
+                                  [(scope, key) for key in intervals])
+            self.conn.executemany(
+                "INSERT INTO status_intervals (scope, key, status, entered, left_at) VALUES (?, ?, ?, ?, ?)",
+                [(scope, key) + tuple(interval) for key, rows in intervals.items() for interval in rows]
+            )
+    def read_status_intervals(self, scope: str, as_of: Optional[datetime] = None):
+        """Интервалы статусов набора в виде DataFrame (key, status, entered, left, hours_in_status)"""
+        from .changelog import status_intervals_frame
+        rows = self.conn.execute(
+            "SELECT key, status, entered, left_at FROM status_intervals WHERE scope = ? ORDER BY key, rowid",
+            (scope,)
+        ).fetchall()
+        keys, statuses, entered, left = (list(column) for column in zip(*rows)) if rows else ([], [], [], [])
+        return status_intervals_frame(keys, statuses, entered, left, as_of)
+    def replace_worklogs(self, scope: str, worklogs: Dict[str, List[WorklogEntry]], truncated: Iterable[str] = ()):
+        """
+        Заменить записи журнала работ для указанных задач
+        Args:
+            scope: Идентификатор набора данных
+            worklogs: Ключ задачи -> записи (автор, начало, секунды) из worklog.extract_worklogs
+            truncated: Ключи задач, чьи журналы усечены и должны быть догружены отдельно
+        """
+        truncated = list(truncated)
+        with self.conn:
+            keys = [(scope, key) for key in set(worklogs) | set(truncated)]
+            self.conn.executemany("DELETE FROM worklogs WHERE scope = ? AND key = ?", keys)
+            self.conn.executemany("DELETE FROM truncated_worklogs WHERE scope = ? AND key = ?", keys)
+            self.conn.executemany(
+                "INSERT INTO worklogs (scope, key, author, started, seconds) VALUES (?, ?, ?, ?, ?)",
+                [(scope, key) + tuple(entry) for key, entries in worklogs.items() for entry in entries]
+            )
+            self.conn.executemany("INSERT INTO truncated_worklogs (scope, key) VALUES (?, ?)",
+                                  [(scope, key) for key in truncated])
+    def truncated_worklog_keys(self, scope: str) -> List[str]:
+        """Ключи задач набора, полные журналы которых еще не догружены"""
+        rows = self.conn.execute("SELECT key FROM truncated_worklogs WHERE scope = ? ORDER BY key", (scope,))
+        return [key for (key,) in rows]
+    def read_worklogs(self, scope: str):
+        """Записи журнала работ набора в виде DataFrame (key, author, started, seconds, hours)"""
+        from .worklog import worklog_frame
+        rows = self.conn.execute(
+            "SELECT key, author, started, seconds FROM worklogs WHERE scope = ? ORDER BY key, rowid",
+            (scope,)
+        ).fetchall()
+        keys, authors, started, seconds = (list(column) for column in zip(*rows)) if rows else ([], [], [], [])
+        return worklog_frame(keys, authors, started, seconds)
+    def count(self, scope: str) -> int:
+        """Количество задач набора"""
+        return self.conn.execute("SELECT COUNT(*) FROM issues WHERE scope = ?", (scope,)).fetchone()[0]
+    def get_high_water(self, scope: str) -> Optional[datetime]:
+        """Максимальное значение updated, полученное при прошлой синхронизации"""
+        row = self.conn.execute("SELECT high_water FROM sync_state WHERE scope = ?", (scope,)).fetchone()
+        if row and row[0]:
+            return datetime.fromisoformat(row[0])
+        return None
+    def get_sync_request(self, scope: str) -> Optional[str]:
+        """Параметры запроса (fields и expand) прошлой синхронизации набора"""
+        row = self.conn.execute("SELECT request FROM sync_state WHERE scope = ?", (scope,)).fetchone()
+        return row[0] if row else None
+    def set_high_water(self, scope: str, value: datetime, request: Optional[str] = None):
+        """Сохранить отметку синхронизации и параметры запроса, которым она получена"""
+        now = datetime.now(timezone.utc).isoformat()
+        with self.conn:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO sync_state (scope, high_water, synced_at, request) VALUES (?, ?, ?, ?)",
+                (scope, value.astimezone(timezone.utc).isoformat(), now, request)
+            )
+    def close(self):
+        self.conn.close()
+def build_delta_jql(jql: str, since: datetime, overlap_minutes: int = 10, now: Optional[datetime] = None) -> str:
+    """
+    Добавить к JQL условие updated >= отметки
+    Используется относительный срок ("-Nm"), т.к. абсолютные даты в JQL
+    интерпретируются в часовом поясе пользователя JIRA, который нам неизвестен.
+    Args:
+        jql: Исходный JQL запрос (может содержать ORDER BY)
+        since: Отметка последней синхронизации
+        overlap_minutes: Запас на расхождение часов и минутную точность JQL
+        now: Текущее время (для тестов)
+    Returns:
+        JQL запрос только для измененных задач
+    """
+    now = now or datetime.now(timezone.utc)
+    minutes = max(0, int((now - since).total_seconds() // 60)) + overlap_minutes
+    parts = _ORDER_BY_RE.split(jql, maxsplit=1)
+    delta = f'({parts[0]}) AND updated >= "-{minutes}m"'
+    if len(parts) > 1:
+        delta += f" ORDER BY {parts[1]}"
+    return delta
+def sync_issues(client, store: IssueStore, jql: str, overlap_minutes: int = 10,
+                expand: Optional[str] = None) -> Dict:
+    """
+    Инкрементальная синхронизация задач в локальное хранилище
+    При первом запуске (и после изменения fields или expand запроса) загружается
+    весь результат JQL, далее - только задачи, обновленные после сохраненной отметки. Задачи, переставшие подходить под JQL,
+    из хранилища не удаляются.
+    Args:
+        client: JiraClient
+        store: Локальное хранилище задач
+        jql: JQL запрос
+        overlap_minutes: Запас (в минутах) при запросе изменений
+        expand: Дополнительные разделы ответа; changelog превращается в интервалы
+                статусов и в JSON задачи не сохраняется
+    Журналы работ (поле worklog) так же сохраняются записями только для полученных задач;
+    усеченные журналы отмечаются для догрузки (IssueStore.truncated_worklog_keys).
+    Returns:
+        Статистика синхронизации: mode, fetched, total, scope
+    """
+    scope = IssueStore.scope_for(client.server_url, jql)
+    request = f"fields={getattr(client, 'fields', None)}|expand={expand}"
+    high_water = store.get_high_water(scope)
+    if high_water is not None and store.get_sync_request(scope) != request:
+        # У сохраненных задач нет данных нового запроса (например, журналов работ) -
+        # набор перезагружается полностью поверх тех же записей
+        print("🔄 Параметры запроса изменились с прошлой синхронизации")
+        high_water = None
+    if high_water is None:
+        mode = 'full'
+        fetch_jql = jql
+    else:
+        mode = 'incremental'
+        fetch_jql = build_delta_jql(jql, high_water, overlap_minutes)
+    print(f"🔄 Синхронизация ({mode}): {fetch_jql}")
+    fetched = 0
+    new_high_water = high_water
+    for page in client.iter_pages(fetch_jql, expand=expand):
+        intervals = {}
+        worklogs = {}
+        truncated = []
+        for issue in page:
+            if 'changelog' in issue:
+                intervals[issue['key']] = extract_status_intervals(issue)
+                del issue['changelog']
+            fields = issue.get('fields') or {}
+            if 'worklog' in fields:
+                worklogs[issue['key']], is_truncated = extract_worklogs(issue)
+                if is_truncated:
+                    truncated.append(issue['key'])
+                del fields['worklog']
+        if intervals:
+            store.replace_status_intervals(scope, intervals)
+        if worklogs:
+            store.replace_worklogs(scope, worklogs, truncated)
+        # Каждая страница пишется сразу, чтобы не держать весь результат в памяти
+        fetched += store.upsert_issues(scope, page)
+        for issue in page:
+            updated = issue.get('fields', {}).get('updated')
+            if updated:
+                updated_dt = parse_jira_datetime(updated)
+                if new_high_water is None or updated_dt > new_high_water:
+                    new_high_water = updated_dt
+    # Отметка сдвигается только после успешной загрузки всех страниц
+    if new_high_water is not None:
+        store.set_high_water(scope, new_high_water, request)
+    total = store.count(scope)
+    print(f"📥 Синхронизировано задач: {fetched}, всего в хранилище: {total}")
+    return {'mode': mode, 'fetched': fetched, 'total': total, 'scope': scope}
@@ -1,75 +1,379 @@
 ﻿import requests
 import logging
-from typing import List, Dict, Optional
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from typing import TYPE_CHECKING, List, Dict, Optional, Iterator, Callable, Iterable, Tuple
+from .cache import ResponseCache
+from .http_transport import HttpTransport
+from .issue_projection import PROJECTION_VERSION, decode_search_page
+if TYPE_CHECKING:
+    from .records import IssueRecord
 logger = logging.getLogger(__name__)
+# Размер страницы поиска по умолчанию (Jira обычно ограничивает maxResults сверху)
+DEFAULT_PAGE_SIZE = 100
+# Поля задачи, запрашиваемые по умолчанию (см. metric_fields.jira_request_for)
+DEFAULT_FIELDS = 'key,created,updated,resolutiondate,status,assignee,reporter,priority,timespent,worklog,issuetype,summary'
+def _body_size(response, streamed: bool = False) -> int:
+    """Размер прочитанного тела ответа в байтах (при потоковом разборе - прочитано из соединения)"""
+    raw = getattr(response, 'raw', None)
+    if streamed and hasattr(raw, 'tell'):
+        try:
+            return int(raw.tell())
+        except (OSError, TypeError, ValueError):
+            pass
+    content = getattr(response, 'content', None)
+    if isinstance(content, (bytes, bytearray)):
+        return len(content)
+    length = str(getattr(response, 'headers', {}).get('Content-Length', ''))
+    return int(length) if length.isdigit() else 0
 class JiraClient:
     """Клиент для работы с JIRA REST API"""
-    def __init__(self, server_url: str, project_key: str, max_results: int = 100):
+    def __init__(self, server_url: str, project_key: str, max_results: Optional[int] = 100,
+                 page_size: int = DEFAULT_PAGE_SIZE, max_workers: int = 1,
+                 cache: Optional[ResponseCache] = None, refresh_cache: bool = False,
+                 fields: Optional[str] = None, max_retries: int = 3, backoff_factor: float = 0.5,
+                 rate_limit: Optional[float] = None, streaming_json: bool = False,
+                 pool_size: Optional[int] = None):
         """
         Инициализация клиента JIRA
         Args:
             server_url: URL сервера JIRA
             project_key: Ключ проекта (например, 'KAFKA')
-            max_results: Максимальное количество результатов
+            max_results: Максимальное количество результатов (None или 0 - без ограничения)
+            page_size: Количество задач, запрашиваемых за одну страницу поиска
+            max_workers: Количество потоков для параллельной загрузки страниц (1 - последовательно)
+            cache: Дисковый кэш страниц поиска (None - без кэша)
+            refresh_cache: Не читать кэш, а перезаписать его свежими ответами
+            fields: Запрашиваемые поля задач через запятую (по умолчанию DEFAULT_FIELDS)
+            max_retries: Повторы запроса после 429/5xx и сетевых ошибок
+            backoff_factor: Базовая задержка повтора в секундах (растет экспоненциально)
+            rate_limit: Ограничение запросов в секунду на весь клиент (None - без ограничения)
+            streaming_json: Разбирать страницы поиска потоково (ijson) и сразу сокращать задачи
+                            до компактной проекции (issue_projection.project_issue)
+            pool_size: Размер пула соединений (по умолчанию max_workers; при параллельной
+                       загрузке нескольких проектов - max_workers * число проектов)
         """
         self.server_url = server_url.rstrip('/')
         self.project_key = project_key
         self.max_results = max_results
-        self.session = requests.Session()
+        self.page_size = page_size
+        self.max_workers = max(1, max_workers)
+        self.cache = cache
+        self.refresh_cache = refresh_cache
+        self.fields = fields or DEFAULT_FIELDS
+        self.streaming_json = streaming_json
+        # Итог последней загрузки get_issues (complete, partial или failed) хранится отдельно
+        # для каждого потока: один клиент может параллельно загружать несколько проектов
+        self._fetch_state = threading.local()
+        self.transport = HttpTransport(pool_size=pool_size or self.max_workers, max_retries=max_retries,
+                                       backoff_factor=backoff_factor, rate_limit=rate_limit)
         # Настройка сессии
         self.session.headers.update({
             'Accept': 'application/json',
             'Content-Type': 'application/json'
         })
-    def get_issues(self, jql: str) -> List[Dict]:
+    @property
+    def last_fetch(self) -> Optional[Dict]:
+        """Итог последней загрузки get_issues в текущем потоке: status, issues, total, error"""
+        return getattr(self._fetch_state, 'report', None)
+    @last_fetch.setter
+    def last_fetch(self, report: Optional[Dict]):
+        self._fetch_state.report = report
+    @property
+    def _last_total(self) -> Optional[int]:
+        return getattr(self._fetch_state, 'total', None)
+    @_last_total.setter
+    def _last_total(self, total: Optional[int]):
+        self._fetch_state.total = total
+    @property
+    def session(self) -> requests.Session:
+        """Сессия requests транспорта (с пулом соединений)"""
+        return self.transport.session
+    @session.setter
+    def session(self, session):
+        self.transport.session = session
+    def _get_json(self, path: str, params: Dict, search_page: bool = False) -> Dict:
         """
-        Получить задачи по JQL запросу
+        GET-запрос к REST API с использованием дискового кэша
+        Args:
+            path: Путь относительно сервера (например, '/rest/api/2/search')
+            params: Параметры запроса (входят в ключ кэша вместе с сервером и путем)
+            search_page: Ответ - страница поиска (при streaming_json разбирается потоково с проекцией)
+        Returns:
+            Разобранный JSON ответа
+        """
+        compact = search_page and self.streaming_json
+        cache_key = None
+        if self.cache is not None:
+            key_parts = (self.server_url, path, params)
+            if compact:
+                # Компактные страницы кэшируются отдельно от полных
+                key_parts += (f"projection-v{PROJECTION_VERSION}",)
+            cache_key = ResponseCache.make_key(*key_parts)
+            if not self.refresh_cache:
+                cached = self.cache.get(cache_key)
+                if cached is not None:
+                    return cached
+        response = self.transport.get(f"{self.server_url}{path}", params=params, timeout=30, stream=compact)
+        response.raise_for_status()
+        data = decode_search_page(response) if compact else response.json()
+        self.transport.count_bytes(_body_size(response, streamed=compact))
+        if cache_key is not None:
+            self.cache.set(cache_key, data)
+        return data
+    def _search_page(self, jql: str, start_at: int, page_size: int, expand: Optional[str] = None) -> Dict:
+        """
+        Получить одну страницу результатов поиска
         Args:
             jql: JQL запрос
+            start_at: Смещение первой задачи страницы
+            page_size: Размер страницы
+            expand: Дополнительные разделы ответа (например, 'changelog')
         Returns:
-            Список задач
+            Ответ /rest/api/2/search (startAt, maxResults, total, issues)
         """
-        url = f"{self.server_url}/rest/api/2/search"
         params = {
             'jql': jql,
-            'maxResults': self.max_results,
-            'fields': 'key,created,resolutiondate,status,assignee,reporter,priority,timespent,worklog,issuetype,summary'
+            'startAt': start_at,
+            'maxResults': page_size,
+            'fields': self.fields
         }
+        if expand:
+            params['expand'] = expand
+        return self._get_json('/rest/api/2/search', params, search_page=True)
+    def get_worklogs(self, issue_key: str) -> List[Dict]:
+        """
+        Получить полный журнал работ задачи (постранично по startAt/total)
+        Args:
+            issue_key: Ключ задачи
+        Returns:
+            Список записей журнала работ
+        """
+        worklogs = []
+        while True:
+            data = self._get_json(f"/rest/api/2/issue/{issue_key}/worklog",
+                                  {'startAt': len(worklogs), 'maxResults': 1000})
+            page = data.get('worklogs', [])
+            worklogs.extend(page)
+            if not page or len(worklogs) >= data.get('total', len(worklogs)):
+                return worklogs
+    def iter_worklogs(self, issue_keys: Iterable[str], max_workers: Optional[int] = None) -> Iterator[Tuple[str, List[Dict]]]:
+        """
+        Параллельно загрузить журналы работ нескольких задач
+        Одновременно в работе не более 2 * max_workers запросов.
+        Args:
+            issue_keys: Ключи задач
+            max_workers: Количество потоков (по умолчанию self.max_workers)
+        Yields:
+            (ключ задачи, записи журнала) в порядке завершения загрузки
+        """
+        max_workers = max(1, max_workers or self.max_workers)
+        keys = iter(issue_keys)
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            pending = {}
+            try:
+                for key in keys:
+                    pending[executor.submit(self.get_worklogs, key)] = key
+                    if len(pending) >= 2 * max_workers:
+                        break
+                while pending:
+                    done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        key = pending.pop(future)
+                        next_key = next(keys, None)
+                        if next_key is not None:
+                            pending[executor.submit(self.get_worklogs, next_key)] = next_key
+                        yield key, future.result()
+            finally:
+                for future in pending:
+                    future.cancel()
+    def iter_pages(self, jql: str, page_size: Optional[int] = None,
+                   expand: Optional[str] = None) -> Iterator[List[Dict]]:
+        """
+        Постранично обойти результаты поиска по startAt/total
+        Первая страница всегда запрашивается последовательно: из нее берется total.
+        Если max_workers > 1, остальные страницы загружаются параллельно.
+        Args:
+            jql: JQL запрос
+            page_size: Размер страницы (по умолчанию self.page_size)
+            expand: Дополнительные разделы ответа (например, 'changelog')
+        Yields:
+            Списки задач очередной страницы в порядке выдачи JIRA
+        """
+        page_size = page_size or self.page_size
+        limit = self.max_results or None
+        if limit:
+            page_size = min(page_size, limit)
+        data = self._search_page(jql, 0, page_size, expand)
+        self._last_total = min(data.get('total', 0), limit) if limit else data.get('total', 0)
+        issues = data.get('issues', [])
+        if limit:
+            issues = issues[:limit]
+        if not issues:
+            return
+        if self.max_workers > 1:
+            yield issues
+            # Сервер может урезать maxResults - шаг берем из фактического ответа
+            step = min(data.get('maxResults') or len(issues), len(issues))
+            end = data.get('total', 0)
+            if limit:
+                end = min(end, limit)
+            yield from self._iter_pages_parallel(jql, len(issues), end, step, expand)
+            return
+        start_at = 0
+        while True:
+            total = data.get('total', 0)
+            yield issues
+            # Сервер может вернуть меньше задач, чем запрошено, поэтому сдвигаемся на фактическое число
+            start_at += len(issues)
+            if start_at >= total or (limit and start_at >= limit):
+                return
+            data = self._search_page(jql, start_at, page_size, expand)
+            issues = data.get('issues', [])
+            if limit:
+                issues = issues[:limit - start_at]
+            if not issues:
+                return
+    def _iter_pages_parallel(self, jql: str, start_at: int, end: int, step: int,
+                             expand: Optional[str] = None) -> Iterator[List[Dict]]:
+        """
+        Загрузить страницы [start_at, end) пулом потоков, сохраняя порядок
+        Одновременно в работе не более 2 * max_workers страниц, чтобы
+        медленный потребитель не накапливал в памяти весь результат.
+        Args:
+            jql: JQL запрос
+            start_at: Смещение первой загружаемой страницы
+            end: Смещение, после которого загрузка прекращается
+            step: Фактический размер страницы
+            expand: Дополнительные разделы ответа
+        Yields:
+            Списки задач в порядке смещений
+        """
+        offsets = iter(range(start_at, end, step))
+        pending = deque()
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            try:
+                for offset in offsets:
+                    pending.append((offset, executor.submit(self._search_page, jql, offset, step, expand)))
+                    if len(pending) >= 2 * self.max_workers:
+                        break
+                while pending:
+                    offset, future = pending.popleft()
+                    data = future.result()
+                    next_offset = next(offsets, None)
+                    if next_offset is not None:
+                        pending.append((next_offset, executor.submit(self._search_page, jql, next_offset, step, expand)))
+                    issues = data.get('issues', [])[:end - offset]
+                    if issues:
+                        yield issues
+            finally:
+                # При ошибке или досрочной остановке не ждем ненужные страницы
+                for _, future in pending:
+                    future.cancel()
+    def iter_issues(self, jql: str, page_size: Optional[int] = None,
+                    expand: Optional[str] = None) -> Iterator[Dict]:
+        """
+        Получить задачи по JQL запросу в виде генератора
+        В памяти одновременно находится только одна страница ответа.
+        Args:
+            jql: JQL запрос
+            page_size: Размер страницы (по умолчанию self.page_size)
+            expand: Дополнительные разделы ответа (например, 'changelog')
+        Yields:
+            Задачи в порядке выдачи JIRA
+        """
+        for page in self.iter_pages(jql, page_size, expand):
+            yield from page
+    def iter_records(self, jql: str, page_size: Optional[int] = None,
+                     expand: Optional[str] = None) -> Iterator['IssueRecord']:
+        """
+        Получить задачи в виде компактных записей IssueRecord (генератор)
+        Args:
+            jql: JQL запрос
+            page_size: Размер страницы (по умолчанию self.page_size)
+            expand: Дополнительные разделы ответа
+        Yields:
+            IssueRecord в порядке выдачи JIRA
+        """
+        from .records import to_records
+        yield from to_records(self.iter_issues(jql, page_size, expand))
+    def get_issues(self, jql: str, expand: Optional[str] = None,
+                   transform: Optional[Callable[[Iterator[Dict]], Iterable[Dict]]] = None) -> List[Dict]:
+        """
+        Получить задачи по JQL запросу
+        Args:
+            jql: JQL запрос
+            expand: Дополнительные разделы ответа (например, 'changelog')
+            transform: Потоковая обработка задач до сохранения в список
+                       (например, StatusIntervalCollector.consume, удаляющий changelog,
+                       или records.to_records - компактные записи вместо JSON)
+        Returns:
+            Список задач
+        """
+        url = f"{self.server_url}/rest/api/2/search"
+        issues = []
+        self._last_total = None
         try:
             print(f"🔗 Запрос к JIRA: {url}")
             print(f"🔍 JQL: {jql}")
-            print(f"📊 Макс. результатов: {self.max_results}")
-            response = self.session.get(url, params=params, timeout=30)
-            response.raise_for_status()
-            data = response.json()
-            issues = data.get('issues', [])
+            print(f"📊 Макс. результатов: {self.max_results or 'без ограничения'}")
+            stream = self.iter_issues(jql, expand=expand)
+            # Задачи собираются по мере загрузки: при сбое на середине полученные не теряются
+            for issue in (transform(stream) if transform else stream):
+                issues.append(issue)
+            self.last_fetch = {'status': 'complete', 'issues': len(issues), 'total': self._last_total, 'error': None}
             print(f"📥 Получено задач: {len(issues)}")
+            if self.cache is not None:
+                print(f"💾 Кэш: попаданий {self.cache.hits}, промахов {self.cache.misses}")
+            self._print_transport_stats()
             # Логируем первую задачу для отладки
-            if issues:
+            if issues and isinstance(issues[0], dict):
                 first_issue = issues[0]
-                print(f"📋 Пример задачи: {first_issue['key']} - {first_issue['fields']['summary'][:50]}...")
+                summary = first_issue['fields'].get('summary') or ''
+                print(f"📋 Пример задачи: {first_issue['key']} - {summary[:50]}...")
+            elif issues:
+                print(f"📋 Пример задачи: {issues[0]!r}")
             return issues
-        except requests.exceptions.ConnectionError:
+        except requests.exceptions.ConnectionError as e:
             print("❌ Ошибка соединения. Проверьте интернет-подключение.")
-            return []
-        except requests.exceptions.Timeout:
+            return self._fetch_failed(issues, e)
+        except requests.exceptions.Timeout as e:
             print("❌ Таймаут запроса. Сервер не отвечает.")
-            return []
+            return self._fetch_failed(issues, e)
         except requests.exceptions.HTTPError as e:
             print(f"❌ HTTP ошибка: {e}")
             print(f"   URL: {url}")
-            print(f"   Параметры: {params}")
-            return []
+            print(f"   JQL: {jql}")
+            return self._fetch_failed(issues, e)
         except Exception as e:
             print(f"❌ Неожиданная ошибка: {type(e).__name__}: {e}")
             import traceback
             traceback.print_exc()
-            return []
+            return self._fetch_failed(issues, e)
+    def _fetch_failed(self, issues: List[Dict], error: Exception) -> List[Dict]:
+        """
+        Зафиксировать сбой загрузки в last_fetch
+        Если часть задач уже получена, загрузка считается частичной и они возвращаются.
+        """
+        status = 'partial' if issues else 'failed'
+        self.last_fetch = {'status': status, 'issues': len(issues), 'total': self._last_total,
+                           'error': f"{type(error).__name__}: {error}"}
+        self._print_transport_stats()
+        if issues:
+            print(f"⚠️ Частичная загрузка: получено {len(issues)} из {self._last_total or '?'} задач")
+        else:
+            print("❌ Загрузка не удалась: не получено ни одной задачи")
+        return issues
+    def _print_transport_stats(self):
+        stats = self.transport.stats
+        if stats['retries']:
+            print(f"🔁 Запросов: {stats['requests']}, повторов: {stats['retries']}, ответов 429: {stats['throttled']}")
     def test_connection(self) -> bool:
         """Проверка соединения с JIRA"""
         try:
             url = f"{self.server_url}/rest/api/2/serverInfo"
-            response = self.session.get(url, timeout=10)
+            response = self.transport.get(url, timeout=10)
             response.raise_for_status()
             print(f"✅ Соединение с JIRA установлено: {self.server_url}")
             return True
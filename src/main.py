@@ -5,37 +5,26 @@
 import sys
 import os
 import logging
+import argparse
 import yaml
 from pathlib import Path
-print("=" * 60)
-print("JIRA Analytics Tool - Полная версия с 6 графиками")
-print("=" * 60)
 # Добавляем путь для импорта модулей
 current_dir = os.path.dirname(os.path.abspath(__file__))
 parent_dir = os.path.dirname(current_dir)
 if parent_dir not in sys.path:
     sys.path.insert(0, parent_dir)
-print(f"Python: {sys.executable}")
-print(f"Текущая папка: {os.getcwd()}")
+# На уровне модуля - только легкие модули загрузки данных; pandas, matplotlib и seaborn
+# импортируются в стадиях анализа и построения графиков (проверка соединения и
+# загрузка без графиков их не загружают)
 try:
     from src.jira_client import JiraClient
-    from src.data_processor import (
-        calculate_open_time,
-        calculate_priority_distribution,
-        calculate_top_users,
-        calculate_daily_issues_stats,
-        calculate_time_spent_distribution,
-        calculate_status_time_distribution
-    )
-    from src.plot_builder import (
-        plot_open_time_histogram,
-        plot_priority_distribution_chart,
-        plot_top_users_chart,
-        plot_daily_issues_chart,
-        plot_time_spent_histogram,
-        plot_status_time_distributions
-    )
-    print("OK: Все модули импортированы")
+    from src.cache import ResponseCache
+    from src.issue_store import IssueStore, sync_issues
+    from src.changelog import StatusIntervalCollector
+    from src.worklog import WorklogCollector
+    from src.metric_fields import METRIC_COLUMNS, metric_columns, jira_request_for
+    from src.records import to_records
+    from src.instrumentation import Instrumentation, timed_call
 except ImportError as e:
     print(f"ERROR: Ошибка импорта модулей: {e}")
     sys.exit(1)
@@ -56,9 +45,8 @@ def setup_logging():
     logger = logging.getLogger(__name__)
     logger.info(f"Логирование настроено")
     return logger
-def load_config():
+def load_config(config_path="config/config.yaml"):
     """Загрузка конфигурации"""
-    config_path = "config/config.yaml"
     print(f"Поиск конфигурации: {config_path}")
     if not os.path.exists(config_path):
         print(f"WARNING: Файл конфигурации не найден, используются настройки по умолчанию")
@@ -87,144 +75,615 @@ def get_default_config():
         'jira': {
             'server': 'https://issues.apache.org/jira',
             'project_key': 'KAFKA',
-            'max_results': 200
+            'max_results': 0,
+            'page_size': 100
         },
         'plots': {
             'output_dir': 'plots',
-            'top_users_count': 30
+            'top_users_count': 30,
+            'parallel': False
         }
     }
-def build_all_plots(issues, config):
-    """Построение всех 6 графиков"""
+def get_enabled_charts(config):
+    """Имена включенных графиков (plots.enabled, по умолчанию - все 6)"""
+    enabled = config.get('plots', {}).get('enabled') or list(METRIC_COLUMNS)
+    unknown = [name for name in enabled if name not in METRIC_COLUMNS]
+    if unknown:
+        print(f"WARNING: Неизвестные графики в plots.enabled: {unknown}")
+    return [name for name in enabled if name in METRIC_COLUMNS]
+def get_jira_request(config):
+    """Поля и expand поиска JIRA: только то, что нужно включенным графикам и анализу"""
+    analysis_config = config.get('analysis', {})
+    return jira_request_for(
+        get_enabled_charts(config),
+        status_from_changelog=analysis_config.get('status_from_changelog', False),
+        worklogs=analysis_config.get('worklogs', False),
+        incremental=config.get('storage', {}).get('enabled', False),
+        top_users_weight=config.get('plots', {}).get('top_users_weight')
+    )
+def _fetch_truncated_worklogs(client, worklogs, instrumentation):
+    """Догрузить усеченные журналы работ (стадия worklogs); при ошибке остаются встроенные записи"""
+    try:
+        with instrumentation.span('worklogs') as span:
+            bytes_before = client.transport.bytes_received
+            span.items = worklogs.fetch_truncated(client)
+            span.bytes = client.transport.bytes_received - bytes_before
+    except Exception as e:
+        print(f"WARNING: Не удалось догрузить журналы работ ({type(e).__name__}: {e}), используются встроенные")
+def fetch_issues(client, jql, config, instrumentation=None):
+    """
+    Получение задач: напрямую из JIRA (список JSON) или через локальное хранилище
+    с инкрементальной синхронизацией (DataFrame только с колонками, нужными метрикам)
+    Стадии fetch, sync, read_store и worklogs замеряются в instrumentation.
+    Returns:
+        (задачи, дополнительные данные для build_all_plots: status_intervals, worklogs)
+    """
+    storage_config = config.get('storage', {})
+    analysis_config = config.get('analysis', {})
+    enabled = get_enabled_charts(config)
+    _, expand = get_jira_request(config)
+    use_changelog = expand == 'changelog'
+    use_worklogs = analysis_config.get('worklogs', False)
+    use_records = config.get('performance', {}).get('compact_records', False)
+    instrumentation = instrumentation or Instrumentation(enabled=False)
+    # changelog и журналы работ извлекаются по мере загрузки и не хранятся в задачах
+    intervals = StatusIntervalCollector()
+    worklogs = WorklogCollector()
+    extras = {}
+    if not storage_config.get('enabled', False):
+        def transform(stream):
+            if use_changelog:
+                stream = intervals.consume(stream)
+            if use_worklogs:
+                stream = worklogs.consume(stream)
+            if use_records:
+                # Все, что нужно из JSON, уже извлечено - храним только плоские записи
+                stream = to_records(stream)
+            return stream
+        with instrumentation.span('fetch') as span:
+            bytes_before = client.transport.bytes_received
+            issues = client.get_issues(jql, expand=expand, transform=transform)
+            span.items = len(issues)
+            # Счетчик общий для клиента: при параллельной загрузке проектов включает соседние
+            span.bytes = client.transport.bytes_received - bytes_before
+        if use_changelog:
+            extras['status_intervals'] = intervals.to_frame()
+        if use_worklogs and len(issues) > 0:
+            _fetch_truncated_worklogs(client, worklogs, instrumentation)
+            extras['worklogs'] = worklogs.to_frame()
+    else:
+        store = IssueStore(storage_config.get('path', 'data/issues.db'))
+        try:
+            try:
+                with instrumentation.span('sync') as span:
+                    bytes_before = client.transport.bytes_received
+                    stats = sync_issues(client, store, jql, overlap_minutes=storage_config.get('overlap_minutes', 10),
+                                        expand=expand)
+                    span.items = stats['fetched']
+                    span.bytes = client.transport.bytes_received - bytes_before
+            except Exception as e:
+                print(f"WARNING: Синхронизация не удалась ({type(e).__name__}: {e}), используются локальные данные")
+            scope = IssueStore.scope_for(client.server_url, jql)
+            if use_changelog:
+                extras['status_intervals'] = store.read_status_intervals(scope)
+            if use_worklogs:
+                # Интервалы и журналы работ хранятся по задачам и пересчитываются при синхронизации
+                # только для измененных задач; догружаются лишь усеченные журналы, которые
+                # еще не загружены (после ошибки - при следующем запуске)
+                worklogs.truncated_keys = store.truncated_worklog_keys(scope)
+                _fetch_truncated_worklogs(client, worklogs, instrumentation)
+                store.replace_worklogs(scope, worklogs.entries)
+                extras['worklogs'] = store.read_worklogs(scope)
+            with instrumentation.span('read_store') as span:
+                issues = store.read_frame(scope, columns=metric_columns(
+                    enabled, config.get('plots', {}).get('top_users_weight')))
+                span.items = len(issues)
+        finally:
+            store.close()
+    return issues, extras
+def build_all_plots(issues, config, status_intervals=None, worklogs=None, instrumentation=None):
+    """
+    Построение всех 6 графиков
+    Args:
+        issues: Задачи JIRA или DataFrame из локального хранилища
+        config: Конфигурация
+        status_intervals: Интервалы статусов из changelog для графика 6 (None - оценка по текущему статусу)
+        worklogs: Записи журнала работ (WorklogCollector.to_frame) для выгрузки трудозатрат
+        instrumentation: Замеры стадий normalize, calculate:<график>, render_cache:<график>, plot:<график>
+    """
+    import multiprocessing
+    from concurrent.futures import ProcessPoolExecutor
+    from src.render_cache import RenderCache
+    from src.data_processor import (
+        normalize_issues,
+        calculate_open_time,
+        calculate_priority_distribution,
+        calculate_top_users,
+        calculate_daily_issues_stats,
+        downsample_daily_stats,
+        summarize_distribution,
+        summarize_status_times,
+        calculate_time_spent_distribution,
+        calculate_status_time_distribution,
+        calculate_worklog_effort
+    )
+    from src.plot_builder import (
+        plot_open_time_histogram,
+        plot_priority_distribution_chart,
+        plot_top_users_chart,
+        plot_daily_issues_chart,
+        plot_time_spent_histogram,
+        plot_status_time_distributions
+    )
     plots_config = config.get('plots', {})
     output_dir = plots_config.get('output_dir', 'plots')
     top_users_count = plots_config.get('top_users_count', 30)
-    # Создаем папку для графиков
-    Path(output_dir).mkdir(exist_ok=True)
+    enabled = get_enabled_charts(config)
+    instrumentation = instrumentation or Instrumentation(enabled=False)
+    image_format = plots_config.get('format', 'png')
+    dpi = plots_config.get('dpi', 150)
+    # Графики с теми же данными и параметрами отрисовки берутся из кэша (plots.render_cache)
+    render_cache = None
+    render_params = {'dpi': dpi, 'format': image_format, 'top_users_count': top_users_count}
+    if plots_config.get('render_cache', False):
+        render_cache = RenderCache(
+            cache_dir=plots_config.get('render_cache_dir', '.cache/plots'),
+            max_size_mb=plots_config.get('render_cache_max_size_mb', 256)
+        )
+    # Создаем папку для графиков (в многопроектном режиме - вложенную <output_dir>/<проект>)
+    Path(output_dir).mkdir(parents=True, exist_ok=True)
     print(f"\n{'='*60}")
     print("НАЧАЛО ПОСТРОЕНИЯ ГРАФИКОВ")
     print(f"{'='*60}")
     results = {}
-    # === ГРАФИК 1: Гистограмма времени в открытом состоянии ===
-    print("\n1. Гистограмма времени в открытом состоянии...")
-    open_time_df = calculate_open_time(issues)
-    if not open_time_df.empty:
-        output_path = f"{output_dir}/1_open_time_histogram.png"
-        plot_open_time_histogram(open_time_df, output_path)
-        results['open_time'] = {'path': output_path, 'tasks': len(open_time_df)}
-        print(f"   OK: Сохранен: {output_path}")
-    else:
-        print("   WARNING: Нет данных")
-    # === ГРАФИК 2: Распределение по приоритетам ===
-    print("\n2. Распределение по приоритетам...")
-    priority_df = calculate_priority_distribution(issues)
-    if not priority_df.empty:
-        output_path = f"{output_dir}/2_priority_distribution.png"
-        plot_priority_distribution_chart(priority_df, output_path)
-        results['priority'] = {'path': output_path, 'priorities': len(priority_df)}
-        print(f"   OK: Сохранен: {output_path}")
-    else:
-        print("   WARNING: Нет данных")
-    # === ГРАФИК 3: Топ пользователей ===
-    print("\n3. Топ пользователей...")
-    users_df = calculate_top_users(issues, top_users_count)
-    if not users_df.empty:
-        output_path = f"{output_dir}/3_top_users.png"
-        plot_top_users_chart(users_df, output_path)
-        results['top_users'] = {'path': output_path, 'users': len(users_df)}
-        print(f"   OK: Сохранен: {output_path}")
-    else:
-        print("   WARNING: Нет данных")
-    # === ГРАФИК 4: Статистика по дням ===
-    print("\n4. Статистика по дням...")
-    daily_df = calculate_daily_issues_stats(issues)
-    if not daily_df.empty:
-        output_path = f"{output_dir}/4_daily_stats.png"
-        plot_daily_issues_chart(daily_df, output_path)
-        results['daily'] = {'path': output_path, 'days': len(daily_df)}
-        print(f"   OK: Сохранен: {output_path}")
-    else:
-        print("   WARNING: Нет данных")
-    # === ГРАФИК 5: Затраченное время ===
-    print("\n5. Затраченное время...")
-    time_spent_df = calculate_time_spent_distribution(issues)
-    if not time_spent_df.empty:
-        output_path = f"{output_dir}/5_time_spent.png"
-        plot_time_spent_histogram(time_spent_df, output_path)
-        results['time_spent'] = {'path': output_path, 'tasks': len(time_spent_df)}
-        print(f"   OK: Сохранен: {output_path}")
-    else:
-        print("   WARNING: Нет данных")
-    # === ГРАФИК 6: Распределение по состояниям ===
-    print("\n6. Распределение по состояниям...")
-    status_df = calculate_status_time_distribution(issues)
-    if not status_df.empty:
-        output_path = f"{output_dir}/6_status_distribution.png"
-        plot_status_time_distributions(status_df, output_path)
-        results['status'] = {'path': output_path, 'tasks': len(status_df)}
-        print(f"   OK: Сохранен: {output_path}")
-    else:
-        print("   WARNING: Нет данных")
+    # Графики строятся сразу или параллельно в пуле процессов (plots.parallel)
+    executor = None
+    pending = {}
+    try:
+        if plots_config.get('parallel', False):
+            max_workers = min(len(enabled), plots_config.get('max_workers') or os.cpu_count() or 1)
+            if max_workers > 1:
+                # spawn: процессы не наследуют потоки загрузки (fork при работающих потоках
+                # многопроектного режима может зависнуть на унаследованных блокировках)
+                executor = ProcessPoolExecutor(max_workers=max_workers,
+                                               mp_context=multiprocessing.get_context('spawn'))
+                print(f"\nПараллельное построение графиков: процессов {max_workers}")
+        def calculate(name, func, *args, **kwargs):
+            """Рассчитать данные графика (замер calculate:<name>)"""
+            with instrumentation.span(f"calculate:{name}") as span:
+                data = func(*args, **kwargs)
+                span.items = len(data)
+            return data
+        def render(name, plot_func, data, output_path, **counts):
+            """Построить график или отправить его в пул; результат или ошибка попадают в results"""
+            key = None
+            if render_cache is not None:
+                with instrumentation.span(f"render_cache:{name}", items=len(data)) as span:
+                    key = render_cache.fingerprint(plot_func, data, render_params)
+                    span.meta['hit'] = render_cache.restore(key, output_path)
+                if span.meta['hit']:
+                    results[name] = {'path': output_path, 'cached': True, **counts}
+                    print(f"   OK: Без изменений, взят из кэша: {output_path}")
+                    return
+            # Профилируемый график строится в этом процессе: профиль дочернего процесса недоступен
+            if executor is not None and not instrumentation.profiles(f"plot:{name}"):
+                # В процесс передаются только небольшие данные конкретного графика;
+                # время и память замеряются в дочернем процессе (timed_call)
+                future = executor.submit(timed_call, plot_func, data, output_path, dpi=dpi)
+                pending[name] = (future, output_path, counts, key, len(data))
+                print(f"   OK: Отправлен в пул: {output_path}")
+                return
+            try:
+                with instrumentation.span(f"plot:{name}", items=len(data)):
+                    plot_func(data, output_path, dpi=dpi)
+                finish(name, output_path, counts, key)
+            except Exception as e:
+                results[name] = {'error': f"{type(e).__name__}: {e}"}
+                print(f"   ERROR: Не удалось построить график: {e}")
+        def finish(name, output_path, counts, key):
+            """Записать построенный график в results и в кэш графиков"""
+            results[name] = {'path': output_path, **counts}
+            if key is not None:
+                render_cache.store(key, output_path)
+            print(f"   OK: Сохранен: {output_path}")
+        # Задачи разбираются один раз: все 6 метрик работают с общим типизированным DataFrame
+        print("\nНормализация данных...")
+        with instrumentation.span('normalize') as span:
+            issues = normalize_issues(issues)
+            span.items = len(issues)
+        print(f"   OK: Задач: {len(issues)}, колонок: {len(issues.columns)}, "
+              f"некорректных дат: {issues.attrs.get('timestamp_rejects', 0)}")
+        # === ГРАФИК 1: Гистограмма времени в открытом состоянии ===
+        if 'open_time' in enabled:
+            print("\n1. Гистограмма времени в открытом состоянии...")
+            open_time_df = calculate('open_time', calculate_open_time, issues)
+            if not open_time_df.empty:
+                # В график передаются интервалы гистограммы, KDE и сводка box plot, а не все задачи
+                summary = calculate('open_time_summary', summarize_distribution, open_time_df, 'open_hours', kde=True)
+                output_path = f"{output_dir}/1_open_time_histogram.{image_format}"
+                render('open_time', plot_open_time_histogram, summary, output_path, tasks=len(open_time_df))
+            else:
+                print("   WARNING: Нет данных")
+        # === ГРАФИК 2: Распределение по приоритетам ===
+        if 'priority' in enabled:
+            print("\n2. Распределение по приоритетам...")
+            priority_df = calculate('priority', calculate_priority_distribution, issues)
+            if not priority_df.empty:
+                output_path = f"{output_dir}/2_priority_distribution.{image_format}"
+                render('priority', plot_priority_distribution_chart, priority_df, output_path,
+                       priorities=len(priority_df))
+            else:
+                print("   WARNING: Нет данных")
+        # === ГРАФИК 3: Топ пользователей ===
+        if 'top_users' in enabled:
+            print("\n3. Топ пользователей...")
+            users_df = calculate('top_users', calculate_top_users, issues, top_users_count,
+                                 weight=plots_config.get('top_users_weight'))
+            if not users_df.empty:
+                output_path = f"{output_dir}/3_top_users.{image_format}"
+                render('top_users', plot_top_users_chart, users_df, output_path, users=len(users_df))
+            else:
+                print("   WARNING: Нет данных")
+        # === ГРАФИК 4: Статистика по дням ===
+        if 'daily' in enabled:
+            print("\n4. Статистика по дням...")
+            analysis_config = config.get('analysis', {})
+            daily_df = calculate(
+                'daily', calculate_daily_issues_stats, issues,
+                fill_gaps=analysis_config.get('daily_fill_gaps', False),
+                freq=analysis_config.get('daily_granularity', 'D')
+            )
+            if not daily_df.empty:
+                days = len(daily_df)
+                # Длинный ряд сокращается до бюджета точек: время отрисовки не растет с возрастом проекта
+                method = plots_config.get('daily_downsample', 'aggregate')
+                if method:
+                    daily_df = calculate('daily_downsample', downsample_daily_stats, daily_df,
+                                         max_points=plots_config.get('daily_max_points', 500), method=method)
+                    if len(daily_df) < days:
+                        print(f"   OK: Точек на графике: {len(daily_df)} из {days} ({method})")
+                output_path = f"{output_dir}/4_daily_stats.{image_format}"
+                render('daily', plot_daily_issues_chart, daily_df, output_path, days=days)
+            else:
+                print("   WARNING: Нет данных")
+        # === ГРАФИК 5: Затраченное время ===
+        if 'time_spent' in enabled:
+            print("\n5. Затраченное время...")
+            time_spent_df = calculate('time_spent', calculate_time_spent_distribution, issues)
+            if not time_spent_df.empty:
+                summary = calculate('time_spent_summary', summarize_distribution, time_spent_df, 'hours_spent',
+                                    log_bins=True)
+                output_path = f"{output_dir}/5_time_spent.{image_format}"
+                render('time_spent', plot_time_spent_histogram, summary, output_path, tasks=len(time_spent_df))
+            else:
+                print("   WARNING: Нет данных")
+        # === ГРАФИК 6: Распределение по состояниям ===
+        if 'status' in enabled:
+            print("\n6. Распределение по состояниям...")
+            status_df = calculate('status', calculate_status_time_distribution, issues, intervals=status_intervals)
+            if not status_df.empty:
+                # Квартили, усы и выборка выбросов по статусам вместо всех строк
+                summary = calculate('status_summary', summarize_status_times, status_df)
+                output_path = f"{output_dir}/6_status_distribution.{image_format}"
+                render('status', plot_status_time_distributions, summary, output_path, tasks=len(status_df))
+            else:
+                print("   WARNING: Нет данных")
+        # Сбор результатов параллельного построения в порядке графиков
+        if executor is not None:
+            print("\nОжидание построения графиков...")
+            for name, (future, output_path, counts, key, items) in pending.items():
+                try:
+                    _, seconds, cpu, peak_rss = future.result()
+                    instrumentation.record(f"plot:{name}", seconds, cpu, items=items, peak_rss=peak_rss, process='pool')
+                    finish(name, output_path, counts, key)
+                except Exception as e:
+                    results[name] = {'error': f"{type(e).__name__}: {e}"}
+                    print(f"   ERROR: {name}: {e}")
+    finally:
+        if executor is not None:
+            # При ошибке расчета или сбора результатов незапущенные задания отменяются,
+            # а процессы пула завершаются
+            for future, *_ in pending.values():
+                future.cancel()
+            executor.shutdown()
+    if render_cache is not None:
+        results['render_cache'] = {'hits': render_cache.hits, 'misses': render_cache.misses}
+    # === Трудозатраты по журналу работ ===
+    if worklogs is not None:
+        print("\nТрудозатраты по журналу работ...")
+        if not worklogs.empty:
+            csv_paths = []
+            for by in ('author', 'day'):
+                effort_df = calculate(f'worklog_effort:{by}', calculate_worklog_effort, worklogs, by=by)
+                csv_path = f"{output_dir}/worklog_by_{by}.csv"
+                effort_df.to_csv(csv_path, index=False, encoding='utf-8')
+                csv_paths.append(csv_path)
+                print(f"   OK: Сохранен: {csv_path}")
+            results['worklogs'] = {'csv': csv_paths, 'entries': len(worklogs)}
+        else:
+            print("   WARNING: Нет данных")
     return results
-def main():
-    """Основная функция"""
+def build_jql(project_key):
+    """JQL запрос задач проекта"""
+    return f"project = {project_key} AND status = Closed"
+def get_project_keys(config):
+    """Проекты многопроектного режима (jira.project_keys); пустой список - один проект jira.project_key"""
+    keys = config.get('jira', {}).get('project_keys') or []
+    if isinstance(keys, str):
+        keys = keys.split(',')
+    return list(dict.fromkeys(key.strip() for key in keys if key and key.strip()))
+def project_config(config, project_key):
+    """Конфигурация одного проекта многопроектного режима: графики в отдельной папке"""
+    plots_config = dict(config.get('plots', {}))
+    plots_config['output_dir'] = os.path.join(plots_config.get('output_dir', 'plots'), project_key)
+    return {**config, 'plots': plots_config}
+def _fetch_project(client, project_key, config, instrumentation=None):
+    """Загрузка одного проекта (выполняется в потоке); возвращает задачи, доп. данные и итог загрузки"""
+    client.last_fetch = None
+    instrumentation = instrumentation or Instrumentation(enabled=False)
+    with instrumentation.labels(project=project_key):
+        issues, extras = fetch_issues(client, build_jql(project_key), config, instrumentation)
+    report = dict(client.last_fetch or {})
+    report.setdefault('status', 'complete' if len(issues) else 'failed')
+    return issues, extras, report
+def run_projects(client, project_keys, config, fetch_only=False, instrumentation=None):
+    """
+    Многопроектный режим: параллельная загрузка проектов общим клиентом
+    (общие кэш, пул соединений и ограничение частоты запросов) и построение
+    графиков каждого проекта по мере готовности его данных
+    Returns:
+        Список строк сводки по проектам (тоже сохраняется в projects_summary.csv)
+    """
+    from concurrent.futures import ThreadPoolExecutor, as_completed
+    from src.data_processor import normalize_issues, calculate_project_summary
+    performance_config = config.get('performance', {})
+    instrumentation = instrumentation or Instrumentation(enabled=False)
+    max_workers = max(1, min(len(project_keys), performance_config.get('max_projects', 4)))
+    print(f"\nПроектов: {len(project_keys)}, параллельных загрузок: {max_workers}")
+    rows = {}
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = {executor.submit(_fetch_project, client, key, config, instrumentation): key for key in project_keys}
+        # Графики готового проекта строятся, пока остальные еще загружаются
+        for future in as_completed(futures):
+            key = futures[future]
+            print(f"\n{'='*60}\nПРОЕКТ {key}\n{'='*60}")
+            try:
+                issues, extras, report = future.result()
+            except Exception as e:
+                issues, extras, report = [], {}, {'status': 'failed', 'error': f"{type(e).__name__}: {e}"}
+            row = {'project': key, 'fetch': report['status'], 'error': report.get('error')}
+            if len(issues) == 0 or fetch_only:
+                row.update({'issues': len(issues), 'charts': 0, 'chart_errors': 0})
+                rows[key] = row
+                print(f"{'OK' if len(issues) else 'ERROR'}: {key}: задач {len(issues)}")
+                continue
+            # Ошибка анализа одного проекта попадает в его строку сводки и не прерывает остальные
+            try:
+                with instrumentation.labels(project=key):
+                    with instrumentation.span('normalize') as span:
+                        normalized = normalize_issues(issues)
+                        span.items = len(normalized)
+                    row.update(calculate_project_summary(normalized))
+                    results = build_all_plots(normalized, project_config(config, key),
+                                              instrumentation=instrumentation, **extras)
+            except Exception as e:
+                message = f"{type(e).__name__}: {e}"
+                print(f"ERROR: {key}: не удалось построить графики: {message}")
+                row['issues'] = len(issues)
+                row['error'] = f"{row['error']}; {message}" if row['error'] else message
+                results = {'build': {'error': message}}
+            row['charts'] = sum(1 for r in results.values() if 'path' in r)
+            row['chart_errors'] = sum(1 for r in results.values() if 'error' in r)
+            rows[key] = row
+    # Сводка в порядке проектов из конфигурации
+    summary = [rows[key] for key in project_keys]
+    output_dir = config.get('plots', {}).get('output_dir', 'plots')
+    Path(output_dir).mkdir(parents=True, exist_ok=True)
+    summary_path = os.path.join(output_dir, 'projects_summary.csv')
+    import pandas as pd
+    pd.DataFrame(summary).to_csv(summary_path, index=False, encoding='utf-8')
+    print(f"\n{'='*60}")
+    print("СВОДКА ПО ПРОЕКТАМ")
+    print(f"{'='*60}")
+    for row in summary:
+        details = f"задач {row.get('issues', 0)}, графиков {row['charts']}"
+        if row.get('open_hours_median') is not None:
+            details += f", медиана времени открытия {row['open_hours_median']} ч"
+        status = {'complete': 'OK', 'partial': 'WARNING', 'failed': 'ERROR'}.get(row['fetch'], row['fetch'])
+        print(f"  {status}: {row['project']}: {details}" + (f" ({row['error']})" if row['error'] else ""))
+    print(f"\nOK: Сводка сохранена: {summary_path}")
+    return summary
+def create_instrumentation(config):
+    """Сборщик замеров стадий (performance.run_report, profile_stage, profile_mode)"""
+    performance_config = config.get('performance', {})
+    profile_stage = performance_config.get('profile_stage')
+    return Instrumentation(
+        enabled=performance_config.get('run_report', False) or bool(profile_stage),
+        profile_stage=profile_stage,
+        profile_mode=performance_config.get('profile_mode', 'cprofile'),
+        profile_dir=config.get('plots', {}).get('output_dir', 'plots')
+    )
+def write_run_report(instrumentation, config, client, **meta):
+    """
+    Сохранить отчет о запуске (время, CPU, элементы, байты и память по стадиям) рядом с графиками
+    Returns:
+        Путь к отчету или None, если замеры выключены
+    """
+    if not instrumentation.enabled:
+        return None
+    output_dir = config.get('plots', {}).get('output_dir', 'plots')
+    transport = {**client.transport.stats, 'bytes': client.transport.bytes_received}
+    if client.cache is not None:
+        transport.update(cache_hits=client.cache.hits, cache_misses=client.cache.misses)
+    path = instrumentation.write(os.path.join(output_dir, 'run_report.json'), transport=transport, **meta)
+    print(f"\nОтчет о запуске: {path}")
+    stages = sorted(instrumentation.stages().items(), key=lambda item: item[1]['wall'], reverse=True)
+    for name, row in stages[:8]:
+        print(f"  {name:<28} {row['wall']:9.3f} с, CPU {row['cpu']:9.3f} с, элементов {row['items']}")
+    return path
+def parse_args(argv=None):
+    """Аргументы командной строки"""
+    parser = argparse.ArgumentParser(description="JIRA Analytics Tool - графики по задачам JIRA")
+    parser.add_argument('--config', default="config/config.yaml",
+                        help="Путь к файлу конфигурации (по умолчанию config/config.yaml)")
+    parser.add_argument('--test-connection', action='store_true',
+                        help="Только проверить соединение с JIRA")
+    parser.add_argument('--fetch-only', action='store_true',
+                        help="Только загрузить задачи (в кэш/локальное хранилище), без графиков")
+    parser.add_argument('--refresh-cache', action='store_true',
+                        help="Игнорировать записи кэша ответов и перезаписать их")
+    parser.add_argument('--projects',
+                        help="Ключи проектов через запятую вместо jira.project_keys (многопроектный режим)")
+    parser.add_argument('--charts',
+                        help="Графики через запятую вместо plots.enabled: " + ", ".join(METRIC_COLUMNS))
+    parser.add_argument('--profile', metavar='STAGE',
+                        help="Профилировать стадию (fetch, normalize, calculate:daily, plot:* ...)")
+    parser.add_argument('--profile-mode', choices=('cprofile', 'tracemalloc'),
+                        help="Режим профилирования вместо performance.profile_mode")
+    return parser.parse_args(argv)
+def main(argv=None):
+    """Основная функция (возвращает код завершения)"""
+    args = parse_args(argv)
+    print("=" * 60)
+    print("JIRA Analytics Tool - Полная версия с 6 графиками")
+    print("=" * 60)
+    print(f"Python: {sys.executable}")
+    print(f"Текущая папка: {os.getcwd()}")
     logger = setup_logging()
     logger.info("=" * 60)
     logger.info("Запуск JIRA Analytics Tool - полная версия")
     logger.info("=" * 60)
     # Загрузка конфигурации
-    config = load_config()
+    config = load_config(args.config)
+    if args.charts:
+        config.setdefault('plots', {})['enabled'] = [name.strip() for name in args.charts.split(',') if name.strip()]
+    if args.refresh_cache:
+        config.setdefault('performance', {})['cache_refresh'] = True
+    if args.projects:
+        config.setdefault('jira', {})['project_keys'] = args.projects.split(',')
+    if args.profile:
+        config.setdefault('performance', {})['profile_stage'] = args.profile
+    if args.profile_mode:
+        config.setdefault('performance', {})['profile_mode'] = args.profile_mode
+    project_keys = get_project_keys(config)
     # Создание папок
     Path("logs").mkdir(exist_ok=True)
     print("OK: Папки logs/ создана")
     # Инициализация клиента JIRA
     jira_config = config['jira']
+    performance_config = config.get('performance', {})
+    max_workers = performance_config.get('max_threads', 4) if performance_config.get('multithreading', False) else 1
+    fields, expand = get_jira_request(config)
+    cache = None
+    if performance_config.get('cache_enabled', False):
+        cache = ResponseCache(
+            cache_dir=performance_config.get('cache_dir', '.cache/jira'),
+            ttl=performance_config.get('cache_ttl', 3600),
+            max_size_mb=performance_config.get('cache_max_size_mb', 512)
+        )
     client = JiraClient(
         server_url=jira_config['server'],
         project_key=jira_config['project_key'],
-        max_results=jira_config.get('max_results', 200)
+        max_results=jira_config.get('max_results', 0),
+        page_size=jira_config.get('page_size', 100),
+        max_workers=max_workers,
+        cache=cache,
+        refresh_cache=performance_config.get('cache_refresh', False),
+        fields=fields,
+        max_retries=performance_config.get('max_retries', 3),
+        backoff_factor=performance_config.get('backoff_factor', 0.5),
+        rate_limit=performance_config.get('rate_limit'),
+        streaming_json=performance_config.get('streaming_json', False),
+        # Проекты загружаются параллельно, каждый - своими потоками страниц
+        pool_size=max_workers * min(len(project_keys), performance_config.get('max_projects', 4)) if project_keys else None
     )
     print(f"OK: Клиент JIRA создан")
     print(f"   Сервер: {jira_config['server']}")
-    print(f"   Проект: {jira_config['project_key']}")
-    print(f"   Макс. задач: {jira_config.get('max_results', 200)}")
-    # Получение данных
-    jql = f"project = {jira_config['project_key']} AND status = Closed"
-    print(f"\nJQL запрос: {jql}")
-    print("\nПолучение данных из JIRA...")
-    issues = client.get_issues(jql)
-    if not issues:
-        logger.error("Не получено ни одной задачи")
-        print("ERROR: Не получено ни одной задачи")
-        return
-    print(f"OK: Получено задач: {len(issues)}")
-    # Построение всех графиков
-    results = build_all_plots(issues, config)
-    # Итоговая статистика
-    print(f"\n{'='*60}")
-    print("ИТОГ ПОСТРОЕНИЯ ГРАФИКОВ")
-    print(f"{'='*60}")
-    successful_plots = sum(1 for r in results.values() if 'path' in r)
-    print(f"\nУспешно построено графиков: {successful_plots} из 6")
-    if successful_plots > 0:
-        print("\nСозданные графики:")
-        for plot_name, plot_data in results.items():
-            if 'path' in plot_data:
-                path = plot_data['path']
-                if os.path.exists(path):
-                    size_kb = os.path.getsize(path) / 1024
-                    print(f"  * {plot_name}: {path} ({size_kb:.1f} KB)")
-    print(f"\n{'='*60}")
-    print("ВЫПОЛНЕНИЕ ЗАВЕРШЕНО!")
-    print(f"{'='*60}")
-    print(f"\nЛоги: logs/jira_analytics.log")
-    print(f"Графики: plots/")
+    print(f"   Проект: {', '.join(project_keys) if project_keys else jira_config['project_key']}")
+    print(f"   Макс. задач: {jira_config.get('max_results', 0) or 'без ограничения'}")
+    print(f"   Размер страницы: {jira_config.get('page_size', 100)}")
+    print(f"   Потоков загрузки: {max_workers}")
+    print(f"   Кэш: {'включен' if cache is not None else 'выключен'}")
+    print(f"   Повторов запроса: {client.transport.max_retries}, "
+          f"лимит: {performance_config.get('rate_limit') or 'нет'} запр/с")
+    print(f"   Поля: {fields}" + (f" (expand={expand})" if expand else ""))
+    if args.test_connection:
+        return 0 if client.test_connection() else 1
+    instrumentation = create_instrumentation(config)
+    run_info = {'argv': sys.argv[1:] if argv is None else list(argv),
+                'projects': project_keys or [jira_config['project_key']], 'charts': get_enabled_charts(config)}
+    # Отчет о запуске сохраняется и при неудачной загрузке или построении
+    try:
+        if project_keys:
+            summary = run_projects(client, project_keys, config, fetch_only=args.fetch_only,
+                                   instrumentation=instrumentation)
+            run_info['summary'] = summary
+            ok = [row for row in summary if row['fetch'] != 'failed' and (args.fetch_only or row['charts'] > 0)]
+            print(f"\nУспешно обработано проектов: {len(ok)} из {len(summary)}")
+            return 0 if ok else 1
+        # Получение данных
+        jql = build_jql(jira_config['project_key'])
+        print(f"\nJQL запрос: {jql}")
+        print("\nПолучение данных из JIRA...")
+        issues, extras = fetch_issues(client, jql, config, instrumentation)
+        fetch_report = client.last_fetch or {}
+        run_info['fetch'] = fetch_report
+        if fetch_report.get('status') == 'partial':
+            message = (f"Загрузка прервана ({fetch_report['error']}): получено {fetch_report['issues']} "
+                       f"из {fetch_report['total'] or '?'} задач, графики строятся по неполным данным")
+            logger.warning(message)
+            print(f"WARNING: {message}")
+        if len(issues) == 0:
+            if fetch_report.get('status') == 'failed':
+                logger.error(f"Загрузка задач не удалась: {fetch_report['error']}")
+                print(f"ERROR: Загрузка задач не удалась: {fetch_report['error']}")
+            else:
+                logger.error("Не получено ни одной задачи")
+                print("ERROR: Не получено ни одной задачи")
+            return 1
+        print(f"OK: Получено задач: {len(issues)}")
+        if args.fetch_only:
+            for name, data in extras.items():
+                print(f"   {name}: {len(data)}")
+            print("\nЗагрузка завершена (--fetch-only), графики не строились")
+            return 0
+        # Построение всех графиков
+        results = build_all_plots(issues, config, instrumentation=instrumentation, **extras)
+        run_info['results'] = results
+        # Итоговая статистика
+        print(f"\n{'='*60}")
+        print("ИТОГ ПОСТРОЕНИЯ ГРАФИКОВ")
+        print(f"{'='*60}")
+        successful_plots = sum(1 for r in results.values() if 'path' in r)
+        print(f"\nУспешно построено графиков: {successful_plots} из {len(get_enabled_charts(config))}")
+        if successful_plots > 0:
+            print("\nСозданные графики:")
+            for plot_name, plot_data in results.items():
+                if 'path' in plot_data:
+                    path = plot_data['path']
+                    if os.path.exists(path):
+                        size_kb = os.path.getsize(path) / 1024
+                        cached = " [кэш]" if plot_data.get('cached') else ""
+                        print(f"  * {plot_name}: {path} ({size_kb:.1f} KB){cached}")
+        if 'render_cache' in results:
+            render_stats = results['render_cache']
+            print(f"\nКэш графиков: попаданий {render_stats['hits']}, промахов {render_stats['misses']}")
+        print(f"\n{'='*60}")
+        print("ВЫПОЛНЕНИЕ ЗАВЕРШЕНО!")
+        print(f"{'='*60}")
+        print(f"\nЛоги: logs/jira_analytics.log")
+        print(f"Графики: {config.get('plots', {}).get('output_dir', 'plots')}/")
+        return 0 if successful_plots > 0 else 1
+    finally:
+        write_run_report(instrumentation, config, client, **run_info)
 if __name__ == "__main__":
     try:
-        main()
+        sys.exit(main())
     except KeyboardInterrupt:
         print("\nПрервано пользователем")
+        sys.exit(130)
     except Exception as e:
         print(f"\nERROR: Критическая ошибка: {e}")
         import traceback
-        traceback.print_exc()
\ No newline at end of file
+        traceback.print_exc()
+        sys.exit(1)
\ No newline at end of file
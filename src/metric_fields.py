@@ -0,0 +1,72 @@
+﻿"""
+Поля JIRA и плоские колонки, нужные каждой метрике
+Модуль не зависит от pandas: по нему строится запрос к JIRA еще до загрузки
+библиотек анализа данных.
+"""
+from typing import Any, Iterable, List, Optional, Tuple
+from .issue_store import COLUMN_FIELDS
+# Плоские колонки (см. issue_store.ISSUE_COLUMNS), которые нужны каждой метрике
+METRIC_COLUMNS = {
+    'open_time': ['key', 'created', 'resolved'],
+    'priority': ['priority'],
+    'top_users': ['reporter', 'assignee'],
+    'daily': ['created', 'resolved'],
+    'time_spent': ['key', 'timespent'],
+    'status': ['key', 'status', 'created', 'resolved']
+}
+# Дополнительные колонки метрики 'top_users' для веса задачи (plots.top_users_weight,
+# см. data_processor.TOP_USER_WEIGHTS)
+TOP_USERS_WEIGHT_COLUMNS = {
+    None: [],
+    'resolved': ['resolved'],
+    'timespent': ['timespent']
+}
+def metric_columns(metrics: Iterable[str] = None, top_users_weight: Optional[str] = None) -> List[str]:
+    """
+    Объединение колонок, необходимых для указанных метрик (по умолчанию - для всех)
+    Args:
+        metrics: Имена метрик из METRIC_COLUMNS
+        top_users_weight: Вес задачи в рейтинге пользователей (ключ TOP_USERS_WEIGHT_COLUMNS)
+    """
+    if top_users_weight not in TOP_USERS_WEIGHT_COLUMNS:
+        raise ValueError(f"Неподдерживаемый вес: {top_users_weight} (допустимо: {list(TOP_USERS_WEIGHT_COLUMNS)})")
+    names = METRIC_COLUMNS if metrics is None else metrics
+    columns = []
+    for name in names:
+        needed = METRIC_COLUMNS[name]
+        if name == 'top_users':
+            needed = needed + TOP_USERS_WEIGHT_COLUMNS[top_users_weight]
+        for column in needed:
+            if column not in columns:
+                columns.append(column)
+    return columns
+def jira_request_for(metrics: Iterable[str] = None, status_from_changelog: bool = False,
+                     worklogs: bool = False, incremental: bool = False,
+                     top_users_weight: Optional[str] = None) -> Tuple[str, Any]:
+    """
+    Параметры fields и expand поиска JIRA для набора метрик
+    Без хранилища запрашиваются только поля, нужные включенным метрикам; changelog
+    и worklog - только если они действительно используются. Для локального хранилища
+    запрос не зависит от включенных графиков: загружаются все колонки ISSUE_COLUMNS,
+    а нужные метрикам выбираются при чтении (IssueStore.read_frame), поэтому
+    включение и выключение графиков не требует повторной полной загрузки.
+    Args:
+        metrics: Имена метрик из METRIC_COLUMNS (по умолчанию - все)
+        status_from_changelog: Метрика 'status' считается по changelog
+        worklogs: Нужен журнал работ
+        incremental: Запрос для инкрементальной синхронизации в локальное хранилище
+        top_users_weight: Вес задачи в рейтинге пользователей (resolutiondate или timespent)
+    Returns:
+        (fields через запятую, expand или None)
+    """
+    metrics = list(METRIC_COLUMNS if metrics is None else metrics)
+    fields = [COLUMN_FIELDS[column] for column in metric_columns(metrics, top_users_weight)]
+    if incremental:
+        fields = list(COLUMN_FIELDS.values())
+    if worklogs and 'worklog' not in fields:
+        fields.append('worklog')
+    if incremental:
+        expand = 'changelog' if status_from_changelog else None
+    else:
+        expand = 'changelog' if status_from_changelog and 'status' in metrics else None
+    return ','.join(fields), expand
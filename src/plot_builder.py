@@ -7,48 +7,81 @@ from typing import Optional
 import matplotlib
 # Используем агрессивный бэкенд для серверов
 matplotlib.use('Agg')
-# Настройки стиля
-plt.style.use('seaborn-v0_8')
-sns.set_palette("husl")
+_style_applied = False
+# Маркеры точек рисуются только на коротких рядах: на длинных они сливаются и замедляют отрисовку
+MARKER_MAX_POINTS = 120
+def setup_style():
+    """Настройки стиля графиков (применяются один раз, при построении первого графика)"""
+    global _style_applied
+    if not _style_applied:
+        plt.style.use('seaborn-v0_8')
+        sns.set_palette("husl")
+        _style_applied = True
+def _distribution(df: pd.DataFrame, column: str, **options) -> pd.DataFrame:
+    """Сводка распределения (data_processor.summarize_distribution): готовая или по исходным значениям"""
+    if df.attrs.get('distribution') == column:
+        return df
+    from .data_processor import summarize_distribution
+    return summarize_distribution(df, column, **options)
+def _draw_histogram(ax, summary: pd.DataFrame, **style):
+    """Гистограмма по готовым интервалам; KDE (если есть) - в масштабе количества задач"""
+    widths = summary['right'] - summary['left']
+    ax.bar(summary['left'], summary['count'], width=widths, align='edge', **style)
+    kde = summary.attrs.get('kde')
+    if kde:
+        scale = summary.attrs['total'] * widths.iloc[0]
+        ax.plot(kde['x'], np.asarray(kde['y']) * scale, color=style.get('color'), linewidth=2)
 # ===== ГРАФИК 1: Гистограмма времени в открытом состоянии (ГОТОВО) =====
-def plot_open_time_histogram(df: pd.DataFrame, output_path: str):
-    """Построить гистограмму времени в открытом состоянии"""
+def plot_open_time_histogram(df: pd.DataFrame, output_path: str, dpi: int = 150):
+    """
+    Построить гистограмму времени в открытом состоянии
+    df - сводка summarize_distribution(..., 'open_hours', kde=True) или результат calculate_open_time
+    """
     if df.empty:
         print("Нет данных для гистограммы")
         return
     print(f"Создание гистограммы: {output_path}")
     os.makedirs(os.path.dirname(output_path), exist_ok=True)
+    setup_style()
+    summary = _distribution(df, 'open_hours', kde=True)
+    if summary.empty:
+        print("Нет данных для гистограммы")
+        return
     fig, (ax1, ax2) = plt.subplots(1, 2, figsize=(15, 6))
     # 1. Гистограмма с KDE
-    sns.histplot(data=df, x='open_hours', bins=30, kde=True, ax=ax1)
-    mean_val = df['open_hours'].mean()
-    median_val = df['open_hours'].median()
+    color = sns.color_palette()[0]
+    _draw_histogram(ax1, summary, color=color, alpha=0.6, edgecolor='white')
+    mean_val = summary.attrs['mean']
+    median_val = summary.attrs['median']
     ax1.axvline(mean_val, color='red', linestyle='--', linewidth=2, 
                 label=f'Среднее: {mean_val:.1f} ч')
     ax1.axvline(median_val, color='green', linestyle=':', linewidth=2,
                 label=f'Медиана: {median_val:.1f} ч')
-    ax1.set_title(f'Гистограмма времени в открытом состоянии\nВсего задач: {len(df)}', fontsize=14)
+    ax1.set_title(f'Гистограмма времени в открытом состоянии\nВсего задач: {summary.attrs["total"]}', fontsize=14)
     ax1.set_xlabel('Часы в открытом состоянии', fontsize=12)
     ax1.set_ylabel('Количество задач', fontsize=12)
     ax1.grid(True, alpha=0.3)
     ax1.legend()
-    # 2. Box plot
-    sns.boxplot(data=df, y='open_hours', ax=ax2)
+    # 2. Box plot по пятичисловой сводке
+    ax2.bxp([summary.attrs['box']], widths=0.5, patch_artist=True,
+            boxprops={'facecolor': color, 'alpha': 0.6}, medianprops={'color': 'black'})
+    ax2.set_xticks([])
     ax2.set_title('Распределение времени (Box Plot)', fontsize=14)
     ax2.set_ylabel('Часы в открытом состоянии', fontsize=12)
     ax2.grid(True, alpha=0.3)
     plt.tight_layout()
-    plt.savefig(output_path, dpi=150, bbox_inches='tight')
+    plt.savefig(output_path, dpi=dpi, bbox_inches='tight')
     plt.close(fig)
     print(f"Гистограмма сохранена: {output_path}")
 # ===== ГРАФИК 2: Распределение по приоритетам =====
-def plot_priority_distribution_chart(priority_data: pd.DataFrame, output_path: str):
+def plot_priority_distribution_chart(priority_data: pd.DataFrame, output_path: str, dpi: int = 150):
     """Распределение задач по приоритетам"""
     if priority_data.empty:
         print("Нет данных для графика приоритетов")
         return
     print(f"Создание графика приоритетов: {output_path}")
     os.makedirs(os.path.dirname(output_path), exist_ok=True)
+    setup_style()
     plt.figure(figsize=(12, 6))
     # Строим столбчатую диаграмму
     bars = plt.bar(priority_data['priority'], priority_data['count'], color='skyblue')
@@ -63,17 +96,18 @@ def plot_priority_distribution_chart(priority_data: pd.DataFrame, output_path: s
         plt.text(bar.get_x() + bar.get_width()/2., height + 0.1,
                 f'{int(height)}', ha='center', va='bottom', fontsize=10)
     plt.tight_layout()
-    plt.savefig(output_path, dpi=150, bbox_inches='tight')
+    plt.savefig(output_path, dpi=dpi, bbox_inches='tight')
     plt.close()
     print(f"График приоритетов сохранен: {output_path}")
 # ===== ГРАФИК 3: Топ пользователей =====
-def plot_top_users_chart(top_users: pd.DataFrame, output_path: str):
+def plot_top_users_chart(top_users: pd.DataFrame, output_path: str, dpi: int = 150):
     """График топ пользователей"""
     if top_users.empty:
         print("Нет данных для графика пользователей")
         return
     print(f"Создание графика пользователей: {output_path}")
     os.makedirs(os.path.dirname(output_path), exist_ok=True)
+    setup_style()
     fig, (ax1, ax2) = plt.subplots(2, 1, figsize=(14, 10))
     # 1. Общее количество задач
     top_users_sorted = top_users.sort_values('total_tasks', ascending=True)
@@ -81,12 +115,13 @@ def plot_top_users_chart(top_users: pd.DataFrame, output_path: str):
     ax1.barh(y_pos, top_users_sorted['total_tasks'], color='lightcoral')
     ax1.set_yticks(y_pos)
     ax1.set_yticklabels(top_users_sorted['user'])
-    ax1.set_xlabel('Общее количество задач', fontsize=12)
+    weight_labels = {'resolved': 'Количество закрытых задач', 'timespent': 'Затраченное время (часы)'}
+    ax1.set_xlabel(weight_labels.get(top_users.attrs.get('weight'), 'Общее количество задач'), fontsize=12)
     ax1.set_title(f'Топ {len(top_users)} пользователей по общему количеству задач', fontsize=14)
     ax1.grid(True, alpha=0.3, axis='x')
     # Добавляем значения на бары
     for i, v in enumerate(top_users_sorted['total_tasks']):
-        ax1.text(v + 0.1, i, str(int(v)), va='center')
+        ax1.text(v + 0.1, i, str(int(v)) if float(v).is_integer() else f'{v:.1f}', va='center')
     # 2. Разделение на репортера/исполнителя
     if len(top_users) > 0:
         bottom_users = top_users.head(min(10, len(top_users)))
@@ -102,25 +137,35 @@ def plot_top_users_chart(top_users: pd.DataFrame, output_path: str):
         ax2.legend()
         ax2.grid(True, alpha=0.3)
     plt.tight_layout()
-    plt.savefig(output_path, dpi=150, bbox_inches='tight')
+    plt.savefig(output_path, dpi=dpi, bbox_inches='tight')
     plt.close(fig)
     print(f"График пользователей сохранен: {output_path}")
 # ===== ГРАФИК 4: Задачи по дням =====
-def plot_daily_issues_chart(daily_stats: pd.DataFrame, output_path: str):
+def plot_daily_issues_chart(daily_stats: pd.DataFrame, output_path: str, dpi: int = 150):
     """График задач по дням (с накопительным итогом)"""
     if daily_stats.empty:
         print("Нет данных для графика по дням")
         return
     print(f"Создание графика по дням: {output_path}")
     os.makedirs(os.path.dirname(output_path), exist_ok=True)
+    setup_style()
     fig, (ax1, ax2) = plt.subplots(2, 1, figsize=(15, 10))
     # 1. Ежедневные значения
     dates = pd.to_datetime(daily_stats['date'])
-    ax1.plot(dates, daily_stats['created_today'], 'o-', label='Создано', color='green', linewidth=2)
-    ax1.plot(dates, daily_stats['resolved_today'], 's-', label='Закрыто', color='red', linewidth=2)
+    markers = len(dates) <= MARKER_MAX_POINTS
+    ax1.plot(dates, daily_stats['created_today'], 'o-' if markers else '-', label='Создано', color='green',
+             linewidth=2 if markers else 1)
+    ax1.plot(dates, daily_stats['resolved_today'], 's-' if markers else '-', label='Закрыто', color='red',
+             linewidth=2 if markers else 1)
     ax1.fill_between(dates, daily_stats['created_today'], alpha=0.3, color='green')
     ax1.fill_between(dates, daily_stats['resolved_today'], alpha=0.3, color='red')
-    ax1.set_title('Количество созданных и закрытых задач по дням', fontsize=14)
+    from .data_processor import DAILY_FREQUENCIES
+    period_label = DAILY_FREQUENCIES.get(daily_stats.attrs.get('freq', 'D'), DAILY_FREQUENCIES['D'])
+    title = f'Количество созданных и закрытых задач по {period_label}'
+    downsampled = daily_stats.attrs.get('downsampled')
+    if downsampled and downsampled['method'] == 'lttb':
+        title += f" ({len(dates)} из {downsampled['points']} точек)"
+    ax1.set_title(title, fontsize=14)
     ax1.set_xlabel('Дата', fontsize=12)
     ax1.set_ylabel('Количество задач', fontsize=12)
     ax1.legend()
@@ -139,58 +184,81 @@ def plot_daily_issues_chart(daily_stats: pd.DataFrame, output_path: str):
     ax2.grid(True, alpha=0.3)
     ax2.tick_params(axis='x', rotation=45)
     plt.tight_layout()
-    plt.savefig(output_path, dpi=150, bbox_inches='tight')
+    plt.savefig(output_path, dpi=dpi, bbox_inches='tight')
     plt.close(fig)
     print(f"График по дням сохранен: {output_path}")
 # ===== ГРАФИК 5: Затраченное время =====
-def plot_time_spent_histogram(time_spent_data: pd.DataFrame, output_path: str):
-    """Гистограмма затраченного времени"""
+def plot_time_spent_histogram(time_spent_data: pd.DataFrame, output_path: str, dpi: int = 150):
+    """
+    Гистограмма затраченного времени
+    time_spent_data - сводка summarize_distribution(..., 'hours_spent', log_bins=True)
+    или результат calculate_time_spent_distribution
+    """
     if time_spent_data.empty:
         print("Нет данных для графика затраченного времени")
         return
     print(f"Создание графика затраченного времени: {output_path}")
     os.makedirs(os.path.dirname(output_path), exist_ok=True)
-    plt.figure(figsize=(12, 6))
+    setup_style()
     # Логарифмическая шкала для лучшего отображения
-    bins = np.logspace(np.log10(time_spent_data['hours_spent'].min() + 0.1), 
-                      np.log10(time_spent_data['hours_spent'].max() + 1), 
-                      30)
-    plt.hist(time_spent_data['hours_spent'], bins=bins, edgecolor='black', alpha=0.7)
+    summary = _distribution(time_spent_data, 'hours_spent', log_bins=True)
+    if summary.empty:
+        print("Нет данных для графика затраченного времени")
+        return
+    plt.figure(figsize=(12, 6))
+    _draw_histogram(plt.gca(), summary, edgecolor='black', alpha=0.7)
     plt.xscale('log')
-    mean_val = time_spent_data['hours_spent'].mean()
-    median_val = time_spent_data['hours_spent'].median()
+    mean_val = summary.attrs['mean']
+    median_val = summary.attrs['median']
     plt.axvline(mean_val, color='red', linestyle='--', linewidth=2, 
                 label=f'Среднее: {mean_val:.1f} ч')
     plt.axvline(median_val, color='green', linestyle=':', linewidth=2,
                 label=f'Медиана: {median_val:.1f} ч')
-    plt.title(f'Распределение затраченного времени (логарифмическая шкала)\nЗадачи с logged time: {len(time_spent_data)}', fontsize=14)
+    plt.title(f'Распределение затраченного времени (логарифмическая шкала)\nЗадачи с logged time: {summary.attrs["total"]}', fontsize=14)
     plt.xlabel('Затраченное время (часы, log scale)', fontsize=12)
     plt.ylabel('Количество задач', fontsize=12)
     plt.grid(True, alpha=0.3, which='both')
     plt.legend()
     plt.tight_layout()
-    plt.savefig(output_path, dpi=150, bbox_inches='tight')
+    plt.savefig(output_path, dpi=dpi, bbox_inches='tight')
     plt.close()
     print(f"График затраченного времени сохранен: {output_path}")
 # ===== ГРАФИК 6: Распределение по состояниям =====
-def plot_status_time_distributions(status_data: pd.DataFrame, output_path: str):
-    """Распределение времени по состояниям задачи"""
+def plot_status_time_distributions(status_data: pd.DataFrame, output_path: str, dpi: int = 150):
+    """
+    Распределение времени по состояниям задачи
+    status_data - сводка summarize_status_times или результат calculate_status_time_distribution
+    """
     if status_data.empty:
         print("Нет данных для графика статусов")
         return
     print(f"Создание графика статусов: {output_path}")
     os.makedirs(os.path.dirname(output_path), exist_ok=True)
+    setup_style()
+    summary = status_data
+    if not status_data.attrs.get('box_stats'):
+        from .data_processor import summarize_status_times
+        summary = summarize_status_times(status_data)
+    if summary.empty:
+        print("Нет данных для графика статусов")
+        return
     fig, (ax1, ax2) = plt.subplots(1, 2, figsize=(16, 6))
-    # 1. Box plot по статусам
-    status_order = status_data.groupby('status')['hours_in_status'].median().sort_values(ascending=False).index
-    sns.boxplot(data=status_data, x='status', y='hours_in_status', order=status_order, ax=ax1)
+    # 1. Box plot по статусам (по убыванию медианы) из готовых квартилей и выборки выбросов
+    fliers = summary.attrs.get('fliers', {})
+    stats = [{'label': row.status, 'q1': row.q1, 'med': row.med, 'q3': row.q3, 'whislo': row.whislo,
+              'whishi': row.whishi, 'fliers': fliers.get(row.status, [])} for row in summary.itertuples()]
+    colors = sns.color_palette(n_colors=len(stats))
+    boxes = ax1.bxp(stats, patch_artist=True, widths=0.6, medianprops={'color': 'black'},
+                    flierprops={'marker': 'd', 'markersize': 4, 'alpha': 0.5})
+    for patch, color in zip(boxes['boxes'], colors):
+        patch.set_facecolor(color)
     ax1.set_title('Время в статусах (Box Plot)', fontsize=14)
     ax1.set_xlabel('Статус', fontsize=12)
     ax1.set_ylabel('Часы в статусе', fontsize=12)
     ax1.tick_params(axis='x', rotation=45)
     ax1.grid(True, alpha=0.3, axis='y')
     # 2. Количество задач по статусам
-    status_counts = status_data['status'].value_counts()
+    status_counts = summary.set_index('status')['count'].sort_values(ascending=False, kind='stable')
     ax2.bar(range(len(status_counts)), status_counts.values, color='lightblue')
     ax2.set_title('Количество задач по статусам', fontsize=14)
     ax2.set_xlabel('Статус', fontsize=12)
@@ -202,6 +270,6 @@ def plot_status_time_distributions(status_data: pd.DataFrame, output_path: str):
     for i, v in enumerate(status_counts.values):
         ax2.text(i, v + 0.1, str(v), ha='center', va='bottom')
     plt.tight_layout()
-    plt.savefig(output_path, dpi=150, bbox_inches='tight')
+    plt.savefig(output_path, dpi=dpi, bbox_inches='tight')
     plt.close(fig)
     print(f"График статусов сохранен: {output_path}")
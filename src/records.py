@@ -0,0 +1,50 @@
+﻿import sys
+from typing import Dict, Iterable, Iterator, Tuple
+from .issue_store import ISSUE_COLUMNS, flatten_issue
+# Колонки с повторяющимися значениями: одна строка на значение для всех задач
+INTERNED_COLUMNS = ('status', 'priority', 'assignee', 'reporter', 'issuetype')
+class IssueRecord:
+    """
+    Компактная запись задачи: плоские колонки ISSUE_COLUMNS в __slots__
+    Вместо вложенных словарей JSON JIRA хранится одно значение на колонку;
+    пользователи, статусы, приоритеты и типы задач - интернированные строки,
+    общие для всех записей. Даты остаются строками JIRA и разбираются
+    векторизованно в normalize_issues.
+    """
+    __slots__ = tuple(ISSUE_COLUMNS)
+    def __init__(self, key=None, created=None, resolved=None, updated=None, status=None,
+                 priority=None, assignee=None, reporter=None, timespent=None, issuetype=None):
+        self.key = key
+        self.created = created
+        self.resolved = resolved
+        self.updated = updated
+        self.status = status
+        self.priority = priority
+        self.assignee = assignee
+        self.reporter = reporter
+        self.timespent = timespent
+        self.issuetype = issuetype
+    @classmethod
+    def from_issue(cls, issue: Dict) -> 'IssueRecord':
+        """Создать запись из задачи JIRA (формат /rest/api/2/search)"""
+        flat = flatten_issue(issue)
+        for column in INTERNED_COLUMNS:
+            if flat[column] is not None:
+                flat[column] = sys.intern(flat[column])
+        return cls(**flat)
+    def as_tuple(self) -> Tuple:
+        """Значения в порядке ISSUE_COLUMNS"""
+        return tuple(getattr(self, column) for column in ISSUE_COLUMNS)
+    def as_dict(self) -> Dict:
+        """Плоская запись в формате flatten_issue"""
+        return {column: getattr(self, column) for column in ISSUE_COLUMNS}
+    def __eq__(self, other):
+        if not isinstance(other, IssueRecord):
+            return NotImplemented
+        return self.as_tuple() == other.as_tuple()
+    def __repr__(self):
+        return f"IssueRecord({self.key!r}, status={self.status!r}, priority={self.priority!r})"
+def to_records(issues: Iterable[Dict]) -> Iterator[IssueRecord]:
+    """Потоково заменить задачи JIRA компактными записями"""
+    for issue in issues:
+        yield IssueRecord.from_issue(issue)
@@ -0,0 +1,107 @@
+﻿import hashlib
+import json
+import logging
+import os
+import shutil
+import sys
+import threading
+from typing import Any, Callable, Dict, Optional
+logger = logging.getLogger(__name__)
+class RenderCache:
+    """Кэш построенных графиков, адресуемый по содержимому входных данных и параметрам отрисовки"""
+    def __init__(self, cache_dir: str = '.cache/plots', max_size_mb: float = 256):
+        """
+        Инициализация кэша графиков
+        Args:
+            cache_dir: Папка для файлов кэша (имя файла - отпечаток графика)
+            max_size_mb: Максимальный суммарный размер кэша (давно не использованные графики вытесняются)
+        """
+        self.cache_dir = cache_dir
+        self.max_size_bytes = int(max_size_mb * 1024 * 1024)
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._source_hashes = {}
+        os.makedirs(cache_dir, exist_ok=True)
+    def _source_hash(self, plot_func: Callable) -> str:
+        """Хэш исходного кода модуля с функцией построения (правка кода сбрасывает кэш)"""
+        module_name = getattr(plot_func, '__module__', None)
+        if module_name not in self._source_hashes:
+            digest = ''
+            module_file = getattr(sys.modules.get(module_name), '__file__', None)
+            if module_file and os.path.exists(module_file):
+                with open(module_file, 'rb') as f:
+                    digest = hashlib.sha256(f.read()).hexdigest()
+            self._source_hashes[module_name] = digest
+        return self._source_hashes[module_name]
+    def fingerprint(self, plot_func: Callable, data, params: Optional[Dict[str, Any]] = None) -> str:
+        """
+        Отпечаток графика: содержимое DataFrame, его колонки, типы и attrs,
+        функция построения и параметры отрисовки (размер, dpi, формат...)
+        """
+        import pandas as pd
+        digest = hashlib.sha256()
+        header = {
+            'plot': f"{plot_func.__module__}.{plot_func.__qualname__}",
+            'source': self._source_hash(plot_func),
+            'columns': [str(column) for column in data.columns],
+            'dtypes': [str(dtype) for dtype in data.dtypes],
+            'attrs': data.attrs,
+            'params': params or {},
+        }
+        digest.update(json.dumps(header, sort_keys=True, ensure_ascii=False, default=str).encode('utf-8'))
+        if len(data):
+            digest.update(pd.util.hash_pandas_object(data, index=True).values.tobytes())
+        return digest.hexdigest()
+    def _path(self, key: str, output_path: str) -> str:
+        extension = os.path.splitext(output_path)[1]
+        return os.path.join(self.cache_dir, f"{key}{extension}")
+    def restore(self, key: str, output_path: str) -> bool:
+        """Скопировать готовый график из кэша в output_path; False - графика в кэше нет"""
+        path = self._path(key, output_path)
+        try:
+            os.makedirs(os.path.dirname(output_path) or '.', exist_ok=True)
+            if not (os.path.exists(output_path) and os.path.samefile(path, output_path)):
+                shutil.copyfile(path, output_path)
+            # Обновляем время использования для вытеснения
+            os.utime(path)
+        except FileNotFoundError:
+            self.misses += 1
+            return False
+        except OSError as e:
+            logger.warning(f"Не удалось восстановить график из кэша {path}: {e}")
+            self.misses += 1
+            return False
+        self.hits += 1
+        return True
+    def store(self, key: str, output_path: str):
+        """Сохранить построенный график в кэш (атомарно, через временный файл)"""
+        path = self._path(key, output_path)
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"
+        try:
+            shutil.copyfile(output_path, tmp_path)
+            with self._lock:
+                os.replace(tmp_path, path)
+                self._evict()
+        except OSError as e:
+            logger.warning(f"Не удалось записать график в кэш {path}: {e}")
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+    def _evict(self):
+        """Удалить давно не использованные графики, пока размер не станет меньше 90% лимита"""
+        entries = [os.path.join(self.cache_dir, name) for name in os.listdir(self.cache_dir)
+                   if not name.endswith('.tmp')]
+        size = sum(os.path.getsize(path) for path in entries)
+        if size <= self.max_size_bytes:
+            return
+        target = self.max_size_bytes * 0.9
+        for path in sorted(entries, key=os.path.getmtime):
+            if size <= target:
+                break
+            size -= os.path.getsize(path)
+            os.remove(path)
+    def clear(self):
+        """Очистить кэш"""
+        with self._lock:
+            for name in os.listdir(self.cache_dir):
+                os.remove(os.path.join(self.cache_dir, name))
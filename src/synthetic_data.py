@@ -0,0 +1,182 @@
+﻿"""
+Детерминированный генератор синтетических задач JIRA
+Задачи имеют формат ответа /rest/api/2/search (с changelog и журналом работ) и
+правдоподобные распределения: создание в рабочие дни и часы, логнормальное
+время решения, неравномерная активность пользователей (закон Ципфа),
+типичные доли приоритетов, статусов и типов задач.
+Задача с номером index зависит только от (seed, index), поэтому любую страницу
+можно получить без генерации предыдущих (используется тестовым сервером JIRA).
+"""
+import math
+import random
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Iterator, List, Optional, Tuple
+JIRA_OUTPUT_FORMAT = '%Y-%m-%dT%H:%M:%S.000+0000'
+PRIORITIES = (('Blocker', 2), ('Critical', 8), ('Major', 55), ('Minor', 25), ('Trivial', 10))
+ISSUE_TYPES = (('Bug', 45), ('Improvement', 30), ('Task', 10), ('New Feature', 8), ('Sub-task', 7))
+OPEN_STATUSES = (('Open', 50), ('In Progress', 20), ('Patch Available', 20), ('Reopened', 10))
+RESOLVED_STATUSES = (('Closed', 60), ('Resolved', 40))
+# Медиана и разброс времени решения (логнормальное распределение, часы)
+RESOLUTION_MEDIAN_HOURS = 96
+RESOLUTION_SIGMA = 1.4
+def _cumulative(weights) -> Tuple[List[str], List[float]]:
+    names = [name for name, _ in weights]
+    total = 0
+    cumulative = []
+    for _, weight in weights:
+        total += weight
+        cumulative.append(total)
+    return names, cumulative
+class SyntheticIssues:
+    """Генератор синтетических задач проекта"""
+    def __init__(self, count: int, seed: int = 0, project: str = 'SYN', users: int = 200,
+                 start: datetime = datetime(2020, 1, 1, tzinfo=timezone.utc), days: int = 4 * 365,
+                 resolved_share: float = 0.85, with_changelog: bool = True, with_worklogs: bool = True):
+        """
+        Инициализация генератора
+        Args:
+            count: Количество задач
+            seed: Зерно генератора (одинаковое зерно - одинаковые задачи)
+            project: Ключ проекта (ключи задач PROJECT-1, PROJECT-2, ...)
+            users: Количество пользователей (активность по закону Ципфа)
+            start: Начало периода создания задач
+            days: Длительность периода создания задач в днях
+            resolved_share: Доля закрытых задач
+            with_changelog: Добавлять историю переходов статусов (changelog)
+            with_worklogs: Добавлять журнал работ (fields.worklog)
+        """
+        self.count = count
+        self.seed = seed
+        self.project = project
+        self.start = start
+        self.days = days
+        self.resolved_share = resolved_share
+        self.with_changelog = with_changelog
+        self.with_worklogs = with_worklogs
+        self.users = [{'name': f'user{i}', 'displayName': f'User {i}'} for i in range(users)]
+        self._user_weights = _cumulative([(i, 1 / (i + 1) ** 1.1) for i in range(users)])[1]
+        self._priorities = _cumulative(PRIORITIES)
+        self._types = _cumulative(ISSUE_TYPES)
+        self._open = _cumulative(OPEN_STATUSES)
+        self._resolved = _cumulative(RESOLVED_STATUSES)
+    def __len__(self):
+        return self.count
+    def __iter__(self) -> Iterator[Dict]:
+        for index in range(self.count):
+            yield self.issue(index)
+    def page(self, start_at: int, size: int) -> List[Dict]:
+        """Задачи [start_at, start_at + size) без генерации предыдущих"""
+        return [self.issue(index) for index in range(start_at, min(self.count, start_at + size))]
+    def _pick(self, rng: random.Random, choices: Tuple[List[str], List[float]]) -> str:
+        names, cumulative = choices
+        return rng.choices(names, cum_weights=cumulative)[0]
+    def _user(self, rng: random.Random) -> Dict:
+        return dict(rng.choices(self.users, cum_weights=self._user_weights)[0])
+    def _created(self, rng: random.Random) -> datetime:
+        """Момент создания: рабочие дни и часы встречаются чаще"""
+        while True:
+            day = self.start + timedelta(days=rng.randrange(self.days))
+            if day.weekday() < 5 or rng.random() < 0.25:
+                break
+        hour = min(23, max(0, int(rng.gauss(13, 3))))
+        return day.replace(hour=hour, minute=rng.randrange(60), second=rng.randrange(60))
+    def issue(self, index: int) -> Dict:
+        """
+        Задача с номером index (0 <= index < count)
+        Returns:
+            Задача в формате /rest/api/2/search
+        """
+        return self._build(index)[0]
+    def worklogs(self, index: int) -> List[Dict]:
+        """Полный журнал работ задачи index (в задаче из поиска - не более 20 записей)"""
+        return self._build(index)[1]
+    def index_of(self, key: str) -> int:
+        """Номер задачи по ключу (PROJECT-N -> N - 1); ValueError для чужого или несуществующего ключа"""
+        project, _, number = key.rpartition('-')
+        if project != self.project or not number.isdigit() or not 0 < int(number) <= self.count:
+            raise ValueError(f"Нет задачи {key}")
+        return int(number) - 1
+    def _build(self, index: int) -> Tuple[Dict, List[Dict]]:
+        rng = random.Random(self.seed * 1_000_003 + index)
+        created = self._created(rng)
+        resolved = None
+        if rng.random() < self.resolved_share:
+            hours = rng.lognormvariate(math.log(RESOLUTION_MEDIAN_HOURS), RESOLUTION_SIGMA)
+            resolved = created + timedelta(hours=max(0.05, hours))
+        status = self._pick(rng, self._resolved if resolved else self._open)
+        assignee = self._user(rng) if rng.random() < 0.9 else None
+        reporter = self._user(rng)
+        fields = {
+            'created': created.strftime(JIRA_OUTPUT_FORMAT),
+            'updated': (resolved or created).strftime(JIRA_OUTPUT_FORMAT),
+            'resolutiondate': resolved.strftime(JIRA_OUTPUT_FORMAT) if resolved else None,
+            'status': {'name': status},
+            'priority': {'name': self._pick(rng, self._priorities)},
+            'issuetype': {'name': self._pick(rng, self._types)},
+            'assignee': assignee,
+            'reporter': reporter,
+            'summary': f'Synthetic issue {index + 1}',
+            'timespent': None,
+        }
+        issue = {'key': f'{self.project}-{index + 1}', 'fields': fields}
+        worklogs = []
+        if self.with_worklogs:
+            worklogs = self._worklogs(rng, created, resolved, assignee or reporter)
+            fields['worklog'] = {'startAt': 0, 'maxResults': 20, 'total': len(worklogs), 'worklogs': worklogs[:20]}
+            spent = sum(entry['timeSpentSeconds'] for entry in worklogs)
+            fields['timespent'] = spent or None
+        if self.with_changelog:
+            issue['changelog'] = {'startAt': 0, 'histories': self._histories(rng, created, resolved, status)}
+        return issue, worklogs
+    def _worklogs(self, rng: random.Random, created: datetime, resolved: Optional[datetime],
+                  author: Dict) -> List[Dict]:
+        end = resolved or created + timedelta(days=30)
+        span = max(60.0, (end - created).total_seconds())
+        count = rng.choices(range(8), weights=(30, 25, 15, 10, 8, 6, 4, 2))[0]
+        if rng.random() < 0.01:
+            # Редкие задачи с длинным журналом (усеченным в ответе поиска)
+            count = rng.randint(21, 60)
+        worklogs = []
+        for _ in range(count):
+            worker = author if rng.random() < 0.7 else self._user(rng)
+            started = created + timedelta(seconds=rng.uniform(0, span))
+            worklogs.append({
+                'author': worker,
+                'started': started.strftime(JIRA_OUTPUT_FORMAT),
+                'timeSpentSeconds': rng.choice((900, 1800, 3600, 7200, 14400, 28800)),
+            })
+        worklogs.sort(key=lambda entry: entry['started'])
+        return worklogs
+    def _histories(self, rng: random.Random, created: datetime, resolved: Optional[datetime],
+                   final_status: str) -> List[Dict]:
+        """Переходы по типичному процессу Open -> In Progress -> Patch Available -> Resolved -> Closed"""
+        if resolved:
+            path = ['Open', 'In Progress']
+            if rng.random() < 0.5:
+                path.append('Patch Available')
+            path.append('Resolved')
+            if final_status == 'Closed':
+                path.append('Closed')
+            end = resolved
+        else:
+            path = {'Open': ['Open'], 'In Progress': ['Open', 'In Progress'],
+                    'Patch Available': ['Open', 'In Progress', 'Patch Available'],
+                    'Reopened': ['Open', 'Resolved', 'Reopened']}[final_status]
+            end = created + timedelta(days=rng.uniform(1, 60))
+        transitions = len(path) - 1
+        if not transitions:
+            return []
+        span = (end - created).total_seconds()
+        # Последний переход совпадает с моментом закрытия, остальные - внутри периода
+        moments = sorted(rng.uniform(0, span) for _ in range(transitions - 1)) + [span]
+        histories = []
+        for number, (offset, (from_status, to_status)) in enumerate(zip(moments, zip(path, path[1:]))):
+            histories.append({
+                'id': str(number + 1),
+                'created': (created + timedelta(seconds=offset)).strftime(JIRA_OUTPUT_FORMAT),
+                'items': [{'field': 'status', 'fieldtype': 'jira', 'fromString': from_status, 'toString': to_status}],
+            })
+        return histories
+def generate_issues(count: int, seed: int = 0, **options) -> Iterator[Dict]:
+    """Сгенерировать count синтетических задач (генератор, см. SyntheticIssues)"""
+    return iter(SyntheticIssues(count, seed=seed, **options))
@@ -0,0 +1,94 @@
+﻿import logging
+import sys
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+logger = logging.getLogger(__name__)
+# Запись журнала работ: (автор, начало работы, затраченные секунды)
+WorklogEntry = Tuple[str, Optional[str], int]
+def _entries(worklogs: Iterable[Dict]) -> List[WorklogEntry]:
+    entries = []
+    for worklog in worklogs:
+        author = worklog.get('author') or {}
+        name = author.get('displayName', author.get('name', 'Unknown'))
+        entries.append((sys.intern(name), worklog.get('started'), int(worklog.get('timeSpentSeconds') or 0)))
+    return entries
+def extract_worklogs(issue: Dict) -> Tuple[List[WorklogEntry], bool]:
+    """
+    Извлечь встроенные записи журнала работ из задачи поиска
+    Поиск JIRA встраивает в поле worklog не более ~20 записей; если total больше,
+    журнал усечен и оставшиеся записи нужно загрузить отдельно.
+    Args:
+        issue: Задача JIRA с полем fields.worklog
+    Returns:
+        (записи журнала, признак усеченного журнала)
+    """
+    worklog = (issue.get('fields') or {}).get('worklog') or {}
+    worklogs = worklog.get('worklogs', [])
+    truncated = worklog.get('total', len(worklogs)) > len(worklogs)
+    return _entries(worklogs), truncated
+class WorklogCollector:
+    """
+    Потоковый сбор журнала работ в таблицу записей (key, author, started, seconds)
+    Встроенные журналы удаляются из задач по мере обработки; для усеченных
+    журналов запоминаются ключи задач, которые затем догружаются параллельно.
+    """
+    def __init__(self):
+        self.entries: Dict[str, List[WorklogEntry]] = {}
+        self.truncated_keys: List[str] = []
+    def consume(self, issues: Iterable[Dict]) -> Iterator[Dict]:
+        """
+        Пропустить поток задач через сборщик
+        Yields:
+            Те же задачи без поля fields.worklog
+        """
+        for issue in issues:
+            fields = issue.get('fields') or {}
+            if 'worklog' in fields:
+                entries, truncated = extract_worklogs(issue)
+                key = sys.intern(issue.get('key', 'UNKNOWN'))
+                if entries:
+                    self.entries[key] = entries
+                if truncated:
+                    self.truncated_keys.append(key)
+                del fields['worklog']
+            yield issue
+    def fetch_truncated(self, client, max_workers: Optional[int] = None) -> int:
+        """
+        Догрузить полные журналы для задач с усеченными встроенными журналами
+        Args:
+            client: JiraClient
+            max_workers: Количество параллельных запросов (по умолчанию client.max_workers)
+        Returns:
+            Количество догруженных задач
+        """
+        if not self.truncated_keys:
+            return 0
+        print(f"⏱️ Догрузка журналов работ: {len(self.truncated_keys)} задач")
+        loaded = 0
+        for key, worklogs in client.iter_worklogs(self.truncated_keys, max_workers=max_workers):
+            self.entries[key] = _entries(worklogs)
+            loaded += 1
+        self.truncated_keys = []
+        return loaded
+    def to_frame(self):
+        """Записи журнала в виде DataFrame: key, author, started (UTC), seconds, hours"""
+        keys, authors, started, seconds = [], [], [], []
+        for key, entries in self.entries.items():
+            for author, start, spent in entries:
+                keys.append(key)
+                authors.append(author)
+                started.append(start)
+                seconds.append(spent)
+        return worklog_frame(keys, authors, started, seconds)
+def worklog_frame(keys: List[str], authors: List[str], started: List[Optional[str]], seconds: List[int]):
+    """Построить DataFrame записей журнала работ (даты начала разбираются векторизованно)"""
+    import pandas as pd
+    from .data_processor import parse_jira_timestamps
+    started_ts, _ = parse_jira_timestamps(pd.Series(started, dtype=object))
+    df = pd.DataFrame({
+        'key': pd.Series(keys, dtype=object),
+        'author': pd.Series(authors, dtype=object).astype('category'),
+        'started': started_ts,
+        'seconds': pd.Series(seconds, dtype='int64')
+    })
+    df['hours'] = df['seconds'] / 3600
+    return df
@@ -0,0 +1,81 @@
+﻿import sys
+import os
+import time
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import tempfile
+from src.cache import ResponseCache
+from src.jira_client import JiraClient
+from tests.test_jira_client import FakeSearchSession
+def test_cache_set_and_get():
+    """Тест записи и чтения кэша"""
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        cache = ResponseCache(cache_dir=tmp_dir, ttl=60)
+        key = ResponseCache.make_key('https://test.com', 'project = TEST', 'key', 0, 10)
+        assert cache.get(key) is None
+        cache.set(key, {'total': 1, 'issues': [{'key': 'TEST-1'}]})
+        assert cache.get(key) == {'total': 1, 'issues': [{'key': 'TEST-1'}]}
+        assert cache.hits == 1
+        assert cache.misses == 1
+    print("✓ test_cache_set_and_get passed")
+def test_cache_ttl_expiry():
+    """Тест устаревания записей кэша"""
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        cache = ResponseCache(cache_dir=tmp_dir, ttl=60)
+        key = ResponseCache.make_key('page', 0)
+        cache.set(key, {'issues': []})
+        # Состариваем запись
+        old = time.time() - 120
+        os.utime(cache._path(key), (old, old))
+        assert cache.get(key) is None
+        assert not os.path.exists(cache._path(key))
+    print("✓ test_cache_ttl_expiry passed")
+def test_cache_size_eviction():
+    """Тест вытеснения старых записей при превышении размера"""
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        cache = ResponseCache(cache_dir=tmp_dir, ttl=3600, max_size_mb=0.01)
+        payload = {'data': os.urandom(4096).hex()}
+        keys = [ResponseCache.make_key('page', i) for i in range(5)]
+        for i, key in enumerate(keys):
+            cache.set(key, payload)
+            stamp = time.time() - 100 + i
+            os.utime(cache._path(key), (stamp, stamp))
+        assert cache._size_bytes <= cache.max_size_bytes
+        assert cache.get(keys[-1]) is not None
+        assert cache.get(keys[0]) is None
+    print("✓ test_cache_size_eviction passed")
+def test_cache_counters_from_threads():
+    """Тест счетчиков попаданий и промахов при обращении к кэшу из нескольких потоков"""
+    from concurrent.futures import ThreadPoolExecutor
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        cache = ResponseCache(cache_dir=tmp_dir, ttl=60)
+        cache.set('present', {'total': 0})
+        def lookup(i):
+            return cache.get('present' if i % 2 else f'missing-{i}')
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            list(executor.map(lookup, range(400)))
+        assert cache.hits == 200
+        assert cache.misses == 200
+    print("✓ test_cache_counters_from_threads passed")
+def test_client_uses_cache():
+    """Тест повторной загрузки из кэша без обращения к сети"""
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        cache = ResponseCache(cache_dir=tmp_dir, ttl=60)
+        client = JiraClient("https://test.com", "TEST", max_results=0, page_size=10, cache=cache)
+        client.session = FakeSearchSession(total=25)
+        first = client.get_issues("project = TEST")
+        assert len(client.session.calls) == 3
+        second = client.get_issues("project = TEST")
+        assert second == first
+        assert len(client.session.calls) == 3
+        # Флаг обновления идет в сеть и перезаписывает кэш
+        client.refresh_cache = True
+        client.get_issues("project = TEST")
+        assert len(client.session.calls) == 6
+    print("✓ test_client_uses_cache passed")
+if __name__ == "__main__":
+    test_cache_set_and_get()
+    test_cache_ttl_expiry()
+    test_cache_size_eviction()
+    test_cache_counters_from_threads()
+    test_client_uses_cache()
+    print("\n✅ Все тесты ResponseCache пройдены!")
@@ -0,0 +1,93 @@
+﻿import sys
+import os
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import tempfile
+from datetime import datetime, timezone
+from typing import Dict
+from src.changelog import extract_status_intervals, StatusIntervalCollector
+from src.data_processor import calculate_status_time_distribution
+from src.issue_store import IssueStore
+def create_issue_with_changelog(key: str = 'TEST-1') -> Dict:
+    """Задача: Open (24 ч) -> In Progress (48 ч) -> Resolved (закрыта) -> Closed"""
+    return {
+        'key': key,
+        'fields': {
+            'created': '2023-01-01T00:00:00.000+0000',
+            'resolutiondate': '2023-01-04T00:00:00.000+0000',
+            'status': {'name': 'Closed'}
+        },
+        'changelog': {
+            'histories': [
+                {'created': '2023-01-02T00:00:00.000+0000',
+                 'items': [{'field': 'status', 'fromString': 'Open', 'toString': 'In Progress'}]},
+                {'created': '2023-01-03T12:00:00.000+0000',
+                 'items': [{'field': 'assignee', 'fromString': None, 'toString': 'Alice'}]},
+                {'created': '2023-01-04T00:00:00.000+0000',
+                 'items': [{'field': 'status', 'fromString': 'In Progress', 'toString': 'Resolved'}]},
+                {'created': '2023-01-05T00:00:00.000+0000',
+                 'items': [{'field': 'status', 'fromString': 'Resolved', 'toString': 'Closed'}]}
+            ]
+        }
+    }
+def test_extract_status_intervals():
+    """Тест восстановления интервалов статусов"""
+    intervals = extract_status_intervals(create_issue_with_changelog())
+    assert [interval[0] for interval in intervals] == ['Open', 'In Progress', 'Resolved', 'Closed']
+    assert intervals[0][1] == '2023-01-01T00:00:00.000+0000'
+    assert intervals[1][2] == '2023-01-04T00:00:00.000+0000'
+    # Последний интервал заканчивается датой закрытия задачи
+    assert intervals[-1][2] == '2023-01-04T00:00:00.000+0000'
+    print("✓ test_extract_status_intervals passed")
+def test_collector_strips_changelog():
+    """Тест потокового сбора: changelog удаляется из задач"""
+    collector = StatusIntervalCollector()
+    issues = list(collector.consume(create_issue_with_changelog(f'TEST-{i}') for i in range(3)))
+    assert all('changelog' not in issue for issue in issues)
+    assert collector.issues_with_changelog == 3
+    df = collector.to_frame()
+    # Интервал Closed (после даты закрытия) отрицательный и отбрасывается
+    assert len(df) == 9
+    hours = df[df['key'] == 'TEST-0'].set_index('status')['hours_in_status'].to_dict()
+    assert hours == {'Open': 24.0, 'In Progress': 48.0, 'Resolved': 24.0}
+    print("✓ test_collector_strips_changelog passed")
+def test_open_issue_interval_ends_now():
+    """Тест незакрытой задачи: последний интервал длится до момента as_of"""
+    issue = {'key': 'TEST-5', 'fields': {'created': '2023-01-01T00:00:00.000+0000', 'status': {'name': 'Open'}},
+             'changelog': {'histories': []}}
+    collector = StatusIntervalCollector()
+    list(collector.consume([issue]))
+    df = collector.to_frame(as_of=datetime(2023, 1, 2, tzinfo=timezone.utc))
+    assert df['status'].tolist() == ['Open']
+    assert df['hours_in_status'].tolist() == [24.0]
+    print("✓ test_open_issue_interval_ends_now passed")
+def test_status_distribution_from_changelog():
+    """Тест распределения по статусам на основе changelog"""
+    issues = [create_issue_with_changelog()]
+    result = calculate_status_time_distribution(issues)
+    assert set(result['status']) == {'Open', 'In Progress', 'Resolved'}
+    # Исходные задачи не изменяются
+    assert 'changelog' in issues[0]
+    collector = StatusIntervalCollector()
+    stripped = list(collector.consume(create_issue_with_changelog() for _ in range(1)))
+    result = calculate_status_time_distribution(stripped, intervals=collector.to_frame())
+    assert result.set_index('status')['hours_in_status']['In Progress'] == 48.0
+    print("✓ test_status_distribution_from_changelog passed")
+def test_store_status_intervals():
+    """Тест сохранения интервалов статусов в хранилище"""
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        store = IssueStore(os.path.join(tmp_dir, 'issues.db'))
+        issue = create_issue_with_changelog()
+        store.replace_status_intervals('s', {'TEST-1': extract_status_intervals(issue)})
+        # Повторная запись заменяет интервалы задачи, а не дублирует их
+        store.replace_status_intervals('s', {'TEST-1': extract_status_intervals(issue)})
+        df = store.read_status_intervals('s')
+        assert df['status'].tolist() == ['Open', 'In Progress', 'Resolved']
+        store.close()
+    print("✓ test_store_status_intervals passed")
+if __name__ == "__main__":
+    test_extract_status_intervals()
+    test_collector_strips_changelog()
+    test_open_issue_interval_ends_now()
+    test_status_distribution_from_changelog()
+    test_store_status_intervals()
+    print("\n✅ Все тесты changelog пройдены!")
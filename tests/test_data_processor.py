@@ -1,9 +1,22 @@
 ﻿import sys
 import os
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import numpy as np
 import pandas as pd
 from typing import List, Dict
-from src.data_processor import calculate_open_time
+from src.data_processor import (
+    calculate_open_time,
+    normalize_issues,
+    parse_jira_timestamps,
+    calculate_daily_issues_stats,
+    calculate_status_time_distribution,
+    downsample_daily_stats,
+    lttb_indices,
+    box_summary,
+    kde_curve,
+    summarize_distribution,
+    summarize_status_times
+)
 def test_calculate_open_time_empty_list():
     """Тест с пустым списком задач"""
     issues: List[Dict] = []
@@ -93,10 +106,216 @@ def test_calculate_open_time_dataframe_structure():
     for col in expected_columns:
         assert col in result.columns
     print("✓ test_calculate_open_time_dataframe_structure passed")
+def test_calculate_open_time_generator():
+    """Тест обработки задач из генератора (постраничная загрузка)"""
+    def issue_stream():
+        for i in range(3):
+            yield {
+                'key': f'TEST-GEN-{i}',
+                'fields': {
+                    'created': '2023-01-01T00:00:00.000+0000',
+                    'resolutiondate': '2023-01-02T00:00:00.000+0000'
+                }
+            }
+    result = calculate_open_time(issue_stream())
+    assert len(result) == 3
+    assert result['key'].tolist() == ['TEST-GEN-0', 'TEST-GEN-1', 'TEST-GEN-2']
+    print("✓ test_calculate_open_time_generator passed")
+def test_normalize_issues_types():
+    """Тест типов колонок нормализованного DataFrame"""
+    issues: List[Dict] = [
+        {
+            'key': 'TEST-8',
+            'fields': {
+                'created': '2023-01-01T00:00:00.000+0300',
+                'resolutiondate': '2023-01-02T00:00:00.000+0000',
+                'status': {'name': 'Closed'},
+                'priority': {'name': 'Major'},
+                'timespent': 3600
+            }
+        },
+        {'key': 'TEST-9', 'fields': {'created': None, 'resolutiondate': None}}
+    ]
+    df = normalize_issues(issues)
+    assert len(df) == 2
+    assert pd.api.types.is_datetime64_any_dtype(df['created'])
+    assert str(df['created'].dt.tz) == 'UTC'
+    assert df['created'].iloc[0] == pd.Timestamp('2022-12-31T21:00:00Z')
+    assert isinstance(df['status'].dtype, pd.CategoricalDtype)
+    assert df['resolved'].isna().iloc[1]
+    # Повторная нормализация не копирует данные
+    assert normalize_issues(df) is df
+    # Метрики принимают нормализованный DataFrame
+    status = calculate_status_time_distribution(df)
+    assert status['status'].tolist() == ['Closed']
+    assert abs(status['hours_in_status'].iloc[0] - 27.0) < 0.1
+    print("✓ test_normalize_issues_types passed")
+def test_parse_jira_timestamps_fallback():
+    """Тест быстрого разбора дат с построчным разбором нестандартных значений"""
+    values = pd.Series([
+        '2023-01-01T00:00:00.000+0300',  # Формат JIRA
+        None,                            # Пустое значение - не ошибка
+        '2023-01-01T00:00:00+02:00',     # ISO 8601 с двоеточием в поясе
+        '2023-05-01',                    # Дата без часового пояса
+        'garbage'                        # Некорректное значение
+    ])
+    parsed, rejects = parse_jira_timestamps(values)
+    assert rejects == 1
+    assert parsed.iloc[0] == pd.Timestamp('2022-12-31T21:00:00Z')
+    assert pd.isna(parsed.iloc[1])
+    assert parsed.iloc[2] == pd.Timestamp('2022-12-31T22:00:00Z')
+    assert parsed.iloc[3] == pd.Timestamp('2023-05-01T00:00:00Z')
+    assert pd.isna(parsed.iloc[4])
+    print("✓ test_parse_jira_timestamps_fallback passed")
+def test_calculate_daily_issues_stats_calendar():
+    """Тест статистики по датам с заполнением пропусков и детализацией"""
+    issues: List[Dict] = [
+        {'key': 'TEST-10', 'fields': {'created': '2023-01-02T10:00:00.000+0000',
+                                      'resolutiondate': '2023-01-05T10:00:00.000+0000'}},
+        {'key': 'TEST-11', 'fields': {'created': '2023-01-02T12:00:00.000+0000',
+                                      'resolutiondate': '2023-01-10T10:00:00.000+0000'}}
+    ]
+    sparse = calculate_daily_issues_stats(issues)
+    assert len(sparse) == 3
+    dense = calculate_daily_issues_stats(issues, fill_gaps=True)
+    assert len(dense) == 9
+    assert dense['created_today'].sum() == 2
+    assert dense['open_cumulative'].tolist() == [2, 2, 2, 1, 1, 1, 1, 1, 0]
+    weekly = calculate_daily_issues_stats(issues, freq='W')
+    assert [str(d) for d in weekly['date']] == ['2023-01-02', '2023-01-09']
+    assert weekly['resolved_cumulative'].iloc[-1] == 2
+    for freq in ('Q', 'Y'):
+        coarse = calculate_daily_issues_stats(issues, freq=freq)
+        assert [str(d) for d in coarse['date']] == ['2023-01-01']
+        assert coarse['created_today'].tolist() == [2] and coarse['open_cumulative'].tolist() == [0]
+    print("✓ test_calculate_daily_issues_stats_calendar passed")
+def _long_daily_stats(days: int = 3000) -> pd.DataFrame:
+    """Статистика по дням за несколько лет: всплеск созданных задач в середине периода"""
+    issues = []
+    start = pd.Timestamp('2015-01-01', tz='UTC')
+    for day in range(days):
+        created = start + pd.Timedelta(days=day, hours=10)
+        for number in range(20 if day == days // 2 else 1 + day % 3):
+            issues.append({'key': f'TEST-{day}-{number}', 'fields': {
+                'created': created.strftime('%Y-%m-%dT%H:%M:%S.000+0000'),
+                'resolutiondate': (created + pd.Timedelta(days=5 + number)).strftime('%Y-%m-%dT%H:%M:%S.000+0000')}})
+    return calculate_daily_issues_stats(issues, fill_gaps=True)
+def test_lttb_indices_keep_endpoints_and_peaks():
+    """Тест LTTB: заданное число точек, первая и последняя точки и пик сохраняются"""
+    x = np.arange(1000)
+    y = np.sin(x / 50.0)
+    y[437] = 10
+    indices = lttb_indices(x, y, 100)
+    assert len(indices) == 100
+    assert indices[0] == 0 and indices[-1] == 999
+    assert 437 in indices
+    assert (np.diff(indices) > 0).all()
+    assert lttb_indices(x[:50], y[:50], 100).tolist() == list(range(50))
+    print("✓ test_lttb_indices_keep_endpoints_and_peaks passed")
+def test_downsample_daily_stats():
+    """Тест прореживания: укрупнение периодов и LTTB в пределах бюджета, точные накопительные итоги"""
+    daily = _long_daily_stats()
+    assert downsample_daily_stats(daily, max_points=len(daily)) is daily
+    weekly = downsample_daily_stats(daily, max_points=500)
+    assert len(weekly) <= 500 and weekly.attrs['freq'] == 'W'
+    assert weekly.attrs['downsampled'] == {'method': 'aggregate', 'points': len(daily)}
+    assert weekly['created_today'].sum() == daily['created_today'].sum()
+    assert weekly['resolved_today'].sum() == daily['resolved_today'].sum()
+    assert weekly.iloc[-1][['created_cumulative', 'resolved_cumulative', 'open_cumulative']].tolist() == \
+        daily.iloc[-1][['created_cumulative', 'resolved_cumulative', 'open_cumulative']].tolist()
+    # Накопительный итог на конец каждой недели совпадает с дневным
+    by_day = daily.set_index(pd.to_datetime(daily['date']))['created_cumulative']
+    week_ends = pd.to_datetime(weekly['date']) + pd.Timedelta(days=6)
+    assert (by_day.reindex(week_ends).ffill().to_numpy()[:-1] == weekly['created_cumulative'].to_numpy()[:-1]).all()
+    monthly = downsample_daily_stats(daily, max_points=120)
+    assert monthly.attrs['freq'] == 'M' and len(monthly) <= 120
+    sampled = downsample_daily_stats(daily, max_points=300, method='lttb')
+    assert len(sampled) <= 300 and sampled.attrs['downsampled']['method'] == 'lttb'
+    assert sampled['date'].iloc[0] == daily['date'].iloc[0] and sampled['date'].iloc[-1] == daily['date'].iloc[-1]
+    assert sampled['created_today'].max() == daily['created_today'].max()
+    merged = sampled.merge(daily, on='date', suffixes=('', '_daily'))
+    assert (merged['open_cumulative'] == merged['open_cumulative_daily']).all()
+    try:
+        downsample_daily_stats(daily, method='mean')
+        assert False, "ожидался ValueError"
+    except ValueError:
+        pass
+    print("✓ test_downsample_daily_stats passed")
+def test_box_summary_matches_matplotlib():
+    """Тест: пятичисловая сводка совпадает с matplotlib boxplot_stats, выбросы ограничены"""
+    from matplotlib.cbook import boxplot_stats
+    values = np.random.default_rng(1).lognormal(3, 1, 5000)
+    summary = box_summary(values, max_fliers=50)
+    expected = boxplot_stats(values)[0]
+    for name in ('med', 'q1', 'q3', 'whislo', 'whishi', 'mean'):
+        assert np.isclose(summary[name], expected[name])
+    assert summary['outliers'] == len(expected['fliers']) > 50
+    assert len(summary['fliers']) == 50
+    assert summary['fliers'][-1] == values.max()
+    assert box_summary([np.nan]) == {}
+    print("✓ test_box_summary_matches_matplotlib passed")
+def test_kde_curve_matches_direct_estimate():
+    """Тест: KDE через биннинг и FFT совпадает с прямым расчетом гауссовой оценки"""
+    values = np.random.default_rng(2).normal(50, 10, 3000)
+    x, density = kde_curve(values)
+    bandwidth = values.std(ddof=1) * len(values) ** (-1 / 5)
+    direct = np.exp(-0.5 * ((x[:, None] - values[None, :]) / bandwidth) ** 2).sum(axis=1) / \
+        (len(values) * bandwidth * np.sqrt(2 * np.pi))
+    assert np.abs(density - direct).max() < 0.01 * direct.max()
+    assert len(kde_curve([1.0, 1.0, 1.0])[0]) == 0
+    print("✓ test_kde_curve_matches_direct_estimate passed")
+def test_summarize_distribution():
+    """Тест сводки распределения: интервалы как у numpy.histogram, KDE и box plot в attrs"""
+    values = np.random.default_rng(3).exponential(100, 10000)
+    df = pd.DataFrame({'open_hours': values})
+    summary = summarize_distribution(df, 'open_hours', bins=30, kde=True)
+    counts, edges = np.histogram(values, bins=30)
+    assert summary['count'].tolist() == counts.tolist()
+    assert np.allclose(summary['left'], edges[:-1]) and np.allclose(summary['right'], edges[1:])
+    assert summary.attrs['total'] == 10000
+    assert np.isclose(summary.attrs['median'], np.median(values))
+    assert len(summary.attrs['kde']['x']) == len(summary.attrs['kde']['y']) > 0
+    assert summary.attrs['box']['count'] == 10000
+    log_summary = summarize_distribution(df, 'open_hours', bins=20, log_bins=True)
+    assert len(log_summary) == 20 and log_summary.attrs['kde'] is None
+    assert np.allclose(np.diff(np.log10(log_summary['left'])), np.diff(np.log10(log_summary['left']))[0])
+    assert summarize_distribution(pd.DataFrame(), 'open_hours').empty
+    print("✓ test_summarize_distribution passed")
+def test_summarize_status_times():
+    """Тест сводки статусов: квартили и усы как у boxplot_stats по каждому статусу, выбросы ограничены"""
+    from matplotlib.cbook import boxplot_stats
+    rng = np.random.default_rng(4)
+    statuses = rng.choice(['Open', 'In Progress', 'Closed'], 20000, p=[0.5, 0.3, 0.2])
+    hours = rng.lognormal(3, 1.2, 20000) * np.where(statuses == 'Closed', 3, 1)
+    data = pd.DataFrame({'key': [f'TEST-{i}' for i in range(20000)], 'status': statuses, 'hours_in_status': hours})
+    summary = summarize_status_times(data, max_fliers=30)
+    assert summary['status'].tolist()[0] == 'Closed'
+    assert summary['med'].is_monotonic_decreasing
+    assert summary['count'].sum() == 20000
+    for row in summary.itertuples():
+        expected = boxplot_stats(hours[statuses == row.status])[0]
+        for name in ('q1', 'med', 'q3', 'whislo', 'whishi', 'mean'):
+            assert np.isclose(getattr(row, name), expected[name])
+        assert row.outliers == len(expected['fliers'])
+        fliers = summary.attrs['fliers'][row.status]
+        assert len(fliers) == min(30, row.outliers)
+        assert fliers[-1] == max(expected['fliers'])
+    assert summarize_status_times(pd.DataFrame()).empty
+    print("✓ test_summarize_status_times passed")
 if __name__ == "__main__":
     test_calculate_open_time_empty_list()
     test_calculate_open_time_single_issue()
     test_calculate_open_time_missing_dates()
     test_calculate_open_time_multiple_issues()
     test_calculate_open_time_dataframe_structure()
+    test_calculate_open_time_generator()
+    test_normalize_issues_types()
+    test_parse_jira_timestamps_fallback()
+    test_calculate_daily_issues_stats_calendar()
+    test_lttb_indices_keep_endpoints_and_peaks()
+    test_downsample_daily_stats()
+    test_box_summary_matches_matplotlib()
+    test_kde_curve_matches_direct_estimate()
+    test_summarize_distribution()
+    test_summarize_status_times()
     print("\n✅ Все тесты DataProcessor пройдены!")
@@ -15,6 +15,7 @@ from src.data_processor import (
     calculate_time_spent_distribution,
     calculate_status_time_distribution
 )
+from src.metric_fields import jira_request_for
 def create_test_issues(count: int = 10) -> List[Dict]:
     """Создание тестовых задач"""
     issues = []
@@ -96,6 +97,50 @@ def test_data_types():
         assert 'count' in df2.columns
         print("  ✓ Типы данных calculate_priority_distribution")
     print("✅ Все типы данных корректны!")
+def test_top_users_weights():
+    """Тест топа пользователей с весами задач"""
+    issues = create_test_issues(10)
+    counts = calculate_top_users(issues, top_n=3)
+    assert len(counts) == 3
+    assert counts['total_tasks'].is_monotonic_decreasing
+    # Каждая задача учитывается дважды: репортер и исполнитель
+    assert calculate_top_users(issues, top_n=100)['total_tasks'].sum() == 20
+    hours = calculate_top_users(issues, top_n=100, weight='timespent')
+    assert abs(hours['total_tasks'].sum() - 2 * sum(range(10))) < 1e-9
+    assert abs(hours['as_reporter'].sum() - sum(range(10))) < 1e-9
+    issues[0]['fields']['resolutiondate'] = None
+    resolved = calculate_top_users(issues, top_n=100, weight='resolved')
+    assert resolved['total_tasks'].sum() == 18
+    print("  ✓ calculate_top_users с весами")
+def test_jira_request_for_enabled_metrics():
+    """Тест запроса только полей, нужных включенным метрикам"""
+    fields, expand = jira_request_for(['priority'])
+    assert fields == 'priority'
+    assert expand is None
+    # Для хранилища запрос не зависит от включенных графиков: все колонки и отметка updated
+    fields, expand = jira_request_for(['open_time', 'status'], status_from_changelog=True, incremental=True)
+    assert fields.split(',') == ['key', 'created', 'resolutiondate', 'updated', 'status', 'priority',
+                                 'assignee', 'reporter', 'timespent', 'issuetype']
+    assert expand == 'changelog'
+    assert jira_request_for(['priority'], status_from_changelog=True, incremental=True,
+                            top_users_weight='resolved') == (fields, expand)
+    # changelog не нужен, если график статусов выключен
+    fields, expand = jira_request_for(['daily'], status_from_changelog=True, worklogs=True)
+    assert fields.split(',') == ['created', 'resolutiondate', 'worklog']
+    assert expand is None
+    # Вес задачи в рейтинге пользователей добавляет нужное ему поле
+    assert jira_request_for(['top_users'])[0] == 'reporter,assignee'
+    assert jira_request_for(['top_users'], top_users_weight='resolved')[0] == 'reporter,assignee,resolutiondate'
+    assert jira_request_for(['top_users'], top_users_weight='timespent')[0] == 'reporter,assignee,timespent'
+    assert jira_request_for(['priority'], top_users_weight='timespent')[0] == 'priority'
+    try:
+        jira_request_for(['top_users'], top_users_weight='votes')
+        assert False, "ожидался ValueError"
+    except ValueError:
+        pass
+    all_fields = jira_request_for()[0].split(',')
+    assert 'summary' not in all_fields and 'worklog' not in all_fields
+    print("  ✓ jira_request_for")
 if __name__ == "__main__":
     print("=" * 60)
     print("ТЕСТИРОВАНИЕ ПОЛНОГО ПОКРЫТИЯ")
@@ -103,6 +148,8 @@ if __name__ == "__main__":
     test_all_functions_with_data()
     test_empty_data()
     test_data_types()
+    test_top_users_weights()
+    test_jira_request_for_enabled_metrics()
     print("\n" + "=" * 60)
     print("ВСЕ ТЕСТЫ ПРОЙДЕНЫ УСПЕШНО!")
     print("=" * 60)
@@ -0,0 +1,107 @@
+﻿import sys
+import os
+import time
+from datetime import datetime, timezone
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import requests
+from src.http_transport import HttpTransport, TokenBucket, parse_retry_after
+from src.jira_client import JiraClient
+class StatusResponse:
+    """Заглушка ответа с кодом статуса и заголовками"""
+    def __init__(self, status_code=200, data=None, headers=None):
+        self.status_code = status_code
+        self.headers = headers or {}
+        self._data = data or {}
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            raise requests.exceptions.HTTPError(f"{self.status_code} Error")
+    def json(self):
+        return self._data
+class ScriptedSession:
+    """Заглушка сессии, возвращающая заранее заданную последовательность ответов"""
+    def __init__(self, responses):
+        self.responses = list(responses)
+        self.calls = 0
+    def get(self, url, params=None, timeout=None, **kwargs):
+        self.calls += 1
+        response = self.responses.pop(0)
+        if isinstance(response, Exception):
+            raise response
+        return response
+def test_parse_retry_after():
+    """Тест разбора Retry-After в секундах и в виде HTTP-даты"""
+    now = datetime(2024, 1, 1, 12, 0, 0, tzinfo=timezone.utc)
+    assert parse_retry_after('7') == 7.0
+    assert parse_retry_after('Mon, 01 Jan 2024 12:00:30 GMT', now=now) == 30.0
+    assert parse_retry_after('Mon, 01 Jan 2024 11:00:00 GMT', now=now) == 0.0
+    assert parse_retry_after(None) is None
+    assert parse_retry_after('soon') is None
+    print("✓ test_parse_retry_after passed")
+def test_transport_retries_throttled_and_server_errors():
+    """Тест повторов после 429 (с Retry-After), 503 и сетевой ошибки"""
+    transport = HttpTransport(max_retries=3, backoff_factor=0.001)
+    transport.session = ScriptedSession([
+        StatusResponse(429, headers={'Retry-After': '0'}),
+        StatusResponse(503),
+        requests.exceptions.ConnectionError("reset"),
+        StatusResponse(200, {'ok': True}),
+    ])
+    response = transport.get('https://test.com/rest/api/2/search')
+    assert response.json() == {'ok': True}
+    assert transport.stats == {'requests': 4, 'retries': 3, 'throttled': 1}
+    print("✓ test_transport_retries_throttled_and_server_errors passed")
+def test_transport_gives_up_after_max_retries():
+    """Тест: после исчерпания попыток возвращается последний ответ, ошибки не повторяются"""
+    transport = HttpTransport(max_retries=1, backoff_factor=0.001)
+    transport.session = ScriptedSession([StatusResponse(500), StatusResponse(502)])
+    assert transport.get('https://test.com').status_code == 502
+    transport.session = ScriptedSession([StatusResponse(404)])
+    assert transport.get('https://test.com').status_code == 404
+    assert transport.session.calls == 1
+    print("✓ test_transport_gives_up_after_max_retries passed")
+def test_token_bucket_limits_rate():
+    """Тест ограничения частоты: после исчерпания корзины запросы идут с заданной частотой"""
+    bucket = TokenBucket(rate=50, burst=5)
+    start = time.monotonic()
+    for _ in range(15):
+        bucket.acquire()
+    elapsed = time.monotonic() - start
+    # 5 запросов из корзины сразу, остальные 10 - не быстрее 50 в секунду
+    assert elapsed >= 0.18, elapsed
+    unlimited = TokenBucket()
+    start = time.monotonic()
+    for _ in range(1000):
+        unlimited.acquire()
+    assert time.monotonic() - start < 0.5
+    print("✓ test_token_bucket_limits_rate passed")
+def _page(start_at, total, size=10):
+    issues = [{'key': f'TEST-{i}', 'fields': {}} for i in range(start_at, min(start_at + size, total))]
+    return StatusResponse(200, {'startAt': start_at, 'maxResults': size, 'total': total, 'issues': issues})
+def test_get_issues_reports_partial_fetch():
+    """Тест: сбой на середине загрузки возвращает полученные задачи и отмечается как partial"""
+    client = JiraClient("https://test.com", "TEST", max_results=0, page_size=10, max_retries=0)
+    client.session = ScriptedSession([_page(0, 50), _page(10, 50), StatusResponse(500)])
+    issues = client.get_issues("project = TEST")
+    assert len(issues) == 20
+    assert client.last_fetch['status'] == 'partial'
+    assert client.last_fetch['total'] == 50
+    assert 'HTTPError' in client.last_fetch['error']
+    print("✓ test_get_issues_reports_partial_fetch passed")
+def test_get_issues_reports_failed_and_complete_fetch():
+    """Тест статусов failed (нет ни одной задачи) и complete"""
+    client = JiraClient("https://test.com", "TEST", max_results=0, page_size=10, max_retries=0)
+    client.session = ScriptedSession([StatusResponse(503)])
+    assert client.get_issues("project = TEST") == []
+    assert client.last_fetch['status'] == 'failed'
+    client.session = ScriptedSession([_page(0, 15), _page(10, 15)])
+    assert len(client.get_issues("project = TEST")) == 15
+    assert client.last_fetch == {'status': 'complete', 'issues': 15, 'total': 15, 'error': None}
+    print("✓ test_get_issues_reports_failed_and_complete_fetch passed")
+if __name__ == "__main__":
+    test_parse_retry_after()
+    test_transport_retries_throttled_and_server_errors()
+    test_transport_gives_up_after_max_retries()
+    test_token_bucket_limits_rate()
+    test_get_issues_reports_partial_fetch()
+    test_get_issues_reports_failed_and_complete_fetch()
+    print("\n✅ Все тесты HttpTransport пройдены!")
@@ -0,0 +1,137 @@
+﻿import sys
+import os
+import json
+import tempfile
+import time
+import yaml
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from src.instrumentation import Instrumentation, timed_call
+def test_spans_record_time_items_and_labels():
+    """Тест: span, декоратор и внешние замеры попадают в отчет с метками и сводкой по стадиям"""
+    instrumentation = Instrumentation()
+    with instrumentation.span('fetch', items=3) as span:
+        time.sleep(0.02)
+        span.bytes = 1024
+    with instrumentation.labels(project='KAFKA'):
+        @instrumentation.traced('calculate:daily')
+        def calculate():
+            return [1, 2, 3, 4]
+        assert calculate() == [1, 2, 3, 4]
+        assert calculate() == [1, 2, 3, 4]
+    _, seconds, cpu, _ = timed_call(sum, range(1000))
+    instrumentation.record('plot:daily', seconds, cpu, items=10, process='pool')
+    try:
+        with instrumentation.span('plot:broken'):
+            raise RuntimeError("boom")
+    except RuntimeError:
+        pass
+    report = instrumentation.report(run='test')
+    assert report['meta']['run'] == 'test'
+    spans = {span['name']: span for span in report['spans']}
+    assert spans['fetch']['wall'] >= 0.02 and spans['fetch']['items'] == 3 and spans['fetch']['bytes'] == 1024
+    assert spans['calculate:daily']['project'] == 'KAFKA' and spans['calculate:daily']['items'] == 4
+    assert 'project' not in spans['fetch']
+    assert spans['plot:daily']['process'] == 'pool'
+    assert spans['plot:broken']['error'] == "RuntimeError: boom"
+    assert report['stages']['calculate:daily']['count'] == 2
+    assert report['stages']['calculate:daily']['items'] == 8
+    disabled = Instrumentation(enabled=False)
+    with disabled.span('fetch'):
+        pass
+    assert disabled.record('plot:daily', 1.0) is None
+    assert disabled.spans == []
+    print("✓ test_spans_record_time_items_and_labels passed")
+def test_profile_selected_stage():
+    """Тест: профилируется только выбранная стадия (cProfile - файл .prof, tracemalloc - места выделения)"""
+    profile_dir = tempfile.mkdtemp()
+    instrumentation = Instrumentation(profile_stage='calculate:*', profile_dir=profile_dir, profile_top=5)
+    with instrumentation.span('calculate:open_time'):
+        sorted(str(i) for i in range(20000))
+    with instrumentation.span('plot:open_time'):
+        pass
+    first, second = instrumentation.spans
+    assert first.meta['profile']['mode'] == 'cprofile'
+    assert 0 < len(first.meta['profile']['top']) <= 5
+    assert os.path.exists(first.meta['profile']['file'])
+    assert 'profile' not in second.meta
+    instrumentation = Instrumentation(profile_stage='normalize', profile_mode='tracemalloc')
+    with instrumentation.span('normalize'):
+        data = [bytearray(1024) for _ in range(2000)]
+    profile = instrumentation.spans[0].meta['profile']
+    assert profile['mode'] == 'tracemalloc' and profile['peak_mb'] >= 2
+    assert profile['top'][0]['size_kb'] > 0
+    del data
+    try:
+        Instrumentation(profile_mode='perf')
+        assert False, "ожидался ValueError"
+    except ValueError:
+        pass
+    print("✓ test_profile_selected_stage passed")
+def test_tracemalloc_profile_without_reset_peak():
+    """Тест: без tracemalloc.reset_peak (Python 3.8) пик стадии не включает выделения до ее начала"""
+    import tracemalloc
+    reset_peak = getattr(tracemalloc, 'reset_peak', None)
+    tracemalloc.start()
+    try:
+        earlier = [bytearray(1024) for _ in range(8000)]
+        del earlier
+        if reset_peak is not None:
+            del tracemalloc.reset_peak
+        instrumentation = Instrumentation(profile_stage='normalize', profile_mode='tracemalloc')
+        with instrumentation.span('normalize'):
+            small = [bytearray(1024) for _ in range(500)]
+        assert tracemalloc.is_tracing()
+        peak_mb = instrumentation.spans[0].meta['profile']['peak_mb']
+        assert 0.4 < peak_mb < 6
+        with instrumentation.span('normalize'):
+            large = [bytearray(1024) for _ in range(16000)]
+        assert instrumentation.spans[1].meta['profile']['peak_mb'] >= 15
+        del small, large
+    finally:
+        if reset_peak is not None:
+            tracemalloc.reset_peak = reset_peak
+        tracemalloc.stop()
+    print("✓ test_tracemalloc_profile_without_reset_peak passed")
+def test_main_writes_run_report():
+    """Тест: запуск на тестовом сервере JIRA сохраняет отчет о стадиях рядом с графиками"""
+    from benchmarks.mock_jira_server import MockJiraServer
+    from src.synthetic_data import SyntheticIssues
+    from src.main import main
+    work_dir = tempfile.mkdtemp()
+    output_dir = os.path.join(work_dir, 'plots')
+    previous_dir = os.getcwd()
+    with MockJiraServer(SyntheticIssues(300, seed=4)) as server:
+        config = {
+            'jira': {'server': server.url, 'project_key': 'SYN', 'max_results': 0, 'page_size': 100},
+            'plots': {'output_dir': output_dir, 'render_cache': False},
+            'analysis': {'status_from_changelog': True},
+            'performance': {'run_report': True, 'compact_records': True}
+        }
+        config_path = os.path.join(work_dir, 'config.yaml')
+        with open(config_path, 'w', encoding='utf-8') as f:
+            yaml.safe_dump(config, f)
+        os.chdir(work_dir)
+        try:
+            code = main(['--config', config_path, '--charts', 'priority,status',
+                         '--profile', 'fetch', '--profile-mode', 'tracemalloc'])
+        finally:
+            os.chdir(previous_dir)
+    assert code == 0
+    with open(os.path.join(output_dir, 'run_report.json'), 'r', encoding='utf-8') as f:
+        report = json.load(f)
+    assert report['meta']['fetch']['status'] == 'complete'
+    assert report['meta']['charts'] == ['priority', 'status']
+    assert report['meta']['transport']['bytes'] > 0
+    spans = {span['name']: span for span in report['spans']}
+    assert spans['fetch']['items'] == 300 and spans['fetch']['bytes'] == report['meta']['transport']['bytes']
+    assert spans['fetch']['profile']['mode'] == 'tracemalloc'
+    assert spans['normalize']['items'] == 300
+    assert {'calculate:priority', 'plot:priority', 'calculate:status', 'plot:status'} <= set(spans)
+    assert all(span['wall'] >= 0 for span in report['spans'])
+    print("✓ test_main_writes_run_report passed")
+if __name__ == "__main__":
+    test_spans_record_time_items_and_labels()
+    test_profile_selected_stage()
+    test_tracemalloc_profile_without_reset_peak()
+    test_main_writes_run_report()
+    print("\n✅ Все тесты инструментирования пройдены!")
@@ -0,0 +1,116 @@
+﻿import sys
+import os
+import io
+import json
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from src import issue_projection
+from src.issue_projection import project_issue, decode_search_page
+from src.issue_store import flatten_issue
+from src.changelog import extract_status_intervals
+from src.worklog import extract_worklogs
+from src.jira_client import JiraClient
+from src.cache import ResponseCache
+def make_full_issue(i: int) -> dict:
+    """Задача в полном формате JIRA (с лишними подполями)"""
+    user = {'self': 'https://jira/user', 'name': f'u{i}', 'displayName': f'User {i}',
+            'avatarUrls': {'48x48': 'https://jira/avatar.png'}, 'active': True}
+    return {
+        'expand': 'operations,changelog', 'id': str(1000 + i), 'self': 'https://jira/issue',
+        'key': f'TEST-{i}',
+        'fields': {
+            'created': '2024-01-01T10:00:00.000+0000',
+            'resolutiondate': '2024-01-03T10:00:00.000+0000',
+            'status': {'self': 'https://jira/status', 'name': 'Closed', 'id': '6',
+                       'statusCategory': {'key': 'done', 'name': 'Done'}},
+            'priority': {'self': 'https://jira/priority', 'name': 'Major', 'id': '3'},
+            'assignee': user,
+            'reporter': None,
+            'timespent': 7200,
+            'summary': f'Issue {i}',
+            'worklog': {'startAt': 0, 'maxResults': 20, 'total': 1, 'worklogs': [
+                {'author': user, 'updateAuthor': user, 'comment': 'x' * 100,
+                 'started': '2024-01-02T09:00:00.000+0000', 'timeSpentSeconds': 7200, 'id': '1'}
+            ]},
+        },
+        'changelog': {'startAt': 0, 'total': 2, 'histories': [
+            {'id': '1', 'author': user, 'created': '2024-01-01T12:00:00.000+0000',
+             'items': [{'field': 'status', 'fieldtype': 'jira', 'from': '1', 'fromString': 'Open',
+                        'to': '3', 'toString': 'In Progress'}]},
+            {'id': '2', 'author': user, 'created': '2024-01-02T12:00:00.000+0000',
+             'items': [{'field': 'assignee', 'fromString': None, 'toString': 'User'}]},
+        ]},
+    }
+class StreamResponse:
+    """Заглушка потокового ответа: тело читается из response.raw"""
+    def __init__(self, payload: dict):
+        self.raw = io.BytesIO(json.dumps(payload).encode('utf-8'))
+        self.status_code = 200
+        self.closed = False
+    def raise_for_status(self):
+        pass
+    def json(self):
+        return json.loads(self.raw.getvalue())
+    def close(self):
+        self.closed = True
+def test_projection_keeps_what_processors_read():
+    """Тест: обработчики дают одинаковый результат для полной и компактной задачи"""
+    issue = make_full_issue(1)
+    compact = project_issue(issue)
+    assert flatten_issue(compact) == flatten_issue(issue)
+    assert extract_status_intervals(compact) == extract_status_intervals(issue)
+    assert extract_worklogs(compact) == extract_worklogs(issue)
+    assert compact['fields']['status'] == {'name': 'Closed'}
+    assert compact['fields']['assignee'] == {'displayName': 'User 1', 'name': 'u1'}
+    assert len(compact['changelog']['histories']) == 1
+    assert len(json.dumps(compact)) < len(json.dumps(issue)) / 2
+    print("✓ test_projection_keeps_what_processors_read passed")
+def test_streaming_decode_matches_regular_decode():
+    """Тест: потоковый разбор (ijson) и обычный разбор дают одну и ту же страницу"""
+    payload = {'startAt': 0, 'maxResults': 50, 'total': 3, 'issues': [make_full_issue(i) for i in range(3)]}
+    streamed = StreamResponse(payload)
+    data = decode_search_page(streamed)
+    original_ijson = issue_projection.ijson
+    issue_projection.ijson = None
+    try:
+        fallback = decode_search_page(StreamResponse(payload))
+    finally:
+        issue_projection.ijson = original_ijson
+    assert data == fallback
+    assert (data['startAt'], data['maxResults'], data['total']) == (0, 50, 3)
+    assert [issue['key'] for issue in data['issues']] == ['TEST-0', 'TEST-1', 'TEST-2']
+    if original_ijson is not None:
+        assert streamed.closed
+    print("✓ test_streaming_decode_matches_regular_decode passed")
+class StreamSearchSession:
+    """Заглушка сессии поиска, отдающая потоковые ответы"""
+    def __init__(self, total: int):
+        self.issues = [make_full_issue(i) for i in range(total)]
+        self.streams = []
+    def get(self, url, params=None, timeout=None, stream=False, **kwargs):
+        self.streams.append(stream)
+        start_at, size = params['startAt'], params['maxResults']
+        return StreamResponse({'startAt': start_at, 'maxResults': size, 'total': len(self.issues),
+                               'issues': self.issues[start_at:start_at + size]})
+def test_client_streaming_json_and_cache_key():
+    """Тест: клиент с streaming_json получает компактные задачи и кэширует их под отдельным ключом"""
+    import tempfile
+    cache = ResponseCache(cache_dir=tempfile.mkdtemp())
+    client = JiraClient("https://test.com", "TEST", max_results=0, page_size=2,
+                        cache=cache, streaming_json=True)
+    client.session = StreamSearchSession(5)
+    issues = client.get_issues("project = TEST", expand='changelog')
+    assert len(issues) == 5
+    assert all(client.session.streams)
+    assert issues[0] == project_issue(make_full_issue(0))
+    # Полный ответ с теми же параметрами не должен браться из компактного кэша
+    full_client = JiraClient("https://test.com", "TEST", max_results=0, page_size=2, cache=cache)
+    full_client.session = StreamSearchSession(5)
+    full_issues = full_client.get_issues("project = TEST", expand='changelog')
+    assert full_issues[0] == make_full_issue(0)
+    assert cache.hits == 0
+    print("✓ test_client_streaming_json_and_cache_key passed")
+if __name__ == "__main__":
+    test_projection_keeps_what_processors_read()
+    test_streaming_decode_matches_regular_decode()
+    test_client_streaming_json_and_cache_key()
+    print("\n✅ Все тесты проекции задач пройдены!")
@@ -0,0 +1,252 @@
+﻿import sys
+import os
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import tempfile
+from datetime import datetime, timezone
+from typing import Dict, List
+import sqlite3
+import json
+from src.issue_store import IssueStore, build_delta_jql, sync_issues, flatten_issue
+from src.data_processor import calculate_open_time, calculate_priority_distribution
+def make_issue(key: str, updated: str, status: str = 'Closed') -> Dict:
+    """Создание тестовой задачи"""
+    return {
+        'key': key,
+        'fields': {
+            'created': '2023-01-01T10:00:00.000+0000',
+            'updated': updated,
+            'resolutiondate': '2023-01-02T10:00:00.000+0000',
+            'status': {'name': status}
+        }
+    }
+class FakeClient:
+    """Заглушка JiraClient, отдающая заранее заданные страницы"""
+    def __init__(self, pages: List[List[Dict]]):
+        self.server_url = 'https://test.com'
+        self.pages = pages
+        self.queries = []
+    def iter_pages(self, jql, expand=None):
+        self.queries.append(jql)
+        yield from self.pages
+class FakeWorklogClient(FakeClient):
+    """Заглушка JiraClient для fetch_issues: страницы поиска и полные журналы работ"""
+    def __init__(self, pages: List[List[Dict]], worklogs: Dict[str, List[Dict]]):
+        super().__init__(pages)
+        self.fields = 'created,updated,worklog'
+        self.transport = type('Transport', (), {'bytes_received': 0})()
+        self.worklogs = worklogs
+        self.worklog_requests = []
+    def iter_worklogs(self, issue_keys, max_workers=None):
+        for key in issue_keys:
+            self.worklog_requests.append(key)
+            yield key, self.worklogs[key]
+def make_worklog_issue(key: str, updated: str, hours: List[int], total: int = None) -> Dict:
+    """Создание задачи со встроенным (возможно, усеченным) журналом работ"""
+    issue = make_issue(key, updated)
+    worklogs = [{'author': {'displayName': 'Alice'}, 'started': '2023-01-01T10:00:00.000+0000',
+                 'timeSpentSeconds': h * 3600} for h in hours]
+    issue['fields']['worklog'] = {'total': len(worklogs) if total is None else total, 'worklogs': worklogs}
+    return issue
+def test_store_upsert_and_read():
+    """Тест вставки и обновления задач в хранилище"""
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        store = IssueStore(os.path.join(tmp_dir, 'issues.db'))
+        scope = IssueStore.scope_for('https://test.com', 'project = TEST')
+        store.upsert_issues(scope, [make_issue('TEST-1', '2023-01-05T00:00:00.000+0000')])
+        store.upsert_issues(scope, [make_issue('TEST-1', '2023-01-06T00:00:00.000+0000', 'Resolved')])
+        issues = list(store.iter_issues(scope))
+        assert len(issues) == 1
+        assert issues[0]['fields']['status']['name'] == 'Resolved'
+        store.close()
+    print("✓ test_store_upsert_and_read passed")
+def test_build_delta_jql():
+    """Тест построения JQL для изменений с отметки"""
+    now = datetime(2023, 1, 1, 12, 0, tzinfo=timezone.utc)
+    since = datetime(2023, 1, 1, 10, 0, tzinfo=timezone.utc)
+    jql = build_delta_jql("project = TEST ORDER BY key", since, overlap_minutes=10, now=now)
+    assert jql == '(project = TEST) AND updated >= "-130m" ORDER BY key'
+    print("✓ test_build_delta_jql passed")
+def test_sync_full_then_incremental():
+    """Тест полной, а затем инкрементальной синхронизации"""
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        store = IssueStore(os.path.join(tmp_dir, 'issues.db'))
+        client = FakeClient([
+            [make_issue('TEST-1', '2023-01-05T00:00:00.000+0000'), make_issue('TEST-2', '2023-01-06T03:00:00.000+0300')],
+            [make_issue('TEST-3', '2023-01-04T00:00:00.000+0000')]
+        ])
+        stats = sync_issues(client, store, 'project = TEST')
+        assert stats['mode'] == 'full'
+        assert stats['total'] == 3
+        scope = stats['scope']
+        assert store.get_high_water(scope) == datetime(2023, 1, 6, 0, 0, tzinfo=timezone.utc)
+        # Вторая синхронизация запрашивает только изменения и обновляет задачу
+        client.pages = [[make_issue('TEST-2', '2023-01-07T00:00:00.000+0000', 'Reopened')]]
+        stats = sync_issues(client, store, 'project = TEST')
+        assert stats['mode'] == 'incremental'
+        assert stats['fetched'] == 1
+        assert stats['total'] == 3
+        assert 'updated >= "-' in client.queries[-1]
+        statuses = {issue['key']: issue['fields']['status']['name'] for issue in store.iter_issues(scope)}
+        assert statuses == {'TEST-1': 'Closed', 'TEST-2': 'Reopened', 'TEST-3': 'Closed'}
+        store.close()
+    print("✓ test_sync_full_then_incremental passed")
+def test_flatten_issue():
+    """Тест преобразования задачи в плоскую запись"""
+    issue = make_issue('TEST-1', '2023-01-05T00:00:00.000+0000')
+    issue['fields']['assignee'] = {'displayName': 'Alice', 'name': 'alice'}
+    issue['fields']['reporter'] = {'name': 'bob'}
+    issue['fields']['priority'] = None
+    flat = flatten_issue(issue)
+    assert flat['key'] == 'TEST-1'
+    assert flat['resolved'] == '2023-01-02T10:00:00.000+0000'
+    assert flat['status'] == 'Closed'
+    assert flat['assignee'] == 'Alice'
+    assert flat['reporter'] == 'bob'
+    assert flat['priority'] is None
+    print("✓ test_flatten_issue passed")
+def test_store_read_frame_projection():
+    """Тест чтения только нужных колонок и расчета метрик по ним"""
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        store = IssueStore(os.path.join(tmp_dir, 'issues.db'))
+        scope = IssueStore.scope_for('https://test.com', 'project = TEST')
+        issues = [make_issue(f'TEST-{i}', '2023-01-05T00:00:00.000+0000') for i in range(3)]
+        issues[0]['fields']['priority'] = {'name': 'Major'}
+        store.upsert_issues(scope, issues)
+        frame = store.read_frame(scope, columns=['key', 'created', 'resolved'])
+        assert list(frame.columns) == ['key', 'created', 'resolved']
+        result = calculate_open_time(frame)
+        assert len(result) == 3
+        assert abs(result['open_hours'].iloc[0] - 24.0) < 0.1
+        priorities = calculate_priority_distribution(store.read_frame(scope, columns=['priority']))
+        assert priorities['priority'].tolist() == ['Major']
+        store.close()
+    print("✓ test_store_read_frame_projection passed")
+def test_store_migrates_payload_only_schema():
+    """Тест миграции базы без плоских колонок"""
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        path = os.path.join(tmp_dir, 'issues.db')
+        conn = sqlite3.connect(path)
+        conn.execute("CREATE TABLE issues (scope TEXT NOT NULL, key TEXT NOT NULL, updated TEXT, "
+                     "payload TEXT NOT NULL, PRIMARY KEY (scope, key))")
+        issue = make_issue('TEST-1', '2023-01-05T00:00:00.000+0000')
+        conn.execute("INSERT INTO issues VALUES (?, ?, ?, ?)", ('s', 'TEST-1', None, json.dumps(issue)))
+        conn.commit()
+        conn.close()
+        store = IssueStore(path)
+        rows = list(store.iter_rows('s', columns=['key', 'status', 'created']))
+        assert rows == [{'key': 'TEST-1', 'status': 'Closed', 'created': '2023-01-01T10:00:00.000+0000'}]
+        store.close()
+    print("✓ test_store_migrates_payload_only_schema passed")
+def test_incremental_sync_reuses_stored_worklogs():
+    """Тест: журналы работ хранятся по задачам, повторно догружаются только журналы измененных задач"""
+    from src.main import fetch_issues
+    full = [{'author': {'displayName': 'Bob'}, 'started': '2023-01-02T10:00:00.000+0000', 'timeSpentSeconds': 3600}] * 3
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        config = {'plots': {'enabled': ['daily']}, 'analysis': {'worklogs': True},
+                  'storage': {'enabled': True, 'path': os.path.join(tmp_dir, 'issues.db')}}
+        client = FakeWorklogClient([[
+            make_worklog_issue('TEST-1', '2023-01-05T00:00:00.000+0000', [2]),
+            make_worklog_issue('TEST-2', '2023-01-05T00:00:00.000+0000', [1], total=3),
+            make_worklog_issue('TEST-3', '2023-01-05T00:00:00.000+0000', [1], total=3)
+        ]], {'TEST-2': full, 'TEST-3': full})
+        issues, extras = fetch_issues(client, 'project = TEST', config)
+        assert len(issues) == 3
+        assert client.worklog_requests == ['TEST-2', 'TEST-3']
+        assert extras['worklogs']['hours'].sum() == 8
+        # Изменилась только TEST-1: журналы остальных задач берутся из хранилища
+        client.pages = [[make_worklog_issue('TEST-1', '2023-01-06T00:00:00.000+0000', [2, 4])]]
+        client.worklog_requests = []
+        issues, extras = fetch_issues(client, 'project = TEST', config)
+        assert 'updated >= "-' in client.queries[-1]
+        assert client.worklog_requests == []
+        assert extras['worklogs'].groupby('key')['hours'].sum().to_dict() == {'TEST-1': 6, 'TEST-2': 3, 'TEST-3': 3}
+        store = IssueStore(config['storage']['path'])
+        assert all('worklog' not in issue['fields']
+                   for issue in store.iter_issues(IssueStore.scope_for(client.server_url, 'project = TEST')))
+        store.close()
+    print("✓ test_incremental_sync_reuses_stored_worklogs passed")
+def test_store_migrates_embedded_worklogs():
+    """Тест переноса журналов работ из JSON задач в таблицу worklogs"""
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        path = os.path.join(tmp_dir, 'issues.db')
+        store = IssueStore(path)
+        store.conn.execute("DROP TABLE worklogs")
+        store.upsert_issues('s', [make_worklog_issue('TEST-1', '2023-01-05T00:00:00.000+0000', [1, 2], total=5)])
+        store.close()
+        store = IssueStore(path)
+        assert store.read_worklogs('s')['hours'].tolist() == [1, 2]
+        assert store.truncated_worklog_keys('s') == ['TEST-1']
+        store.replace_worklogs('s', {'TEST-1': [('Alice', None, 3600)]})
+        assert store.truncated_worklog_keys('s') == []
+        store.close()
+    print("✓ test_store_migrates_embedded_worklogs passed")
+def test_storage_reads_top_users_weight_columns():
+    """Тест: колонки веса рейтинга пользователей читаются из хранилища для каждого режима"""
+    from src.main import fetch_issues, get_jira_request
+    from src.data_processor import calculate_top_users
+    from src.metric_fields import metric_columns
+    issues = []
+    for number in range(4):
+        issue = make_issue(f'TEST-{number}', '2023-01-05T00:00:00.000+0000')
+        issue['fields'].update({'reporter': {'displayName': 'Alice'}, 'assignee': {'displayName': 'Bob'},
+                                'timespent': 3600 * number})
+        if number == 0:
+            issue['fields']['resolutiondate'] = None
+        issues.append(issue)
+    expected = {None: (['reporter', 'assignee'], 4), 'resolved': (['reporter', 'assignee', 'resolved'], 3),
+                'timespent': (['reporter', 'assignee', 'timespent'], 6)}
+    for weight, (columns, alice_total) in expected.items():
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            config = {'plots': {'enabled': ['top_users'], 'top_users_weight': weight},
+                      'storage': {'enabled': True, 'path': os.path.join(tmp_dir, 'issues.db')}}
+            assert metric_columns(['top_users'], weight) == columns
+            client = FakeWorklogClient([[dict(issue, fields=dict(issue['fields'])) for issue in issues]], {})
+            client.fields, _ = get_jira_request(config)
+            frame, _ = fetch_issues(client, 'project = TEST', config)
+            assert list(frame.columns) == columns
+            users = calculate_top_users(frame, top_n=10, weight=weight)
+            assert dict(zip(users['user'], users['total_tasks'])) == {'Alice': alice_total, 'Bob': alice_total}
+    print("✓ test_storage_reads_top_users_weight_columns passed")
+def test_storage_scope_survives_chart_changes():
+    """Тест: смена графиков при включенном хранилище не меняет набор и загружает только изменения"""
+    from src.main import fetch_issues, get_jira_request
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        path = os.path.join(tmp_dir, 'issues.db')
+        config = {'plots': {'enabled': ['priority']}, 'storage': {'enabled': True, 'path': path}}
+        client = FakeWorklogClient([[make_issue('TEST-1', '2023-01-05T00:00:00.000+0000'),
+                                     make_issue('TEST-2', '2023-01-05T00:00:00.000+0000')]], {})
+        client.fields, _ = get_jira_request(config)
+        fetch_issues(client, 'project = TEST', config)
+        assert 'updated >=' not in client.queries[-1]
+        config['plots'].update({'enabled': ['open_time', 'top_users'], 'top_users_weight': 'resolved'})
+        fields, _ = get_jira_request(config)
+        assert fields == client.fields
+        client.pages = [[make_issue('TEST-2', '2023-01-06T00:00:00.000+0000', 'Reopened')]]
+        issues, _ = fetch_issues(client, 'project = TEST', config)
+        assert 'updated >= "-' in client.queries[-1]
+        assert list(issues.columns) == ['key', 'created', 'resolved', 'reporter', 'assignee']
+        assert len(issues) == 2
+        store = IssueStore(path)
+        assert store.conn.execute("SELECT COUNT(DISTINCT scope) FROM issues").fetchone()[0] == 1
+        store.close()
+        # Включение журналов работ меняет запрос: тот же набор перезагружается полностью
+        config['analysis'] = {'worklogs': True}
+        client.fields, _ = get_jira_request(config)
+        fetch_issues(client, 'project = TEST', config)
+        assert 'updated >=' not in client.queries[-1]
+        store = IssueStore(path)
+        assert store.conn.execute("SELECT COUNT(DISTINCT scope) FROM issues").fetchone()[0] == 1
+        store.close()
+    print("✓ test_storage_scope_survives_chart_changes passed")
+if __name__ == "__main__":
+    test_store_upsert_and_read()
+    test_build_delta_jql()
+    test_sync_full_then_incremental()
+    test_flatten_issue()
+    test_store_read_frame_projection()
+    test_store_migrates_payload_only_schema()
+    test_incremental_sync_reuses_stored_worklogs()
+    test_store_migrates_embedded_worklogs()
+    test_storage_reads_top_users_weight_columns()
+    test_storage_scope_survives_chart_changes()
+    print("\n✅ Все тесты IssueStore пройдены!")
@@ -1,7 +1,37 @@
 ﻿import sys
 import os
+import time
+import random
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 from src.jira_client import JiraClient
+class FakeResponse:
+    """Заглушка ответа requests"""
+    def __init__(self, data):
+        self._data = data
+        self.status_code = 200
+    def raise_for_status(self):
+        pass
+    def json(self):
+        return self._data
+class FakeSearchSession:
+    """Заглушка сессии, отдающая задачи постранично как /rest/api/2/search"""
+    def __init__(self, total: int, server_cap: int = 1000, delay: float = 0.0):
+        self.issues = [{'key': f'TEST-{i}', 'fields': {'summary': f'Issue {i}'}} for i in range(total)]
+        self.server_cap = server_cap
+        self.delay = delay
+        self.calls = []
+    def get(self, url, params=None, timeout=None, **kwargs):
+        self.calls.append(dict(params))
+        if self.delay:
+            time.sleep(random.uniform(0, self.delay))
+        start_at = params['startAt']
+        page_size = min(params['maxResults'], self.server_cap)
+        return FakeResponse({
+            'startAt': start_at,
+            'maxResults': page_size,
+            'total': len(self.issues),
+            'issues': self.issues[start_at:start_at + page_size]
+        })
 def test_jira_client_initialization():
     """Тест инициализации клиента JIRA"""
     client = JiraClient(
@@ -25,8 +55,52 @@ def test_jira_client_empty_response():
     # Метод должен существовать даже если мы не можем проверить его работу без реального API
     assert client.get_issues is not None
     print("✓ test_jira_client_empty_response passed")
+def test_jira_client_iter_issues_walks_all_pages():
+    """Тест постраничного обхода до исчерпания total"""
+    client = JiraClient("https://test.com", "TEST", max_results=0, page_size=10)
+    client.session = FakeSearchSession(total=35)
+    keys = [issue['key'] for issue in client.iter_issues("project = TEST")]
+    assert keys == [f'TEST-{i}' for i in range(35)]
+    assert [call['startAt'] for call in client.session.calls] == [0, 10, 20, 30]
+    print("✓ test_jira_client_iter_issues_walks_all_pages passed")
+def test_jira_client_respects_server_page_cap():
+    """Тест обхода, когда сервер урезает maxResults"""
+    client = JiraClient("https://test.com", "TEST", max_results=0, page_size=50)
+    client.session = FakeSearchSession(total=25, server_cap=7)
+    issues = client.get_issues("project = TEST")
+    assert len(issues) == 25
+    assert [call['startAt'] for call in client.session.calls] == [0, 7, 14, 21]
+    print("✓ test_jira_client_respects_server_page_cap passed")
+def test_jira_client_max_results_limit():
+    """Тест ограничения общего количества задач"""
+    client = JiraClient("https://test.com", "TEST", max_results=15, page_size=10)
+    client.session = FakeSearchSession(total=100)
+    issues = client.get_issues("project = TEST")
+    assert len(issues) == 15
+    assert len(client.session.calls) == 2
+    print("✓ test_jira_client_max_results_limit passed")
+def test_jira_client_parallel_preserves_order():
+    """Тест параллельной загрузки: порядок задач совпадает с последовательным"""
+    client = JiraClient("https://test.com", "TEST", max_results=0, page_size=10, max_workers=4)
+    client.session = FakeSearchSession(total=95, server_cap=5, delay=0.01)
+    keys = [issue['key'] for issue in client.iter_issues("project = TEST")]
+    assert keys == [f'TEST-{i}' for i in range(95)]
+    assert sorted(call['startAt'] for call in client.session.calls) == list(range(0, 95, 5))
+    print("✓ test_jira_client_parallel_preserves_order passed")
+def test_jira_client_parallel_max_results_limit():
+    """Тест параллельной загрузки с ограничением количества задач"""
+    client = JiraClient("https://test.com", "TEST", max_results=23, page_size=10, max_workers=3)
+    client.session = FakeSearchSession(total=100)
+    issues = client.get_issues("project = TEST")
+    assert [issue['key'] for issue in issues] == [f'TEST-{i}' for i in range(23)]
+    print("✓ test_jira_client_parallel_max_results_limit passed")
 if __name__ == "__main__":
     test_jira_client_initialization()
     test_jira_client_get_issues_method_exists()
     test_jira_client_empty_response()
+    test_jira_client_iter_issues_walks_all_pages()
+    test_jira_client_respects_server_page_cap()
+    test_jira_client_max_results_limit()
+    test_jira_client_parallel_preserves_order()
+    test_jira_client_parallel_max_results_limit()
     print("\n✅ Все тесты JiraClient пройдены!")
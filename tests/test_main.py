@@ -33,8 +33,240 @@ def test_logging_setup():
         print("✓ test_logging_setup passed")
     except Exception as e:
         print(f"✗ test_logging_setup failed: {e}")
+def _make_issues(count=20):
+    """Тестовые задачи в формате Jira"""
+    from datetime import datetime, timedelta
+    base = datetime(2024, 1, 1)
+    issues = []
+    for i in range(count):
+        created = base + timedelta(days=i)
+        issues.append({
+            'key': f'TEST-{i}',
+            'fields': {
+                'created': created.strftime('%Y-%m-%dT%H:%M:%S.000+0000'),
+                'resolutiondate': (created + timedelta(days=i % 5 + 1)).strftime('%Y-%m-%dT%H:%M:%S.000+0000'),
+                'status': {'name': 'Closed'},
+                'priority': {'name': ['High', 'Low'][i % 2]},
+                'assignee': {'displayName': f'User {i % 3}'},
+                'reporter': {'displayName': f'User {i % 4}'},
+                'timespent': 3600 * (i % 7 + 1),
+            }
+        })
+    return issues
+def test_build_all_plots_parallel(tmp_path=None):
+    """Параллельное построение дает те же файлы и счетчики, что и последовательное"""
+    import tempfile
+    from src.main import build_all_plots, get_default_config
+    issues = _make_issues()
+    base_dir = tmp_path or tempfile.mkdtemp()
+    collected = {}
+    for parallel in (False, True):
+        config = get_default_config()
+        config['plots']['output_dir'] = os.path.join(str(base_dir), f'parallel_{parallel}')
+        config['plots']['parallel'] = parallel
+        config['plots']['max_workers'] = 2
+        config['plots']['enabled'] = ['open_time', 'priority', 'daily']
+        collected[parallel] = build_all_plots(issues, config)
+    sequential, parallel = collected[False], collected[True]
+    assert list(sequential) == list(parallel) == ['open_time', 'priority', 'daily']
+    for name in sequential:
+        assert os.path.exists(parallel[name]['path'])
+        assert {k: v for k, v in sequential[name].items() if k != 'path'} == \
+            {k: v for k, v in parallel[name].items() if k != 'path'}
+    print("✓ test_build_all_plots_parallel passed")
+def test_build_all_plots_parallel_shuts_down_pool_on_error(tmp_path=None):
+    """Ошибка расчета после отправки графиков в пул не оставляет работающих процессов"""
+    import multiprocessing
+    import tempfile
+    from src import data_processor
+    from src.main import build_all_plots, get_default_config
+    config = get_default_config()
+    config['plots']['output_dir'] = str(tmp_path or tempfile.mkdtemp())
+    config['plots'].update({'parallel': True, 'max_workers': 2, 'enabled': ['open_time', 'priority', 'daily']})
+    original = data_processor.calculate_daily_issues_stats
+    def broken(*args, **kwargs):
+        raise RuntimeError("boom")
+    data_processor.calculate_daily_issues_stats = broken
+    try:
+        build_all_plots(_make_issues(), config)
+        assert False, "ожидался RuntimeError"
+    except RuntimeError as e:
+        assert str(e) == "boom"
+    finally:
+        data_processor.calculate_daily_issues_stats = original
+    assert multiprocessing.active_children() == []
+    print("✓ test_build_all_plots_parallel_shuts_down_pool_on_error passed")
+def test_build_all_plots_collects_errors(tmp_path=None):
+    """Ошибка построения одного графика попадает в results и не прерывает остальные"""
+    import tempfile
+    from src import plot_builder
+    from src.main import build_all_plots, get_default_config
+    config = get_default_config()
+    config['plots']['output_dir'] = str(tmp_path or tempfile.mkdtemp())
+    config['plots']['enabled'] = ['open_time', 'priority']
+    original = plot_builder.plot_open_time_histogram
+    def broken(data, output_path, dpi=150):
+        raise RuntimeError("boom")
+    plot_builder.plot_open_time_histogram = broken
+    try:
+        results = build_all_plots(_make_issues(), config)
+    finally:
+        plot_builder.plot_open_time_histogram = original
+    assert 'boom' in results['open_time']['error']
+    assert os.path.exists(results['priority']['path'])
+    print("✓ test_build_all_plots_collects_errors passed")
+def test_build_all_plots_render_cache(tmp_path=None):
+    """Повторный запуск с теми же данными берет графики из кэша, изменение dpi - перестраивает"""
+    import tempfile
+    from src.main import build_all_plots, get_default_config
+    base_dir = str(tmp_path or tempfile.mkdtemp())
+    config = get_default_config()
+    config['plots'].update({
+        'output_dir': os.path.join(base_dir, 'plots'),
+        'enabled': ['priority', 'daily'],
+        'render_cache': True,
+        'render_cache_dir': os.path.join(base_dir, 'cache'),
+    })
+    issues = _make_issues()
+    first = build_all_plots(issues, config)
+    assert first['render_cache'] == {'hits': 0, 'misses': 2}
+    os.remove(first['priority']['path'])
+    second = build_all_plots(issues, config)
+    assert second['render_cache'] == {'hits': 2, 'misses': 0}
+    assert second['priority']['cached'] and os.path.exists(second['priority']['path'])
+    config['plots']['dpi'] = 72
+    third = build_all_plots(issues, config)
+    assert third['render_cache'] == {'hits': 0, 'misses': 2}
+    assert not third['daily'].get('cached')
+    print("✓ test_build_all_plots_render_cache passed")
+def _run_isolated(code):
+    """Выполнить код в отдельном интерпретаторе и вернуть его вывод (последняя строка)"""
+    import subprocess
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    completed = subprocess.run([sys.executable, '-c', code], cwd=root, capture_output=True,
+                               text=True, encoding='utf-8', timeout=60)
+    assert completed.returncode == 0, completed.stderr
+    return completed.stdout.strip().splitlines()[-1]
+HEAVY_MODULES = ('pandas', 'numpy', 'matplotlib', 'seaborn')
+def test_package_import_is_lazy():
+    """Импорт пакета и главного модуля не загружает тяжелые библиотеки и укладывается в бюджет"""
+    import json
+    output = _run_isolated(
+        "import json, sys, time\n"
+        "start = time.perf_counter()\n"
+        "import src, src.main\n"
+        "elapsed = time.perf_counter() - start\n"
+        f"print(json.dumps({{'elapsed': elapsed, 'heavy': [m for m in {HEAVY_MODULES!r} if m in sys.modules]}}))\n"
+    )
+    report = json.loads(output)
+    assert report['heavy'] == []
+    # Бюджет времени импорта с запасом для медленных CI-машин
+    assert report['elapsed'] < 1.0, report
+    print("✓ test_package_import_is_lazy passed")
+def test_lazy_exports():
+    """Экспорты пакета доступны через ленивый __getattr__"""
+    import src
+    from src.data_processor import normalize_issues
+    assert src.normalize_issues is normalize_issues
+    assert 'plot_top_users_chart' in dir(src)
+    try:
+        src.no_such_name
+        assert False, "ожидался AttributeError"
+    except AttributeError:
+        pass
+    print("✓ test_lazy_exports passed")
+def test_connection_check_does_not_load_plotting():
+    """--test-connection не загружает matplotlib и seaborn"""
+    import json
+    output = _run_isolated(
+        "import json, sys\n"
+        "from src import main\n"
+        "main.JiraClient.test_connection = lambda self: True\n"
+        "main.setup_logging = lambda: __import__('logging').getLogger('test')\n"
+        "code = main.main(['--test-connection', '--config', 'no_such_config.yaml'])\n"
+        "print(json.dumps({'code': code, 'heavy': [m for m in ('matplotlib', 'seaborn') if m in sys.modules]}))\n"
+    )
+    assert json.loads(output) == {'code': 0, 'heavy': []}
+    print("✓ test_connection_check_does_not_load_plotting passed")
+class FakeProjectSession:
+    """Заглушка сессии поиска: задачи зависят от проекта в JQL, проект BAD отвечает 500"""
+    def __init__(self, counts):
+        self.issues = {key: _make_issues(count) for key, count in counts.items()}
+    def get(self, url, params=None, timeout=None, **kwargs):
+        from tests.test_http_transport import StatusResponse
+        project = params['jql'].split('project = ')[1].split()[0]
+        if project not in self.issues:
+            return StatusResponse(500)
+        issues = self.issues[project]
+        start_at, size = params['startAt'], params['maxResults']
+        return StatusResponse(200, {'startAt': start_at, 'maxResults': size, 'total': len(issues),
+                                    'issues': issues[start_at:start_at + size]})
+def test_run_projects(tmp_path=None):
+    """Многопроектный режим: графики по папкам проектов и общая сводка"""
+    import tempfile
+    import pandas as pd
+    from src.jira_client import JiraClient
+    from src.main import run_projects, get_default_config, get_project_keys
+    config = get_default_config()
+    config['jira']['project_keys'] = 'AAA, BBB,BAD,AAA'
+    assert get_project_keys(config) == ['AAA', 'BBB', 'BAD']
+    config['plots'].update({'output_dir': str(tmp_path or tempfile.mkdtemp()), 'enabled': ['priority']})
+    config['performance'] = {'max_projects': 3}
+    client = JiraClient("https://test.com", "AAA", max_results=0, page_size=7, max_retries=0)
+    client.session = FakeProjectSession({'AAA': 20, 'BBB': 9})
+    summary = run_projects(client, get_project_keys(config), config)
+    assert [row['project'] for row in summary] == ['AAA', 'BBB', 'BAD']
+    assert [row['fetch'] for row in summary] == ['complete', 'complete', 'failed']
+    assert [row['issues'] for row in summary] == [20, 9, 0]
+    assert [row['charts'] for row in summary] == [1, 1, 0]
+    output_dir = config['plots']['output_dir']
+    assert os.path.exists(os.path.join(output_dir, 'AAA', '2_priority_distribution.png'))
+    assert os.path.exists(os.path.join(output_dir, 'BBB', '2_priority_distribution.png'))
+    saved = pd.read_csv(os.path.join(output_dir, 'projects_summary.csv'))
+    assert list(saved['project']) == ['AAA', 'BBB', 'BAD']
+    assert saved.loc[0, 'resolved'] == 20
+    print("✓ test_run_projects passed")
+def test_run_projects_new_output_dir_and_project_errors(tmp_path=None):
+    """Многопроектный режим: вложенная папка графиков создается, ошибка анализа проекта не прерывает остальные"""
+    import tempfile
+    import pandas as pd
+    from src import data_processor
+    from src.jira_client import JiraClient
+    from src.main import run_projects, get_default_config
+    config = get_default_config()
+    output_dir = os.path.join(str(tmp_path or tempfile.mkdtemp()), 'out', 'plots')
+    config['plots'].update({'output_dir': output_dir, 'enabled': ['priority']})
+    client = JiraClient("https://test.com", "AAA", max_results=0, page_size=10, max_retries=0)
+    client.session = FakeProjectSession({'AAA': 20, 'BBB': 9, 'CCC': 5})
+    original = data_processor.calculate_priority_distribution
+    def broken_for_bbb(issues):
+        if len(issues) == 9:
+            raise RuntimeError("boom")
+        return original(issues)
+    data_processor.calculate_priority_distribution = broken_for_bbb
+    try:
+        summary = run_projects(client, ['AAA', 'BBB', 'CCC'], config)
+    finally:
+        data_processor.calculate_priority_distribution = original
+    assert [row['charts'] for row in summary] == [1, 0, 1]
+    assert [row['chart_errors'] for row in summary] == [0, 1, 0]
+    assert summary[1]['error'] == "RuntimeError: boom" and summary[1]['issues'] == 9
+    assert os.path.exists(os.path.join(output_dir, 'AAA', '2_priority_distribution.png'))
+    assert os.path.exists(os.path.join(output_dir, 'CCC', '2_priority_distribution.png'))
+    saved = pd.read_csv(os.path.join(output_dir, 'projects_summary.csv'))
+    assert list(saved['project']) == ['AAA', 'BBB', 'CCC']
+    print("✓ test_run_projects_new_output_dir_and_project_errors passed")
 if __name__ == "__main__":
     test_main_module_import()
     test_config_loading()
     test_logging_setup()
+    test_build_all_plots_parallel()
+    test_build_all_plots_parallel_shuts_down_pool_on_error()
+    test_build_all_plots_collects_errors()
+    test_build_all_plots_render_cache()
+    test_package_import_is_lazy()
+    test_lazy_exports()
+    test_connection_check_does_not_load_plotting()
+    test_run_projects()
+    test_run_projects_new_output_dir_and_project_errors()
     print("\n✅ Все тесты Main module пройдены!")
@@ -0,0 +1,75 @@
+﻿import sys
+import os
+import json
+import tempfile
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from benchmarks.mock_jira_server import MockJiraServer
+from src.jira_client import JiraClient
+from src.synthetic_data import SyntheticIssues
+from src.worklog import WorklogCollector
+def test_client_fetches_all_issues_in_order():
+    """Тест: последовательная и параллельная загрузка с тестового сервера дает все задачи по порядку"""
+    issues = SyntheticIssues(450, seed=3)
+    expected = [issue['key'] for issue in issues]
+    with MockJiraServer(issues) as server:
+        for workers in (1, 4):
+            client = JiraClient(server.url, 'SYN', max_results=0, page_size=100, max_workers=workers)
+            fetched = client.get_issues('project = SYN', expand='changelog')
+            assert [issue['key'] for issue in fetched] == expected
+            assert client.last_fetch['status'] == 'complete'
+            assert fetched[0]['changelog'] == issues.issue(0)['changelog']
+        assert client.test_connection()
+    print("✓ test_client_fetches_all_issues_in_order passed")
+def test_server_caps_page_size():
+    """Тест: сервер ограничивает maxResults, клиент продолжает со следующего startAt"""
+    issues = SyntheticIssues(250, seed=1)
+    with MockJiraServer(issues, max_page_size=40) as server:
+        client = JiraClient(server.url, 'SYN', max_results=0, page_size=100, fields='created,status')
+        fetched = client.get_issues('project = SYN')
+        assert len(fetched) == 250
+        assert set(fetched[0]['fields']) == {'created', 'status'}
+        assert 'changelog' not in fetched[0]
+        assert server.stats['requests'] >= 250 // 40
+    print("✓ test_server_caps_page_size passed")
+def test_client_survives_throttling_and_errors():
+    """Тест: при 429 и 503 клиент повторяет запросы и загружает все задачи"""
+    issues = SyntheticIssues(600, seed=2)
+    with MockJiraServer(issues, throttle_rate=0.2, error_rate=0.1, retry_after=0, seed=5) as server:
+        client = JiraClient(server.url, 'SYN', max_results=0, page_size=50, max_workers=4,
+                            max_retries=10, backoff_factor=0.001)
+        fetched = client.get_issues('project = SYN')
+        assert len({issue['key'] for issue in fetched}) == 600
+        assert server.stats['throttled'] > 0 and server.stats['errors'] > 0
+        assert client.transport.stats['retries'] == server.stats['throttled'] + server.stats['errors']
+    print("✓ test_client_survives_throttling_and_errors passed")
+def test_truncated_worklogs_are_fetched_from_server():
+    """Тест: усеченные журналы работ догружаются через /issue/{key}/worklog"""
+    issues = SyntheticIssues(400, seed=0)
+    with MockJiraServer(issues, max_page_size=25) as server:
+        client = JiraClient(server.url, 'SYN', max_results=0, page_size=100, max_workers=2)
+        collector = WorklogCollector()
+        list(collector.consume(client.iter_issues('project = SYN')))
+        keys = list(collector.truncated_keys)
+        assert keys
+        assert collector.fetch_truncated(client) == len(keys)
+        for key in keys:
+            assert len(collector.entries[key]) == len(issues.worklogs(issues.index_of(key)))
+    print("✓ test_truncated_worklogs_are_fetched_from_server passed")
+def test_fetch_throughput_smoke():
+    """Тест: замер пропускной способности пишет отчет по всем режимам клиента"""
+    from benchmarks import fetch_throughput
+    output = os.path.join(tempfile.mkdtemp(), 'fetch.json')
+    assert fetch_throughput.main(['--issues', '300', '--throttle-rate', '0.05', '--output', output]) == 0
+    with open(output, 'r', encoding='utf-8') as f:
+        report = json.load(f)
+    assert [row['mode'] for row in report['results']] == list(fetch_throughput.MODES)
+    assert all(row['issues'] == 300 and row['issues_per_second'] > 0 for row in report['results'])
+    assert report['server']['requests'] >= sum(row['requests'] for row in report['results'])
+    print("✓ test_fetch_throughput_smoke passed")
+if __name__ == "__main__":
+    test_client_fetches_all_issues_in_order()
+    test_server_caps_page_size()
+    test_client_survives_throttling_and_errors()
+    test_truncated_worklogs_are_fetched_from_server()
+    test_fetch_throughput_smoke()
+    print("\n✅ Все тесты тестового сервера JIRA пройдены!")
@@ -63,8 +63,40 @@ def test_plot_builder_functions_exist():
     for func in functions:
         assert callable(func)
     print("✓ test_plot_builder_functions_exist passed")
+def test_plot_histograms_from_summary():
+    """Тест построения гистограмм по готовой сводке распределения (без исходных значений)"""
+    import numpy as np
+    from src.data_processor import summarize_distribution
+    from src.plot_builder import plot_time_spent_histogram
+    values = np.random.default_rng(0).lognormal(3, 1, 50000)
+    output_dir = tempfile.mkdtemp()
+    open_summary = summarize_distribution(pd.DataFrame({'open_hours': values}), 'open_hours', kde=True)
+    spent_summary = summarize_distribution(pd.DataFrame({'hours_spent': values}), 'hours_spent', log_bins=True)
+    assert len(open_summary) == 30 and len(spent_summary) == 30
+    for plot_func, summary, name in ((plot_open_time_histogram, open_summary, 'open.png'),
+                                     (plot_time_spent_histogram, spent_summary, 'spent.png')):
+        output_path = os.path.join(output_dir, name)
+        plot_func(summary, output_path)
+        assert os.path.getsize(output_path) > 0
+    print("✓ test_plot_histograms_from_summary passed")
+def test_plot_status_chart_from_summary():
+    """Тест графика статусов по сводке summarize_status_times и по исходным строкам"""
+    import numpy as np
+    from src.data_processor import summarize_status_times
+    from src.plot_builder import plot_status_time_distributions
+    rng = np.random.default_rng(1)
+    data = pd.DataFrame({'status': rng.choice(['Open', 'Closed', 'Resolved'], 5000),
+                         'hours_in_status': rng.lognormal(3, 1, 5000)})
+    output_dir = tempfile.mkdtemp()
+    for name, source in (('summary.png', summarize_status_times(data)), ('raw.png', data)):
+        output_path = os.path.join(output_dir, name)
+        plot_status_time_distributions(source, output_path)
+        assert os.path.getsize(output_path) > 0
+    print("✓ test_plot_status_chart_from_summary passed")
 if __name__ == "__main__":
     test_plot_open_time_histogram_with_data()
     test_plot_open_time_histogram_empty_data()
     test_plot_builder_functions_exist()
+    test_plot_histograms_from_summary()
+    test_plot_status_chart_from_summary()
     print("\n✅ Все тесты PlotBuilder пройдены!")
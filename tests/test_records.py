@@ -0,0 +1,74 @@
+﻿import sys
+import os
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import pandas as pd
+from src.records import IssueRecord, to_records
+from src.issue_store import flatten_issue
+from src.data_processor import (
+    normalize_issues,
+    calculate_open_time,
+    calculate_priority_distribution,
+    calculate_top_users,
+    calculate_daily_issues_stats,
+    calculate_time_spent_distribution,
+    calculate_status_time_distribution
+)
+from src.jira_client import JiraClient
+from tests.test_jira_client import FakeSearchSession
+def make_issue(i: int) -> dict:
+    """Задача JIRA с вложенными полями"""
+    return {
+        'key': f'TEST-{i}',
+        'fields': {
+            'created': f'2024-01-{i % 28 + 1:02d}T10:00:00.000+0000',
+            'resolutiondate': f'2024-02-{i % 28 + 1:02d}T10:00:00.000+0000' if i % 4 else None,
+            'status': {'name': ''.join(['Clo', 'sed']) if i % 4 else 'Open'},
+            'priority': {'name': ['High', 'Low', 'Major'][i % 3]},
+            'assignee': {'displayName': f'User {i % 5}', 'name': f'u{i % 5}'} if i % 6 else None,
+            'reporter': {'displayName': f'User {i % 3}'},
+            'timespent': 1800 * (i % 7) or None,
+            'issuetype': {'name': 'Bug'}
+        }
+    }
+def test_record_from_issue():
+    """Тест: запись содержит те же значения, что и flatten_issue, без __dict__"""
+    issue = make_issue(5)
+    record = IssueRecord.from_issue(issue)
+    assert record.as_dict() == flatten_issue(issue)
+    assert not hasattr(record, '__dict__')
+    assert record == IssueRecord(**flatten_issue(issue))
+    print("✓ test_record_from_issue passed")
+def test_record_strings_are_shared():
+    """Тест: одинаковые статусы и пользователи разных задач - один объект строки"""
+    first, second = to_records([make_issue(1), make_issue(5)])
+    assert first.status is second.status
+    assert first.reporter is not None
+    third = IssueRecord.from_issue(make_issue(11))
+    assert first.assignee is third.assignee
+    print("✓ test_record_strings_are_shared passed")
+def test_calculations_accept_records():
+    """Тест: все calculate_* дают одинаковый результат для JSON и для записей"""
+    issues = [make_issue(i) for i in range(60)]
+    records = list(to_records(issues))
+    pd.testing.assert_frame_equal(normalize_issues(records), normalize_issues(issues))
+    for calculate in (calculate_open_time, calculate_priority_distribution, calculate_top_users,
+                      calculate_daily_issues_stats, calculate_time_spent_distribution,
+                      calculate_status_time_distribution):
+        pd.testing.assert_frame_equal(calculate(records), calculate(issues))
+    # Генератор записей тоже допустим
+    assert len(calculate_open_time(to_records(issues))) == len(calculate_open_time(issues))
+    print("✓ test_calculations_accept_records passed")
+def test_client_iter_records():
+    """Тест: клиент отдает записи напрямую"""
+    client = JiraClient("https://test.com", "TEST", max_results=0, page_size=10)
+    client.session = FakeSearchSession(total=25)
+    records = list(client.iter_records("project = TEST"))
+    assert [record.key for record in records] == [f'TEST-{i}' for i in range(25)]
+    assert all(isinstance(record, IssueRecord) for record in records)
+    print("✓ test_client_iter_records passed")
+if __name__ == "__main__":
+    test_record_from_issue()
+    test_record_strings_are_shared()
+    test_calculations_accept_records()
+    test_client_iter_records()
+    print("\n✅ Все тесты IssueRecord пройдены!")
@@ -0,0 +1,60 @@
+﻿import sys
+import os
+import tempfile
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import pandas as pd
+from src.render_cache import RenderCache
+from src.plot_builder import plot_priority_distribution_chart, plot_top_users_chart
+def _frame():
+    return pd.DataFrame({'priority': ['High', 'Low'], 'count': [3, 5]})
+def test_fingerprint_depends_on_data_and_params():
+    """Отпечаток меняется вместе с данными, attrs, функцией и параметрами отрисовки"""
+    cache = RenderCache(cache_dir=tempfile.mkdtemp())
+    params = {'dpi': 150, 'format': 'png'}
+    base = cache.fingerprint(plot_priority_distribution_chart, _frame(), params)
+    assert base == cache.fingerprint(plot_priority_distribution_chart, _frame(), dict(params))
+    changed = _frame()
+    changed.loc[1, 'count'] = 6
+    assert base != cache.fingerprint(plot_priority_distribution_chart, changed, params)
+    with_attrs = _frame()
+    with_attrs.attrs['weight'] = 'resolved'
+    assert base != cache.fingerprint(plot_priority_distribution_chart, with_attrs, params)
+    assert base != cache.fingerprint(plot_top_users_chart, _frame(), params)
+    assert base != cache.fingerprint(plot_priority_distribution_chart, _frame(), {'dpi': 72, 'format': 'png'})
+    print("✓ test_fingerprint_depends_on_data_and_params passed")
+def test_restore_and_store():
+    """Промах до сохранения, попадание и копирование артефакта после него"""
+    base_dir = tempfile.mkdtemp()
+    cache = RenderCache(cache_dir=os.path.join(base_dir, 'cache'))
+    key = cache.fingerprint(plot_priority_distribution_chart, _frame())
+    output_path = os.path.join(base_dir, 'out', 'chart.png')
+    assert not cache.restore(key, output_path)
+    os.makedirs(os.path.dirname(output_path), exist_ok=True)
+    with open(output_path, 'wb') as f:
+        f.write(b'png-bytes')
+    cache.store(key, output_path)
+    os.remove(output_path)
+    assert cache.restore(key, output_path)
+    with open(output_path, 'rb') as f:
+        assert f.read() == b'png-bytes'
+    assert (cache.hits, cache.misses) == (1, 1)
+    print("✓ test_restore_and_store passed")
+def test_eviction_keeps_size_limit():
+    """Давно не использованные графики вытесняются при превышении лимита"""
+    base_dir = tempfile.mkdtemp()
+    cache = RenderCache(cache_dir=os.path.join(base_dir, 'cache'), max_size_mb=2500 / (1024 * 1024))
+    for i in range(5):
+        output_path = os.path.join(base_dir, f'chart_{i}.png')
+        with open(output_path, 'wb') as f:
+            f.write(b'x' * 1000)
+        cache.store(f'key{i}', output_path)
+        os.utime(os.path.join(cache.cache_dir, f'key{i}.png'), (1000 + i, 1000 + i))
+    remaining = sorted(os.listdir(cache.cache_dir))
+    assert len(remaining) == 2
+    assert 'key4.png' in remaining
+    print("✓ test_eviction_keeps_size_limit passed")
+if __name__ == "__main__":
+    test_fingerprint_depends_on_data_and_params()
+    test_restore_and_store()
+    test_eviction_keeps_size_limit()
+    print("\n✅ Все тесты RenderCache пройдены!")
@@ -0,0 +1,59 @@
+﻿import sys
+import os
+import json
+import tempfile
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from src.synthetic_data import SyntheticIssues, generate_issues
+from src.changelog import extract_status_intervals
+from src.worklog import extract_worklogs
+from src.data_processor import normalize_issues, calculate_open_time, calculate_top_users
+def test_generator_is_deterministic():
+    """Тест: одинаковое зерно - одинаковые задачи, страницы доступны без генерации предыдущих"""
+    first = list(generate_issues(50, seed=7))
+    second = list(generate_issues(50, seed=7))
+    assert first == second
+    assert list(generate_issues(50, seed=8)) != first
+    generator = SyntheticIssues(50, seed=7)
+    assert generator.page(20, 10) == first[20:30]
+    assert generator.page(45, 10) == first[45:]
+    print("✓ test_generator_is_deterministic passed")
+def test_generated_issues_are_consistent():
+    """Тест: changelog, журнал работ и поля согласованы и разбираются обработчиками"""
+    issues = list(generate_issues(500, seed=1))
+    assert len({issue['key'] for issue in issues}) == 500
+    for issue in issues:
+        fields = issue['fields']
+        intervals = extract_status_intervals(issue)
+        assert intervals[-1][0] == fields['status']['name']
+        if fields['resolutiondate']:
+            assert fields['resolutiondate'] >= fields['created']
+            assert intervals[-1][2] == fields['resolutiondate']
+        entries, truncated = extract_worklogs(issue)
+        assert truncated == (fields['worklog']['total'] > 20)
+        if not truncated:
+            assert (fields['timespent'] or 0) == sum(seconds for _, _, seconds in entries)
+    df = normalize_issues(issues)
+    assert df.attrs['timestamp_rejects'] == 0
+    # Активность пользователей неравномерна: лидер заметно опережает медиану
+    top = calculate_top_users(df, top_n=200)
+    assert top['total_tasks'].iloc[0] > 3 * top['total_tasks'].median()
+    assert 0.75 < len(calculate_open_time(df)) / len(df) < 0.95
+    print("✓ test_generated_issues_are_consistent passed")
+def test_benchmark_smoke():
+    """Тест: бенчмарк на маленьком размере пишет отчет по всем функциям"""
+    from benchmarks import run_benchmarks
+    output = os.path.join(tempfile.mkdtemp(), 'bench.json')
+    assert run_benchmarks.main(['--sizes', '300', '--no-memory', '--output', output]) == 0
+    with open(output, 'r', encoding='utf-8') as f:
+        report = json.load(f)
+    functions = {row['function'] for row in report['results']}
+    assert 'normalize_issues' in functions
+    assert sum(name.startswith('calculate_') for name in functions) == 8
+    assert sum(name.startswith('plot_') for name in functions) == 6
+    assert all(row['size'] == 300 and row['seconds'] >= 0 for row in report['results'])
+    print("✓ test_benchmark_smoke passed")
+if __name__ == "__main__":
+    test_generator_is_deterministic()
+    test_generated_issues_are_consistent()
+    test_benchmark_smoke()
+    print("\n✅ Все тесты синтетических данных пройдены!")
@@ -0,0 +1,72 @@
+﻿import sys
+import os
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from typing import Dict, List
+from src.jira_client import JiraClient
+from src.worklog import WorklogCollector, extract_worklogs
+from src.data_processor import calculate_worklog_effort
+from tests.test_jira_client import FakeResponse
+def make_worklog(author: str, started: str, seconds: int) -> Dict:
+    """Создание записи журнала работ"""
+    return {'author': {'displayName': author}, 'started': started, 'timeSpentSeconds': seconds}
+def make_issue(key: str, worklogs: List[Dict], total: int = None) -> Dict:
+    """Создание задачи со встроенным журналом работ"""
+    return {
+        'key': key,
+        'fields': {
+            'worklog': {'startAt': 0, 'maxResults': 20, 'total': len(worklogs) if total is None else total,
+                        'worklogs': worklogs}
+        }
+    }
+class FakeWorklogSession:
+    """Заглушка сессии, отдающая полный журнал работ задачи постранично"""
+    def __init__(self, worklogs: Dict[str, List[Dict]], page_cap: int = 2):
+        self.worklogs = worklogs
+        self.page_cap = page_cap
+        self.urls = []
+    def get(self, url, params=None, timeout=None, **kwargs):
+        self.urls.append(url)
+        key = url.split('/issue/')[1].split('/')[0]
+        start_at = params['startAt']
+        entries = self.worklogs[key]
+        return FakeResponse({'startAt': start_at, 'maxResults': self.page_cap, 'total': len(entries),
+                             'worklogs': entries[start_at:start_at + self.page_cap]})
+def test_extract_worklogs_detects_truncation():
+    """Тест распознавания усеченного журнала"""
+    entries, truncated = extract_worklogs(make_issue('TEST-1', [make_worklog('Alice', None, 60)], total=25))
+    assert entries == [('Alice', None, 60)]
+    assert truncated
+    _, truncated = extract_worklogs(make_issue('TEST-2', [make_worklog('Alice', None, 60)]))
+    assert not truncated
+    print("✓ test_extract_worklogs_detects_truncation passed")
+def test_collector_fetches_truncated_worklogs():
+    """Тест догрузки усеченных журналов и построения таблицы"""
+    full = [make_worklog('Bob', f'2023-01-0{day}T10:00:00.000+0000', 3600) for day in range(1, 6)]
+    issues = [
+        make_issue('TEST-1', [make_worklog('Alice', '2023-01-01T09:00:00.000+0000', 7200)]),
+        make_issue('TEST-2', full[:1], total=5),
+        make_issue('TEST-3', full[:1], total=5)
+    ]
+    collector = WorklogCollector()
+    stripped = list(collector.consume(issues))
+    assert all('worklog' not in issue['fields'] for issue in stripped)
+    assert collector.truncated_keys == ['TEST-2', 'TEST-3']
+    client = JiraClient("https://test.com", "TEST", max_workers=2)
+    client.session = FakeWorklogSession({'TEST-2': full, 'TEST-3': full})
+    assert collector.fetch_truncated(client) == 2
+    # 5 записей по 2 на страницу - 3 запроса на задачу
+    assert len(client.session.urls) == 6
+    df = collector.to_frame()
+    assert len(df) == 11
+    by_author = calculate_worklog_effort(df, by='author')
+    assert by_author['author'].tolist() == ['Bob', 'Alice']
+    assert by_author['hours'].tolist() == [10.0, 2.0]
+    assert by_author['issues'].tolist() == [2, 1]
+    by_day = calculate_worklog_effort(df, by='day')
+    assert len(by_day) == 5
+    assert by_day['hours'].iloc[0] == 4.0
+    print("✓ test_collector_fetches_truncated_worklogs passed")
+if __name__ == "__main__":
+    test_extract_worklogs_detects_truncation()
+    test_collector_fetches_truncated_worklogs()
+    print("\n✅ Все тесты журнала работ пройдены!")